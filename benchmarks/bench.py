@@ -0,0 +1,237 @@
+""" Benchmarks for the conversion, layout, render and export hot paths.
+
+Run from the project root:
+
+    python benchmarks/bench.py --save-baseline    # record baseline.json on this machine
+    python benchmarks/bench.py                    # run and compare with baseline.json
+    python benchmarks/bench.py --sizes 10 100 --cases process generate_1x
+
+Exits with status 1 when any case is slower (or uses more memory) than the
+baseline by more than the configured thresholds. Timings only compare on the
+same machine, so no baseline is committed: record one on the commit to
+compare against, then run the comparison on the change.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+
+if sys.platform.startswith("linux"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmarks", "baseline.json")
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Fixed passage so every run converts exactly the same text
+PASSAGE = ("学而时习之不亦说乎有朋自远方来不亦乐乎人不知而不愠不亦君子乎"
+           "我们一起去北京看长城，然后在颐和园散步。今天天气很好，阳光明媚"
+           "他喜欢读书写字画画，也喜欢听音乐和唱歌。中文的声调非常重要")
+
+
+def make_corpus(size):
+    return (PASSAGE * (size // len(PASSAGE) + 1))[:size]
+
+
+def rss_peak_kb():
+    """ Peak resident set size of this process in KiB (0 where unsupported) """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class Bench:
+    """ Drives one MainWindow through the benchmark cases """
+    def __init__(self):
+        from PyQt6.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([])
+        # MainWindow writes config.json into the working directory; keep it out of the repo
+        self.workdir = tempfile.mkdtemp(prefix="pinyin-bench-")
+        os.chdir(self.workdir)
+        # History, phrases, caches and logs go to a fresh profile: the user's real ones
+        # would be polluted and would skew the history timings
+        os.environ["LOCALAPPDATA"] = self.workdir
+        from src.ui import MainWindow
+        self.window = MainWindow()
+        self.window.key_monitor.stop()
+        self.text = ""
+        self.image = None
+
+    def load(self, text):
+        """ Prepare state shared by the cases for one corpus """
+        self.text = text
+        self.window.entry.setText(text)
+        self.window.process()
+        self.finish_processing()
+        self.window.sync_engine()
+        self.image = self.window.engine.render(self.window.pairs, 6.0) if len(text) <= 1000 else None
+        self.display = self.window.engine.display_list(self.window.pairs)
+
+    def finish_processing(self):
+        # Long texts are converted, and their preview painted, in chunks from the event loop; run it until done
+        self.app.processEvents()
+        while self.window.is_busy():
+            self.app.processEvents()
+
+    # --- cases: (function, max corpus size or None) ---
+
+    def case_process(self):
+        self.window.process()
+        self.finish_processing()
+
+    def case_auto_adjust(self):
+        # Includes the preview repaint, which is sliced into the event loop for long texts
+        self.window.auto_adjust_pinyin_size()
+        self.finish_processing()
+
+    def case_generate_1x(self):
+        self.window.generate(1.0)
+
+    def case_generate_6x(self):
+        self.window.generate(6.0)
+
+    def case_png_encode(self):
+        self.window.engine.encode_png(self.image)
+
+    def case_copy_html(self):
+        self.window.copy_as_text_html()
+
+    def _layout_args(self):
+        engine = self.window.engine
+        return int(engine.size_hanzi * 6), int(engine.size_pinyin * 6), 60, 4000
+
+    def case_layout(self):
+        self.display.place(*self._layout_args())
+
+    def case_layout_loop(self):
+        # Per-pair Python reference for case_layout
+        self.display.place_python(*self._layout_args())
+
+
+# Very long single-row images at 6x exceed QImage size limits, so those cases are capped
+CASES = {
+    "process": (Bench.case_process, None),
+    "auto_adjust": (Bench.case_auto_adjust, None),
+    "generate_1x": (Bench.case_generate_1x, None),
+    "generate_6x": (Bench.case_generate_6x, 1000),
+    "png_encode": (Bench.case_png_encode, 1000),
+    "copy_html": (Bench.case_copy_html, None),
+    "layout": (Bench.case_layout, None),
+    "layout_loop": (Bench.case_layout_loop, None),
+}
+
+
+def measure(bench, func, repeat):
+    func(bench)  # warm-up
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(bench)
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured in a separate run so tracing does not distort timings
+    gc.collect()
+    rss_before = rss_peak_kb()
+    tracemalloc.start()
+    func(bench)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "py_peak_kb": py_peak // 1024,
+        "rss_growth_kb": max(0, rss_peak_kb() - rss_before),
+    }
+
+
+def run(sizes, case_names, repeat):
+    bench = Bench()
+    results = {}
+    for size in sizes:
+        bench.load(make_corpus(size))
+        for name in case_names:
+            func, limit = CASES[name]
+            key = f"{name}[{size}]"
+            if limit is not None and size > limit:
+                continue
+            results[key] = measure(bench, func, repeat)
+            r = results[key]
+            print(f"{key:<22} {r['median_ms']:>10.2f} ms  (min {r['min_ms']:.2f})"
+                  f"  py peak {r['py_peak_kb']} KiB  rss +{r['rss_growth_kb']} KiB")
+    return results
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """ Returns a list of regression descriptions """
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base["median_ms"] > 0 and r["median_ms"] > base["median_ms"] * (1 + time_threshold):
+            regressions.append(f"{key}: {base['median_ms']:.2f} ms -> {r['median_ms']:.2f} ms")
+        if base["py_peak_kb"] > 0 and r["py_peak_kb"] > base["py_peak_kb"] * (1 + memory_threshold):
+            regressions.append(f"{key}: py peak {base['py_peak_kb']} KiB -> {r['py_peak_kb']} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PinyinHelper benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--time-threshold", type=float, default=0.20,
+                        help="allowed relative slowdown before failing (default 0.20 = 20%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="allowed relative growth of peak Python memory (default 0.25)")
+    args = parser.parse_args()
+    baseline_path = os.path.abspath(args.baseline)
+
+    results = run(args.sizes, args.cases, args.repeat)
+
+    if args.save_baseline:
+        data = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor()},
+            "results": results,
+        }
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("No baseline found; run with --save-baseline first.")
+        return 0
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+""" Replays recorded hotkey sessions against a headless MainWindow.
+
+Record on a real machine with PINYIN_HELPER_RECORD=1 (sessions are written,
+anonymized, to %LOCALAPPDATA%\\PinyinHelper\\sessions), then from the project root:
+
+    python benchmarks/replay.py session-*.jsonl                  # run and compare with replay_baseline.json
+    python benchmarks/replay.py session-*.jsonl --save-baseline  # record a new baseline
+
+Key presses are fed to GlobalHotKeyMonitor from a separate thread at their
+recorded times, as the pynput listener would, so the 0.6 s chord window and
+the Ctrl+C selection prefetch see the original timing. Clipboard and selection
+reads are answered from the recording; selection queries take as long as
+they originally did. Exits with status 1 on regression, like bench.py.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+
+from bench import PROJECT_ROOT, Bench, rss_peak_kb, compare
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmarks", "replay_baseline.json")
+# Idle stretches longer than this are shortened; nothing in the app waits that long
+MAX_GAP = 2.0
+# Sessions are never left running longer than this after their last key press
+SETTLE_TIMEOUT = 30.0
+
+
+class Replayer:
+    """ Drives one MainWindow through recorded sessions """
+    def __init__(self):
+        self.bench = Bench()
+        self.app = self.bench.app
+        self.window = self.bench.window
+        self.monitor = self.window.key_monitor
+        self.window.paste_into_source = self._paste
+        self.pastes = 0
+        self.starts = []
+        self.ends = []
+        self._waiting = None
+
+        from PyQt6.QtCore import Qt
+        # Start times are taken on the emitting (listener) thread, end times once the slot has run
+        direct = Qt.ConnectionType.DirectConnection
+        self.monitor.activated.connect(lambda: self.starts.append(("activate", time.perf_counter())), direct)
+        self.monitor.activated_replace.connect(lambda: self.starts.append(("replace", time.perf_counter())), direct)
+        # Connected after MainWindow's own slots, so these run once those have returned
+        self.monitor.activated.connect(self._on_activated_done)
+        self.monitor.activated_replace.connect(lambda: self.ends.append(time.perf_counter()))
+
+    def _paste(self):
+        self.pastes += 1
+
+    def _on_activated_done(self):
+        # Long texts keep converting and painting their preview in chunks after the slot returns
+        if self.window.is_busy():
+            self._waiting = True
+        else:
+            self.ends.append(time.perf_counter())
+
+    def _drive(self, keys):
+        start = time.perf_counter()
+        offset = 0.0
+        previous = 0.0
+        for t, key in keys:
+            offset += min(t - previous, MAX_GAP)
+            previous = t
+            delay = offset - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            getattr(self.monitor, "on_" + key)()
+
+    def run(self, session):
+        from PyQt6.QtCore import QEvent
+        from src.sessions import FakeClipboard, FakeSelectionSource
+        window = self.window
+        window.clipboard = FakeClipboard(session.clipboards)
+        window.selection_source = FakeSelectionSource(session.selections)
+        window._cached_com_info = None
+        self.monitor.last_c_time = 0
+        self.starts, self.ends, self.pastes = [], [], 0
+        stalls_before = window.watchdog.stalls
+
+        driver = threading.Thread(target=self._drive, args=(session.keys,), name="ReplayDriver", daemon=True)
+        rss_before = rss_peak_kb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        driver.start()
+        deadline = None
+        while True:
+            self.app.processEvents()
+            # Outside exec() deleteLater() never fires; replaced pair widgets would pile up
+            self.app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+            if self._waiting and not window.is_busy():
+                self._waiting = None
+                self.ends.append(time.perf_counter())
+            if not driver.is_alive():
+                if deadline is None:
+                    deadline = time.perf_counter() + SETTLE_TIMEOUT
+                if (len(self.ends) >= len(self.starts) and not window.is_busy()) or time.perf_counter() > deadline:
+                    break
+            if not window.is_busy():
+                time.sleep(0.002)
+        driver.join()
+
+        latencies = {}
+        for (kind, started), ended in zip(self.starts, self.ends):
+            latencies.setdefault(kind, []).append(ended - started)
+        result = {
+            "wall_s": time.perf_counter() - wall_start,
+            "cpu_ms": (time.process_time() - cpu_start) * 1000,
+            "rss_growth_kb": max(0, rss_peak_kb() - rss_before),
+            "stalls": window.watchdog.stalls - stalls_before,
+            "pastes": self.pastes,
+            "unfinished": len(self.starts) - len(self.ends),
+        }
+        for kind, values in latencies.items():
+            result[f"{kind}_n"] = len(values)
+            result[f"{kind}_median_ms"] = statistics.median(values) * 1000
+            result[f"{kind}_max_ms"] = max(values) * 1000
+        return result
+
+
+def report(name, r):
+    parts = [f"{name}: wall {r['wall_s']:.1f} s, cpu {r['cpu_ms']:.0f} ms, rss +{r['rss_growth_kb']} KiB"]
+    for kind in ("activate", "replace"):
+        if f"{kind}_n" in r:
+            parts.append(f"{kind} x{r[kind + '_n']} median {r[kind + '_median_ms']:.1f} ms"
+                         f" max {r[kind + '_max_ms']:.1f} ms")
+    if r["stalls"]:
+        parts.append(f"{r['stalls']} UI stall(s)")
+    if r["unfinished"]:
+        parts.append(f"{r['unfinished']} unfinished")
+    print("\n  ".join(parts))
+
+
+def baseline_entries(name, r):
+    """ Results in bench.py's baseline shape, one entry per measured action """
+    entries = {}
+    for kind in ("activate", "replace"):
+        if f"{kind}_n" in r:
+            entries[f"{name}:{kind}"] = {"median_ms": r[f"{kind}_median_ms"], "py_peak_kb": 0}
+    entries[f"{name}:cpu"] = {"median_ms": r["cpu_ms"], "py_peak_kb": 0}
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded PinyinHelper sessions")
+    parser.add_argument("sessions", nargs="+", help="session-*.jsonl files recorded with PINYIN_HELPER_RECORD=1")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--time-threshold", type=float, default=0.20,
+                        help="allowed relative slowdown before failing (default 0.20 = 20%%)")
+    args = parser.parse_args()
+    paths = [os.path.abspath(p) for p in args.sessions]
+    baseline_path = os.path.abspath(args.baseline)
+
+    from src.sessions import Session
+    replayer = Replayer()
+
+    results = {}
+    for path in paths:
+        session = Session(path)
+        r = replayer.run(session)
+        report(session.name, r)
+        results.update(baseline_entries(session.name, r))
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("No baseline found; run with --save-baseline first.")
+        return 0
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.time_threshold, 0.0)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
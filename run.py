@@ -1,9 +1,12 @@
 import sys
 import os
+import multiprocessing
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.main import main
 
 if __name__ == '__main__':
+    # Required for the export worker pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
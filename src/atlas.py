@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPainter, QImage, QFontMetrics
+
+MAX_BYTES = 64 * 1024 * 1024
+# Below this pixel size Qt's own glyph cache is faster than blitting tiles
+MIN_PIXEL_SIZE = 48
+# Transparent border around each run so antialiased edges outside the ink box are kept
+PAD = 2
+# Largest difference per premultiplied channel between a blitted run and drawing it directly
+MAX_CHANNEL_ERROR = 4
+
+
+class GlyphAtlas:
+    """ LRU cache of rasterized text runs keyed by (font, text, color).
+
+    Study texts repeat a few hundred hanzi and syllables, so rendering turns
+    into blitting cached tiles instead of shaping and rasterizing every run.
+    Tiles are drawn at integer positions, the same positions drawText() would
+    get, onto a premultiplied canvas like the tiles themselves, so blitting
+    adds no alpha rounding. At MIN_PIXEL_SIZE and above the result matches
+    direct drawing within MAX_CHANNEL_ERROR per premultiplied channel: Qt
+    antialiases the edges of large glyph outlines slightly differently in a
+    tile, on a few pixels per image.
+    """
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.tiles = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def clear(self):
+        self.tiles.clear()
+        self.bytes = 0
+
+    def tile(self, font, text, color, font_key=None):
+        """ (image, dx, dy): draw image at baseline origin + (dx, dy) """
+        key = (font_key or font.key(), text, color.rgba())
+        entry = self.tiles.get(key)
+        if entry is not None:
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        rect = QFontMetrics(font).boundingRect(text)
+        img = QImage(max(1, rect.width() + 2 * PAD), max(1, rect.height() + 2 * PAD),
+                     QImage.Format.Format_ARGB32_Premultiplied)
+        img.fill(Qt.GlobalColor.transparent)
+        p = QPainter(img)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        p.setFont(font)
+        p.setPen(color)
+        p.drawText(PAD - rect.x(), PAD - rect.y(), text)
+        p.end()
+
+        entry = (img, rect.x() - PAD, rect.y() - PAD)
+        self.tiles[key] = entry
+        self.bytes += img.sizeInBytes()
+        self._evict_to(self.max_bytes, keep=1)
+        return entry
+
+    def _evict_to(self, max_bytes, keep=0):
+        while self.bytes > max_bytes and len(self.tiles) > keep:
+            _, (old, _, _) = self.tiles.popitem(last=False)
+            self.bytes -= old.sizeInBytes()
+
+    def release(self, excess):
+        """ Drop least recently used tiles until about excess bytes are freed; returns the bytes freed """
+        before = self.bytes
+        self._evict_to(max(0, before - excess))
+        return before - self.bytes
+
+    def draw_text(self, painter, font, x, y, text, color, font_key=None):
+        """ Equivalent of painter.drawText(x, y, text) in font and color, x and y integers """
+        img, dx, dy = self.tile(font, text, color, font_key)
+        painter.drawImage(x + dx, y + dy, img)
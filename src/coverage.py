@@ -0,0 +1,169 @@
+import os
+import json
+import zlib
+import base64
+import hashlib
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QFont, QRawFont, QFontDatabase
+
+from .utils import Utils
+
+# Indexed code points: the BMP and the supplementary ideographic planes (CJK Extension B and later,
+# as in the engine's Han class). Characters outside these ranges are not checked.
+INDEXED_RANGES = ((0, 0x10000), (0x20000, 0x31350))
+INDEX_BYTES = INDEXED_RANGES[-1][1] // 8
+
+
+def is_indexed(cp):
+    return any(start <= cp < end for start, end in INDEXED_RANGES)
+
+
+def open_font(family):
+    """ (raw font, signature), or (None, None) when the family is not installed.
+
+    The signature hashes the 'head' table (revision, modification date and a
+    checksum of the whole file) and the 'cmap' table the coverage is read
+    from, so it changes whenever the font file does.
+    """
+    installed = {f.lower() for f in QFontDatabase.families()}
+    raw = QRawFont.fromFont(QFont(family))
+    if not raw.isValid() or (family.lower() not in installed and raw.familyName().lower() != family.lower()):
+        return None, None
+    signature = hashlib.md5(bytes(raw.fontTable("head")) + bytes(raw.fontTable("cmap"))
+                            + raw.familyName().encode("utf-8")).hexdigest()
+    return raw, signature
+
+
+def build_bitset(raw):
+    """ Bitset of the indexed code points the font itself supports, without fallback """
+    bits = bytearray(INDEX_BYTES)
+    supports = raw.supportsCharacter
+    for start, end in INDEXED_RANGES:
+        for cp in range(start, end):
+            if supports(cp):
+                bits[cp >> 3] |= 1 << (cp & 7)
+    return bytes(bits)
+
+
+class CoverageBuilder(QThread):
+    built = pyqtSignal(str, object, object)  # family, signature, bitset
+    unchanged = pyqtSignal(str)
+
+    def __init__(self, families, signatures=None):
+        super().__init__()
+        self.families = families
+        # Saved signatures: fonts that still match them keep their index without a rebuild
+        self.signatures = signatures or {}
+
+    def run(self):
+        for family in self.families:
+            try:
+                raw, signature = open_font(family)
+                if raw is None:
+                    self.built.emit(family, None, None)
+                elif signature == self.signatures.get(family):
+                    self.unchanged.emit(family)
+                else:
+                    self.built.emit(family, signature, build_bitset(raw))
+            except Exception as e:
+                print(f"Error indexing font {family}: {e}")
+
+
+class CoverageIndex(QObject):
+    """ Per-font glyph coverage bitsets, built in the background and persisted across runs """
+    updated = pyqtSignal(str)
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or os.path.join(Utils.app_data_dir(), "font_coverage.json")
+        self.bitsets = {}      # family -> bytes, or None when the family is not installed
+        self.signatures = {}
+        self.builders = []
+        self._pending = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for family, entry in data.items():
+                bits = zlib.decompress(base64.b64decode(entry["bits"]))
+                # Indexes saved with other ranges are dropped and rebuilt
+                if len(bits) == INDEX_BYTES:
+                    self.signatures[family] = entry["sig"]
+                    self.bitsets[family] = bits
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading font coverage: {e}")
+
+    def save(self):
+        data = {}
+        for family, bits in self.bitsets.items():
+            if bits is not None:
+                data[family] = {"sig": self.signatures.get(family, ""),
+                                "bits": base64.b64encode(zlib.compress(bits, 9)).decode("ascii")}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except Exception as e:
+            print(f"Error saving font coverage: {e}")
+
+    def ensure(self, families, revalidate=False):
+        """ Index families that are not known yet in the background.
+
+        When revalidating, known families are checked too, and only the ones
+        whose font file changed since they were indexed are rebuilt.
+        """
+        todo = [f for f in dict.fromkeys(families)
+                if f and f not in self._pending and (revalidate or f not in self.bitsets)]
+        if not todo:
+            return
+        self._pending.update(todo)
+        builder = CoverageBuilder(todo, {f: self.signatures[f] for f in todo if f in self.signatures})
+        builder.built.connect(self._on_built)
+        builder.unchanged.connect(self._on_unchanged)
+        builder.finished.connect(lambda: self._on_builder_done(builder))
+        self.builders.append(builder)
+        builder.start()
+
+    def _on_unchanged(self, family):
+        self._pending.discard(family)
+
+    def _on_built(self, family, signature, bits):
+        self._pending.discard(family)
+        if bits is not None and self.signatures.get(family) == signature and self.bitsets.get(family) == bits:
+            return
+        self.bitsets[family] = bits
+        self.signatures[family] = signature
+        self.save()
+        self.updated.emit(family)
+
+    def _on_builder_done(self, builder):
+        if builder in self.builders:
+            self.builders.remove(builder)
+
+    def is_known(self, family):
+        return family in self.bitsets
+
+    def missing(self, family, text):
+        """ Characters of text the font cannot draw itself; None while the font is not indexed yet """
+        if family not in self.bitsets:
+            return None
+        bits = self.bitsets[family]
+        result = []
+        for ch in dict.fromkeys(text):
+            cp = ord(ch)
+            if ch.isspace() or not is_indexed(cp):
+                continue
+            if bits is None or not (bits[cp >> 3] >> (cp & 7)) & 1:
+                result.append(ch)
+        return result
+
+    def pick(self, families, text):
+        """ First family that covers every character of text, or None """
+        for family in families:
+            if self.missing(family, text) == []:
+                return family
+        return None
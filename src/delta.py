@@ -0,0 +1,285 @@
+""" Binary delta packages between two builds of the application.
+
+A delta package is a zip with a manifest.json and one entry per changed
+file. Changed files are stored as a patch against the installed copy (a
+stream of COPY/INSERT operations) or, when that does not pay off, as the
+full new content. Every reconstructed file is checked against the SHA-256
+recorded in the manifest.
+
+Build a package from two PyInstaller output folders:
+
+    python -m src.delta build dist-1.0.4/PinyinHelper dist/PinyinHelper \
+        PinyinHelper-delta-1.0.4-1.0.5.zip --from 1.0.4 --to 1.0.5
+
+It is written together with its '<zip>.sha256'. Publish the installer's
+checksum the same way before uploading it:
+
+    python -m src.delta checksum Output/PinyinHelper_Setup.exe
+"""
+import os
+import sys
+import json
+import struct
+import hashlib
+import zipfile
+import argparse
+
+FORMAT_VERSION = 1
+BLOCK = 32
+# Store the full file when the patch saves less than this fraction
+MIN_SAVING = 0.2
+
+_COPY = b"C"
+_INSERT = b"I"
+_COPY_HEAD = struct.Struct("<QI")
+_INSERT_HEAD = struct.Struct("<I")
+
+
+class DeltaError(Exception):
+    pass
+
+
+def delta_asset_name(from_version, to_version):
+    return f"PinyinHelper-delta-{from_version.lstrip('v')}-{to_version.lstrip('v')}.zip"
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_checksum(path):
+    """ Write '<path>.sha256', the sidecar the updater looks for; returns its path.
+
+    It holds the bare hash, without a file name, so it still matches when the
+    asset is uploaded under another name.
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    out = path + ".sha256"
+    with open(out, "w", encoding="utf-8", newline="\n") as f:
+        f.write(hasher.hexdigest() + "\n")
+    return out
+
+
+def _common_length(a, a_start, b, b_start):
+    """ Length of the common run of a[a_start:] and b[b_start:] """
+    limit = min(len(a) - a_start, len(b) - b_start)
+    n = 0
+    step = 4096
+    while step:
+        while n + step <= limit and a[a_start + n:a_start + n + step] == b[b_start + n:b_start + n + step]:
+            n += step
+        step //= 8
+    while n < limit and a[a_start + n] == b[b_start + n]:
+        n += 1
+    return n
+
+
+def make_patch(old, new):
+    """ COPY/INSERT operation stream that turns old into new """
+    index = {}
+    for off in range(0, len(old) - BLOCK + 1, BLOCK):
+        index.setdefault(old[off:off + BLOCK], off)
+
+    out = bytearray()
+
+    def emit_insert(data):
+        if data:
+            out.extend(_INSERT + _INSERT_HEAD.pack(len(data)) + data)
+
+    pending = 0
+    i = 0
+    n = len(new)
+    while i <= n - BLOCK:
+        off = index.get(new[i:i + BLOCK])
+        if off is None:
+            i += 1
+            continue
+        # Grow the match backwards into bytes not yet emitted, then forwards
+        back = 0
+        while back < i - pending and back < off and old[off - back - 1] == new[i - back - 1]:
+            back += 1
+        start_new = i - back
+        start_old = off - back
+        length = back + BLOCK + _common_length(old, off + BLOCK, new, i + BLOCK)
+
+        emit_insert(new[pending:start_new])
+        out += _COPY + _COPY_HEAD.pack(start_old, length)
+        i = pending = start_new + length
+
+    emit_insert(new[pending:])
+    return bytes(out)
+
+
+def apply_patch(old, patch):
+    out = bytearray()
+    pos = 0
+    end = len(patch)
+    while pos < end:
+        op = patch[pos:pos + 1]
+        pos += 1
+        if op == _COPY:
+            offset, length = _COPY_HEAD.unpack_from(patch, pos)
+            pos += _COPY_HEAD.size
+            if offset + length > len(old):
+                raise DeltaError("Patch copies past the end of the source file")
+            out += old[offset:offset + length]
+        elif op == _INSERT:
+            (length,) = _INSERT_HEAD.unpack_from(patch, pos)
+            pos += _INSERT_HEAD.size
+            out += patch[pos:pos + length]
+            pos += length
+        else:
+            raise DeltaError("Corrupt patch stream")
+    return bytes(out)
+
+
+def _list_files(root):
+    files = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            full = os.path.join(folder, name)
+            files[os.path.relpath(full, root).replace(os.sep, "/")] = full
+    return files
+
+
+def build_delta(old_dir, new_dir, out_path, from_version, to_version):
+    """ Write a delta package turning old_dir into new_dir; returns the manifest """
+    old_files = _list_files(old_dir)
+    new_files = _list_files(new_dir)
+    manifest = {"format": FORMAT_VERSION, "from": from_version.lstrip("v"),
+                "to": to_version.lstrip("v"), "files": []}
+
+    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_LZMA) as zf:
+        for rel in sorted(new_files):
+            with open(new_files[rel], "rb") as f:
+                new = f.read()
+            entry = {"path": rel, "sha256": sha256_bytes(new)}
+
+            if rel in old_files:
+                with open(old_files[rel], "rb") as f:
+                    old = f.read()
+                if old == new:
+                    continue
+                patch = make_patch(old, new)
+                if len(patch) < len(new) * (1 - MIN_SAVING):
+                    entry.update(op="patch", source_sha256=sha256_bytes(old), data=f"patches/{len(manifest['files'])}")
+                    zf.writestr(entry["data"], patch)
+                    manifest["files"].append(entry)
+                    continue
+
+            entry.update(op="add", data=f"files/{len(manifest['files'])}")
+            zf.writestr(entry["data"], new)
+            manifest["files"].append(entry)
+
+        for rel in sorted(set(old_files) - set(new_files)):
+            manifest["files"].append({"path": rel, "op": "delete"})
+
+        zf.writestr("manifest.json", json.dumps(manifest, indent=4))
+    return manifest
+
+
+def safe_join(root, rel):
+    path = os.path.normpath(os.path.join(root, rel))
+    if os.path.commonpath([os.path.abspath(root), os.path.abspath(path)]) != os.path.abspath(root):
+        raise DeltaError(f"Unsafe path in delta: {rel}")
+    return path
+
+
+def read_manifest(package_path):
+    try:
+        with zipfile.ZipFile(package_path) as zf:
+            manifest = json.loads(zf.read("manifest.json").decode("utf-8"))
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise DeltaError(f"Invalid delta package: {e}")
+    if manifest.get("format") != FORMAT_VERSION:
+        raise DeltaError(f"Unsupported delta format {manifest.get('format')}")
+    return manifest
+
+
+def apply_delta(package_path, install_dir, staging_dir, current_version=None):
+    """ Reconstruct every changed file of the new version into staging_dir.
+
+    The installed files are only read. Returns the manifest; its 'delete'
+    entries list files the caller must remove when swapping the staged
+    files in. Raises DeltaError if the package does not match the install.
+    """
+    manifest = read_manifest(package_path)
+    if current_version and manifest["from"] != current_version.lstrip("v"):
+        raise DeltaError(f"Delta is for {manifest['from']}, installed version is {current_version}")
+
+    with zipfile.ZipFile(package_path) as zf:
+        for entry in manifest["files"]:
+            if entry["op"] == "delete":
+                continue
+            target = safe_join(staging_dir, entry["path"])
+            data = zf.read(entry["data"])
+
+            if entry["op"] == "patch":
+                source = safe_join(install_dir, entry["path"])
+                try:
+                    with open(source, "rb") as f:
+                        old = f.read()
+                except OSError as e:
+                    raise DeltaError(f"Missing installed file {entry['path']}: {e}")
+                if sha256_bytes(old) != entry["source_sha256"]:
+                    raise DeltaError(f"Installed file {entry['path']} does not match the delta base")
+                data = apply_patch(old, data)
+            elif entry["op"] != "add":
+                raise DeltaError(f"Unknown delta operation {entry['op']}")
+
+            if sha256_bytes(data) != entry["sha256"]:
+                raise DeltaError(f"Hash mismatch after patching {entry['path']}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.delta", description="Build or apply delta update packages")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="create a delta package from two build folders")
+    p_build.add_argument("old_dir")
+    p_build.add_argument("new_dir")
+    p_build.add_argument("out")
+    p_build.add_argument("--from", dest="from_version", required=True)
+    p_build.add_argument("--to", dest="to_version", required=True)
+
+    p_checksum = sub.add_parser("checksum", help="write <file>.sha256 for release assets such as the installer")
+    p_checksum.add_argument("files", nargs="+")
+
+    p_apply = sub.add_parser("apply", help="reconstruct changed files into a staging folder")
+    p_apply.add_argument("package")
+    p_apply.add_argument("install_dir")
+    p_apply.add_argument("staging_dir")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "build":
+            manifest = build_delta(args.old_dir, args.new_dir, args.out, args.from_version, args.to_version)
+            counts = {}
+            for entry in manifest["files"]:
+                counts[entry["op"]] = counts.get(entry["op"], 0) + 1
+            print(f"Wrote {args.out} ({os.path.getsize(args.out)} bytes): {counts}")
+            checksum = write_checksum(args.out)
+            name = delta_asset_name(manifest["from"], manifest["to"])
+            print(f"Upload it to the {manifest['to']} release as {name}, with {os.path.basename(checksum)} as {name}.sha256")
+        elif args.command == "checksum":
+            for path in args.files:
+                print(f"Wrote {write_checksum(path)}")
+        else:
+            manifest = apply_delta(args.package, args.install_dir, args.staging_dir)
+            deleted = [e["path"] for e in manifest["files"] if e["op"] == "delete"]
+            print(f"Staged {len(manifest['files']) - len(deleted)} files in {args.staging_dir}; to delete: {deleted}")
+    except (DeltaError, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
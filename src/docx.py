@@ -0,0 +1,154 @@
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from .engine import clean_text
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>')
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>')
+
+_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>')
+
+_DOCUMENT_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                  f'<w:document xmlns:w="{_W_NS}"><w:body>')
+# A4 with 2 cm margins
+_DOCUMENT_TAIL = ('<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+                  '<w:pgMar w:top="1134" w:right="1134" w:bottom="1134" w:left="1134" '
+                  'w:header="709" w:footer="709" w:gutter="0"/></w:sectPr>'
+                  '</w:body></w:document>')
+
+
+def _style(style_id, family, half_points, color):
+    font = quoteattr(family)
+    return (f'<w:style w:type="character" w:customStyle="1" w:styleId="{style_id}"><w:name w:val="{style_id}"/>'
+            f'<w:rPr><w:rFonts w:ascii={font} w:hAnsi={font} w:eastAsia={font} w:cs={font}/>'
+            f'<w:color w:val="{color}"/><w:sz w:val="{half_points}"/><w:szCs w:val="{half_points}"/></w:rPr>'
+            '</w:style>')
+
+
+class DocxWriter:
+    """ Writes annotated text as a Word document with native ruby (phonetic guide) runs.
+
+    document.xml is streamed into the zip one paragraph at a time, so memory
+    use does not grow with the length of the document. Fonts, sizes and the
+    base color live in two character styles; runs only carry what differs.
+    Use as a context manager, or call close().
+    """
+    def __init__(self, path, font_hanzi, font_pinyin, size_hanzi, size_pinyin, color="#000000"):
+        # Word sizes are in half-points
+        self.hps_hanzi = int(round(size_hanzi * 2))
+        self.hps_pinyin = int(round(size_pinyin * 2))
+        self.color = color.lstrip("#").upper()
+        self.paragraphs = 0
+        self._props = {}
+
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self.zip.writestr("_rels/.rels", _RELS)
+        self.zip.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS)
+        self.zip.writestr("word/styles.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:styles xmlns:w="{_W_NS}">'
+            + _style("Hanzi", font_hanzi, self.hps_hanzi, self.color)
+            + _style("Pinyin", font_pinyin, self.hps_pinyin, self.color)
+            + "</w:styles>"))
+        self.stream = self.zip.open("word/document.xml", "w")
+        self.stream.write(_DOCUMENT_HEAD.encode("utf-8"))
+
+    @classmethod
+    def for_engine(cls, path, engine):
+        return cls(path, engine.font_hanzi, engine.font_pinyin, engine.size_hanzi, engine.size_pinyin,
+                   engine.color.name())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run_props(self, style_id, half_points, color):
+        key = (style_id, half_points, color)
+        props = self._props.get(key)
+        if props is None:
+            default_hps = self.hps_hanzi if style_id == "Hanzi" else self.hps_pinyin
+            props = f'<w:rPr><w:rStyle w:val="{style_id}"/>'
+            if color != self.color:
+                props += f'<w:color w:val="{color}"/>'
+            if half_points != default_hps:
+                props += f'<w:sz w:val="{half_points}"/><w:szCs w:val="{half_points}"/>'
+            props = self._props[key] = props + "</w:rPr>"
+        return props
+
+    def add_pairs(self, pairs, size_pinyin=None):
+        """ One paragraph; size_pinyin overrides the pinyin point size for this paragraph """
+        hps_hanzi = self.hps_hanzi
+        hps_pinyin = int(round(size_pinyin * 2)) if size_pinyin else self.hps_pinyin
+        ruby_props = (f'<w:rubyPr><w:rubyAlign w:val="center"/><w:hps w:val="{hps_pinyin}"/>'
+                      f'<w:hpsRaise w:val="{hps_hanzi}"/><w:hpsBaseText w:val="{hps_hanzi}"/>'
+                      f'<w:lid w:val="zh-CN"/></w:rubyPr>')
+        colors = [c.name()[1:].upper() for c in pairs.palette]
+
+        parts = ["<w:p>"]
+        for ch, py, cid in zip(pairs.chars, pairs.syllables, pairs.color_ids):
+            color = colors[cid]
+            base = (f'<w:r>{self._run_props("Hanzi", hps_hanzi, color)}'
+                    f'<w:t xml:space="preserve">{escape(ch)}</w:t></w:r>')
+            if not py:
+                # Unannotated token (Latin, digits, punctuation): a plain run
+                parts.append(base)
+                continue
+            parts.append(f'<w:r><w:ruby>{ruby_props}'
+                         f'<w:rt><w:r>{self._run_props("Pinyin", hps_pinyin, color)}'
+                         f'<w:t>{escape(py)}</w:t></w:r></w:rt>'
+                         f'<w:rubyBase>{base}</w:rubyBase></w:ruby></w:r>')
+        parts.append("</w:p>")
+        self.stream.write("".join(parts).encode("utf-8"))
+        self.paragraphs += 1
+
+    def add_blank(self):
+        self.stream.write(b"<w:p/>")
+        self.paragraphs += 1
+
+    def close(self):
+        if self.stream is None:
+            return
+        self.stream.write(_DOCUMENT_TAIL.encode("utf-8"))
+        self.stream.close()
+        self.stream = None
+        self.zip.close()
+
+
+def export_docx(engine, lines, path, auto_fit=True):
+    """ Convert lines one at a time into a DOCX paragraph each; returns the number of paragraphs """
+    with DocxWriter.for_engine(path, engine) as writer:
+        for line in lines:
+            text = clean_text(line)
+            if not text:
+                writer.add_blank()
+                continue
+            pairs = engine.convert(text)
+            writer.add_pairs(pairs, engine.fit_pinyin_size(pairs) if auto_fit else None)
+        return writer.paragraphs
@@ -0,0 +1,470 @@
+import re
+import math
+from html import escape
+
+from PyQt6.QtCore import Qt, QBuffer, QIODevice, QByteArray
+from PyQt6.QtGui import QPainter, QColor, QFont, QFontMetrics, QFontMetricsF, QFontInfo, QImage
+
+from pypinyin import pinyin, Style
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .pairs import PairStore
+from .atlas import GlyphAtlas, MIN_PIXEL_SIZE
+
+HIGH_RES_SCALE = 6.0
+# Limits of the hanzi size spin box and of render scales (the preview at 1.0 up to high-res copies)
+MIN_SIZE_HANZI = 10
+MAX_SIZE_HANZI = 500
+MIN_SCALE = 1.0
+# Pixel size fonts are measured at; metrics are stored relative to it (in em) and scaled on replay
+REF_PX = 1000
+CHUNK_SIZE = 500
+# Chunks prefer to end after one of these so pypinyin keeps whole words and phrases together
+_CHUNK_BREAKS = "。！？；，、.!?;,\n"
+# Characters that get a pinyin annotation; runs of anything else (Latin words, digits,
+# punctuation) become single unannotated tokens
+_HAN_CLASS = "[\u3007\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0003134f]"
+_HAN_RUNS = re.compile(f"({_HAN_CLASS}+)")
+_HAN_CHAR = re.compile(_HAN_CLASS)
+# Whitespace between these (Han, CJK punctuation, full-width forms) is line wrapping or padding, not a word gap
+_CJK_CLASS = "[\u3001-\u303f\uff00-\uffef" + _HAN_CLASS[1:]
+_CJK_GAP = re.compile(f"(?<={_CJK_CLASS})\\s+(?={_CJK_CLASS})")
+_SPACE_RUN = re.compile(r"\s+")
+
+
+def is_han(token):
+    """ True for a single Han character, the only kind of token that carries pinyin """
+    return len(token) == 1 and _HAN_CHAR.match(token) is not None
+
+
+def clean_text(text):
+    """ Text as it is converted: no whitespace between Han characters, other runs of whitespace as one space """
+    return _SPACE_RUN.sub(" ", _CJK_GAP.sub("", text)).strip()
+
+
+def split_chunks(text, size=CHUNK_SIZE):
+    """ Yields consecutive pieces of about size characters, cut after punctuation when possible """
+    start = 0
+    n = len(text)
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            # Look back up to half a chunk for a natural break
+            for k in range(end, start + size // 2, -1):
+                if text[k - 1] in _CHUNK_BREAKS:
+                    end = k
+                    break
+        yield text[start:end]
+        start = end
+
+
+class FontMetricsEm:
+    """ Unhinted metrics of one family in em units, with a per-text advance cache """
+    def __init__(self, family):
+        font = QFont(family)
+        font.setPixelSize(REF_PX)
+        font.setHintingPreference(QFont.HintingPreference.PreferNoHinting)
+        self.family = font.family()
+        self.fm = QFontMetricsF(font)
+        self.ascent = self.fm.ascent() / REF_PX
+        self.height = self.fm.height() / REF_PX
+        self.advances = {}
+        # Pixels per point on the default paint device, for point-based outputs such as HTML
+        pt_font = QFont(family)
+        pt_font.setPointSize(REF_PX)
+        self.px_per_pt = QFontInfo(pt_font).pixelSize() / REF_PX
+
+    def advance(self, text):
+        em = self.advances.get(text)
+        if em is None:
+            em = self.advances[text] = self.fm.horizontalAdvance(text) / REF_PX
+        return em
+
+
+class Placement:
+    """ Geometry of a DisplayList at concrete font sizes.
+
+    widths, x, centers, x_h and x_p hold one value per pair (NumPy arrays
+    when NumPy is installed, lists otherwise); positions are relative to the
+    start of the pair's row. rows lists (start, end) index ranges.
+    """
+    __slots__ = ("widths", "x", "centers", "x_h", "x_p", "rows", "row_widths")
+
+    def __init__(self, widths, x, centers, x_h, x_p, rows, row_widths):
+        self.widths = widths
+        self.x = x
+        self.centers = centers
+        self.x_h = x_h
+        self.x_p = x_p
+        self.rows = rows
+        self.row_widths = row_widths
+
+    @property
+    def width(self):
+        return max(self.row_widths, default=0)
+
+
+def _break_rows(lefts, block_ends, max_width):
+    """ Greedy row breaks: each row takes the pairs that end within max_width of its first pair """
+    n = len(lefts)
+    if not max_width or not n:
+        return [(0, n)]
+    rows = []
+    start = 0
+    while start < n:
+        if np is not None and isinstance(block_ends, np.ndarray):
+            end = int(np.searchsorted(block_ends, lefts[start] + max_width, side="right"))
+        else:
+            end = start
+            limit = lefts[start] + max_width
+            while end < n and block_ends[end] <= limit:
+                end += 1
+        end = max(end, start + 1)
+        rows.append((start, end))
+        start = end
+    return rows
+
+
+def _place_numpy(em_h, em_p, size_h, size_p, spacing, max_width):
+    w_h = em_h * size_h
+    w_p = em_p * size_p
+    widths = np.maximum(w_h, w_p)
+    steps = widths + spacing
+    ends = np.cumsum(steps)
+    x = ends - steps
+    rows = _break_rows(x, ends - spacing, max_width)
+    if len(rows) > 1:
+        starts = np.fromiter((s for s, _ in rows), dtype=np.intp, count=len(rows))
+        lengths = np.fromiter((e - s for s, e in rows), dtype=np.intp, count=len(rows))
+        x = x - np.repeat(x[starts], lengths)
+    row_widths = [math.ceil(float(widths[s:e].sum())) + spacing * (e - s) for s, e in rows]
+    return Placement(widths, x, x + widths / 2, x + (widths - w_h) / 2, x + (widths - w_p) / 2, rows, row_widths)
+
+
+def _place_python(em_h, em_p, size_h, size_p, spacing, max_width):
+    w_h = [eh * size_h for eh in em_h]
+    w_p = [ep * size_p for ep in em_p]
+    widths = [max(a, b) for a, b in zip(w_h, w_p)]
+    x = []
+    block_ends = []
+    pos = 0.0
+    for bw in widths:
+        x.append(pos)
+        pos += bw + spacing
+        block_ends.append(pos - spacing)
+    rows = _break_rows(x, block_ends, max_width)
+    if len(rows) > 1:
+        x = [x[i] - x[s] for s, e in rows for i in range(s, e)]
+    row_widths = [math.ceil(sum(widths[s:e])) + spacing * (e - s) for s, e in rows]
+    centers = [left + bw / 2 for left, bw in zip(x, widths)]
+    x_h = [left + (bw - w) / 2 for left, bw, w in zip(x, widths, w_h)]
+    x_p = [left + (bw - w) / 2 for left, bw, w in zip(x, widths, w_p)]
+    return Placement(widths, x, centers, x_h, x_p, rows, row_widths)
+
+
+def _scale(values, factor):
+    if np is not None and isinstance(values, np.ndarray):
+        return values * factor
+    return [v * factor for v in values]
+
+
+def _ints(values):
+    """ Truncate positions to int pixels like int() did in the per-pair loops """
+    if np is not None and isinstance(values, np.ndarray):
+        return values.astype(np.int64).tolist()
+    return [int(v) for v in values]
+
+
+class DisplayList:
+    """ Resolution-independent layout of a PairStore.
+
+    Holds the advance of every hanzi and syllable in em, so the preview,
+    high-res image, SVG and HTML outputs place text at any size without
+    measuring fonts again. Colors are read from the PairStore at replay time.
+    """
+    __slots__ = ("metrics_h", "metrics_p", "em_h", "em_p")
+    # Bytes per advance held for one pair: a float64 each for hanzi and pinyin, or two list slots plus floats
+    PAIR_BYTES = 16 if np is not None else 64
+
+    def __init__(self, pairs, metrics_h, metrics_p):
+        self.metrics_h = metrics_h
+        self.metrics_p = metrics_p
+        em_h = [metrics_h.advance(ch) for ch in pairs.chars]
+        em_p = [metrics_p.advance(py) for py in pairs.syllables]
+        if np is not None:
+            em_h = np.array(em_h, dtype=np.float64)
+            em_p = np.array(em_p, dtype=np.float64)
+        self.em_h = em_h
+        self.em_p = em_p
+
+    def place(self, size_h, size_p, spacing=0, max_width=None):
+        """ Widths, centered text positions and row breaks for the given sizes in any unit """
+        if np is not None:
+            return _place_numpy(self.em_h, self.em_p, size_h, size_p, spacing, max_width)
+        return _place_python(self.em_h, self.em_p, size_h, size_p, spacing, max_width)
+
+    def place_python(self, size_h, size_p, spacing=0, max_width=None):
+        """ Per-pair loop version of place(), kept as the fallback and as a benchmark reference """
+        return _place_python(list(self.em_h), list(self.em_p), size_h, size_p, spacing, max_width)
+
+
+class Engine:
+    """ Headless conversion, layout and rendering shared by the UI and batch modes """
+    def __init__(self, font_hanzi="Microsoft YaHei", font_pinyin="Arial",
+                 size_hanzi=32, size_pinyin=18, color=None, phrases=None):
+        self.font_hanzi = font_hanzi
+        self.font_pinyin = font_pinyin
+        self.size_hanzi = size_hanzi
+        self.size_pinyin = size_pinyin
+        self.color = QColor(color) if color is not None else QColor(0, 0, 0)
+        # Optional PhraseDictionary whose readings take precedence over pypinyin
+        self.phrases = phrases
+        self._metrics = {}
+        self._display = (None, None)  # (key, DisplayList) of the last laid-out pairs
+        self.atlas = GlyphAtlas()
+
+    def convert(self, text):
+        """ One pair per Han character, plus one token with empty pinyin per run of other text """
+        pairs = PairStore()
+        color = self.color
+        token_at = {}  # text offset of each Han character -> index of its pair
+        pos = 0
+        # split() with a capturing group alternates other text (even) and Han runs (odd)
+        for k, part in enumerate(_HAN_RUNS.split(text)):
+            if not part:
+                continue
+            if k % 2:
+                raw = pinyin(part, style=Style.TONE)
+                if len(raw) != len(part):
+                    raw = [pinyin(ch, style=Style.TONE)[0] for ch in part]
+                for offset, (ch, py) in enumerate(zip(part, raw)):
+                    token_at[pos + offset] = len(pairs)
+                    pairs.append(ch, py[0], color)
+            else:
+                pairs.append(part, "", color)
+            pos += len(part)
+        if self.phrases:
+            for start, syllables in self.phrases.matches(text):
+                indices = [token_at.get(start + k) for k in range(len(syllables))]
+                if None in indices:
+                    continue
+                for index, py in zip(indices, syllables):
+                    pairs.set_pinyin(index, py)
+        return pairs
+
+    def fit_pinyin_size(self, pairs):
+        """ Largest pinyin point size whose syllables are not wider than their hanzi """
+        hanzi_size_pt = self.size_hanzi
+        font_h = QFont(self.font_hanzi)
+        font_h.setPointSize(hanzi_size_pt)
+        fm_h = QFontMetrics(font_h)
+
+        font_p = QFont(self.font_pinyin)
+        best_size = 8
+
+        for candidate in range(hanzi_size_pt, 7, -1):
+            font_p.setPointSize(candidate)
+            fm_p = QFontMetrics(font_p)
+
+            all_fit = True
+            for ch, py in zip(pairs.chars, pairs.syllables):
+                w_h = fm_h.horizontalAdvance(ch)
+                w_p = fm_p.horizontalAdvance(py)
+
+                if w_p > w_h:
+                    all_fit = False
+                    break
+
+            if all_fit:
+                best_size = candidate
+                break
+
+        return best_size
+
+    def metrics_entries(self):
+        return sum(len(m.advances) for m in self._metrics.values())
+
+    def clear_metrics(self):
+        """ Forget measured advances; returns how many were dropped """
+        entries = self.metrics_entries()
+        self._metrics = {}
+        self._display = (None, None)  # holds the old metrics objects
+        return entries
+
+    def layout_cache_bytes(self):
+        display = self._display[1]
+        return len(display.em_h) * DisplayList.PAIR_BYTES if display is not None else 0
+
+    def clear_layout_cache(self):
+        freed = self.layout_cache_bytes()
+        self._display = (None, None)
+        return freed
+
+    def metrics(self, family):
+        m = self._metrics.get(family)
+        if m is None:
+            m = self._metrics[family] = FontMetricsEm(family)
+        return m
+
+    def display_list(self, pairs):
+        """ Cached layout for pairs in the current fonts; rebuilt only when text or fonts change """
+        key = (pairs.layout_version, self.font_hanzi, self.font_pinyin)
+        cached_key, display = self._display
+        if cached_key != key:
+            display = DisplayList(pairs, self.metrics(self.font_hanzi), self.metrics(self.font_pinyin))
+            self._display = (key, display)
+        return display
+
+    def _place(self, pairs, scale, max_width=None):
+        """ Pixel geometry for raster and SVG output: (placement, line_height, y_pinyin, y_hanzi) """
+        display = self.display_list(pairs)
+        size_h = int(self.size_hanzi * scale)
+        size_p = int(self.size_pinyin * scale)
+        spacing = int(10 * scale)
+        placement = display.place(size_h, size_p, spacing, max_width * scale if max_width else None)
+        h_p = math.ceil(display.metrics_p.height * size_p)
+        h_h = math.ceil(display.metrics_h.height * size_h)
+        line_h = h_h + h_p + int(10 * scale)
+        y_py = display.metrics_p.ascent * size_p
+        y_hz = h_p + int(5 * scale) + display.metrics_h.ascent * size_h
+        return placement, line_h, y_py, y_hz
+
+    def image_size(self, pairs, scale=1.0, max_width=None):
+        """ (width, height) render() would produce, without rendering """
+        placement, line_h, _, _ = self._place(pairs, scale, max_width)
+        return placement.width, line_h * len(placement.rows)
+
+    def render(self, pairs, scale=1.0, max_width=None):
+        """ Image of pairs; max_width (in unscaled pixels) wraps them onto several rows """
+        for img in self.render_steps(pairs, scale, max_width):
+            pass
+        return img
+
+    def render_steps(self, pairs, scale=1.0, max_width=None, step=0):
+        """ render() in slices: yields None after every step texts painted (never if step is 0), then the image.
+
+        Layout is fixed when the generator starts, so pairs must not change
+        length until it is exhausted or dropped.
+        """
+        placement, line_h, y_py, y_hz = self._place(pairs, scale, max_width)
+
+        font_h = QFont(self.font_hanzi)
+        font_h.setPixelSize(int(self.size_hanzi * scale))
+        font_p = QFont(self.font_pinyin)
+        font_p.setPixelSize(int(self.size_pinyin * scale))
+
+        # Premultiplied like the atlas tiles, so blitting them is a plain copy-over (and Qt's fast path)
+        img = QImage(placement.width, line_h * len(placement.rows), QImage.Format.Format_ARGB32_Premultiplied)
+        img.fill(Qt.GlobalColor.transparent)
+
+        p = QPainter(img)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+
+        palette = pairs.palette
+        colors = pairs.color_ids
+        # One pass per text row so the painter switches fonts twice instead of twice per pair
+        passes = ((font_p, pairs.syllables, _ints(placement.x_p), int(y_py)),
+                  (font_h, pairs.chars, _ints(placement.x_h), int(y_hz)))
+        painted = 0
+        for font, texts, xs, baseline in passes:
+            atlas = font.pixelSize() >= MIN_PIXEL_SIZE
+            if atlas:
+                # Large text: blit cached runs instead of rasterizing every occurrence
+                draw_text = self.atlas.draw_text
+                font_key = font.key()
+            else:
+                p.setFont(font)
+            for row, (start, end) in enumerate(placement.rows):
+                y = baseline + row * line_h
+                for i in range(start, end):
+                    if not texts[i]:
+                        continue
+                    if atlas:
+                        draw_text(p, font, xs[i], y, texts[i], palette[colors[i]], font_key)
+                    else:
+                        p.setPen(palette[colors[i]])
+                        p.drawText(xs[i], y, texts[i])
+                    painted += 1
+                    if painted == step:
+                        painted = 0
+                        yield None
+
+        p.end()
+        yield img
+
+    def to_svg(self, pairs, scale=1.0, max_width=None):
+        """ Same layout as render() as a standalone SVG document with live text """
+        placement, line_h, y_py, y_hz = self._place(pairs, scale, max_width)
+        display = self.display_list(pairs)
+        size_h = int(self.size_hanzi * scale)
+        size_p = int(self.size_pinyin * scale)
+        color_names = [c.name() for c in pairs.palette]
+        centers = [f"{c:.1f}" for c in placement.centers]
+        total_w = placement.width
+        total_h = line_h * len(placement.rows)
+
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{total_w}" height="{total_h}" '
+                 f'viewBox="0 0 {total_w} {total_h}">']
+        for family, size, texts, baseline in ((display.metrics_p.family, size_p, pairs.syllables, y_py),
+                                              (display.metrics_h.family, size_h, pairs.chars, y_hz)):
+            parts.append(f'<g text-anchor="middle" font-family="{escape(family)}" font-size="{size}">')
+            for row, (start, end) in enumerate(placement.rows):
+                y = f"{baseline + row * line_h:.1f}"
+                for i in range(start, end):
+                    if not texts[i]:
+                        continue
+                    parts.append(f'<text x="{centers[i]}" y="{y}" fill="{color_names[pairs.color_ids[i]]}">'
+                                 f'{escape(texts[i])}</text>')
+            parts.append("</g>")
+        parts.append("</svg>")
+        return "".join(parts)
+
+    def to_html(self, pairs):
+        """ Build the two-row HTML table and its plain-text fallback """
+        size_h_pt = self.size_hanzi
+        size_p_pt = self.size_pinyin
+        display = self.display_list(pairs)
+        px_per_pt = display.metrics_h.px_per_pt
+
+        col_widths_pt = _ints(_scale(display.place(size_h_pt, size_p_pt).widths, px_per_pt * 0.9))
+
+        html = '<table border="0" cellpadding="0" cellspacing="0" style="border-collapse: collapse; border: none;"><tr>'
+
+        color_names = [c.name() for c in pairs.palette]
+
+        for i, (ch, py, cid) in enumerate(zip(pairs.chars, pairs.syllables, pairs.color_ids)):
+            width = col_widths_pt[i]
+            color = color_names[cid]
+            td_style = f"width: {width}pt; min-width: {width}pt; text-align: center; vertical-align: bottom; padding: 0;"
+            span_style = f"font-family: '{display.metrics_p.family}'; font-size: {size_p_pt}pt; color: {color}; line-height: 100%;"
+            html += f'<td width="{width}" style="{td_style}"><span style="{span_style}">{escape(py)}</span></td>'
+
+        html += "</tr><tr>"
+
+        for i, (ch, cid) in enumerate(zip(pairs.chars, pairs.color_ids)):
+            width = col_widths_pt[i]
+            color = color_names[cid]
+            td_style = f"width: {width}pt; min-width: {width}pt; text-align: center; vertical-align: top; padding: 0;"
+            span_style = f"font-family: '{display.metrics_h.family}'; font-size: {size_h_pt}pt; color: {color}; line-height: 100%;"
+            html += f'<td width="{width}" style="{td_style}"><span style="{span_style}">{escape(ch)}</span></td>'
+
+        html += "</tr></table>"
+
+        # Unannotated tokens stand in for themselves on the pinyin line
+        plain_py = " ".join(py or ch for ch, py in zip(pairs.chars, pairs.syllables))
+        plain_hz = "".join(pairs.chars)
+        plain_text = f"{plain_py}\n{plain_hz}"
+        return html, plain_text
+
+    @staticmethod
+    def encode_png(image):
+        ba = QByteArray()
+        buff = QBuffer(ba)
+        buff.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buff, "PNG")
+        return ba.data()
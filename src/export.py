@@ -0,0 +1,101 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .engine import Engine, HIGH_RES_SCALE, clean_text
+from .phrases import PhraseDictionary
+from .docx import export_docx
+
+# Per-process state, created once by _init_worker so fonts and dictionaries stay warm
+_worker_app = None
+_worker_engine = None
+
+
+def _init_worker(settings):
+    global _worker_app, _worker_engine
+    from PyQt6.QtGui import QGuiApplication
+    if QGuiApplication.instance() is None:
+        _worker_app = QGuiApplication(["PinyinHelper-export"])
+    _worker_engine = Engine(phrases=PhraseDictionary(), **settings)
+    # Touch pypinyin once so the phrase dictionaries are loaded before the first job
+    _worker_engine.convert("中")
+
+
+def _render_job(job):
+    text, scale, auto_fit, max_width = job
+    pairs = _worker_engine.convert(text)
+    if not pairs:
+        return b""
+    if auto_fit:
+        _worker_engine.size_pinyin = _worker_engine.fit_pinyin_size(pairs)
+    return Engine.encode_png(_worker_engine.render(pairs, scale, max_width))
+
+
+class BulkExporter:
+    """ Renders many texts to PNG files across a pool of worker processes """
+    def __init__(self, settings=None, workers=None, scale=HIGH_RES_SCALE, auto_fit=True, max_width=None):
+        self.settings = settings or {}
+        self.workers = workers or os.cpu_count() or 1
+        self.scale = scale
+        self.auto_fit = auto_fit
+        self.max_width = max_width
+
+    def export(self, texts, out_dir, name_format="{:05d}.png"):
+        """ Returns the written paths in input order; empty texts produce no file """
+        os.makedirs(out_dir, exist_ok=True)
+        jobs = [(text, self.scale, self.auto_fit, self.max_width) for text in texts]
+        # Spawn keeps workers independent of any Qt state in the parent process
+        ctx = multiprocessing.get_context("spawn")
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+
+        paths = []
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(self.settings,)) as pool:
+            for i, png_bytes in enumerate(pool.map(_render_job, jobs, chunksize=chunksize), 1):
+                if not png_bytes:
+                    paths.append(None)
+                    continue
+                path = os.path.join(out_dir, name_format.format(i))
+                with open(path, "wb") as f:
+                    f.write(png_bytes)
+                paths.append(path)
+        return paths
+
+
+def run_export(args, config):
+    """ Entry point for --export: one PNG per non-empty line of the input file """
+    settings = {
+        "font_hanzi": args.font_hanzi or config.get("favorite_fonts_hanzi", ["Microsoft YaHei"])[0],
+        "font_pinyin": args.font_pinyin or config.get("favorite_fonts_pinyin", ["Arial"])[0],
+        "size_hanzi": args.size,
+        "color": args.color,
+    }
+    if args.docx:
+        return run_docx_export(args, settings)
+    try:
+        with open(args.export, "r", encoding="utf-8-sig") as f:
+            texts = [clean_text(line) for line in f]
+    except Exception as e:
+        print(f"Error reading {args.export}: {e}")
+        return 1
+
+    exporter = BulkExporter(settings, workers=args.workers, scale=args.scale or HIGH_RES_SCALE, max_width=args.wrap)
+    paths = exporter.export(texts, args.out)
+    written = sum(1 for p in paths if p)
+    print(f"Exported {written} images to {args.out}")
+    return 0
+
+
+def run_docx_export(args, settings):
+    """ --export FILE --docx OUT: all lines as paragraphs of one Word document, streamed line by line """
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication(["PinyinHelper-export"])
+    engine = Engine(phrases=PhraseDictionary(), **settings)
+    try:
+        with open(args.export, "r", encoding="utf-8-sig") as f:
+            count = export_docx(engine, f, args.docx)
+    except OSError as e:
+        print(f"Error exporting {args.export}: {e}")
+        return 1
+    print(f"Exported {count} paragraphs to {args.docx}")
+    return 0
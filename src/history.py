@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import unicodedata
+
+from .utils import Utils
+from .pairs import PairStore
+
+MAX_ENTRIES = 5000
+MAX_BYTES = 20 * 1024 * 1024
+
+
+def toneless(text):
+    """ 'nǐ hǎo' -> 'nihao': lowercase, without tone marks or spaces, as pinyin is usually typed """
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch) and not ch.isspace())
+
+
+def search_pinyin(syllables):
+    """ Searchable pinyin of a conversion: the syllables with tone marks, then the toneless form """
+    toned = " ".join(filter(None, syllables))
+    return f"{toned} {toneless(toned)}" if toned else ""
+
+
+class HistoryEntry:
+    __slots__ = ("id", "text", "pairs", "font_hanzi", "font_pinyin", "size_hanzi", "size_pinyin", "used_at")
+
+    def __init__(self, row):
+        (self.id, self.text, data, self.font_hanzi, self.font_pinyin,
+         self.size_hanzi, self.size_pinyin, self.used_at) = row
+        self.pairs = PairStore.from_dict(json.loads(data))
+
+
+class HistoryStore:
+    """ On-disk history of finished conversions (SQLite), searchable by hanzi and pinyin """
+    _COLUMNS = "id, text, data, font_hanzi, font_pinyin, size_hanzi, size_pinyin, used_at"
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.path = path or os.path.join(Utils.app_data_dir(), "history.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(self.path)
+        self.has_fts = False
+        self._create_schema()
+
+    def _create_schema(self):
+        c = self.conn
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("""CREATE TABLE IF NOT EXISTS conversions (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE,
+            pinyin TEXT NOT NULL,
+            data TEXT NOT NULL,
+            font_hanzi TEXT, font_pinyin TEXT,
+            size_hanzi INTEGER, size_pinyin INTEGER,
+            bytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL)""")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_conversions_used ON conversions(used_at)")
+        try:
+            # Trigram tokenizer gives substring search for CJK text, which has no word breaks
+            c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS conversions_fts USING fts5(
+                text, pinyin, content='conversions', content_rowid='id', tokenize='trigram')""")
+            c.executescript("""
+                CREATE TRIGGER IF NOT EXISTS conversions_ai AFTER INSERT ON conversions BEGIN
+                    INSERT INTO conversions_fts(rowid, text, pinyin) VALUES (new.id, new.text, new.pinyin);
+                END;
+                CREATE TRIGGER IF NOT EXISTS conversions_ad AFTER DELETE ON conversions BEGIN
+                    INSERT INTO conversions_fts(conversions_fts, rowid, text, pinyin) VALUES ('delete', old.id, old.text, old.pinyin);
+                END;
+                CREATE TRIGGER IF NOT EXISTS conversions_au AFTER UPDATE ON conversions BEGIN
+                    INSERT INTO conversions_fts(conversions_fts, rowid, text, pinyin) VALUES ('delete', old.id, old.text, old.pinyin);
+                    INSERT INTO conversions_fts(rowid, text, pinyin) VALUES (new.id, new.text, new.pinyin);
+                END;""")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False  # SQLite built without FTS5 / trigram; fall back to LIKE
+        c.commit()
+
+    def record(self, text, pairs, font_hanzi, font_pinyin, size_hanzi, size_pinyin):
+        if not text or not pairs:
+            return
+        data = json.dumps(pairs.to_dict(), ensure_ascii=False)
+        pinyin = search_pinyin(pairs.syllables)
+        now = time.time()
+        try:
+            self.conn.execute("""INSERT INTO conversions
+                (text, pinyin, data, font_hanzi, font_pinyin, size_hanzi, size_pinyin, bytes, created_at, used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(text) DO UPDATE SET
+                    pinyin=excluded.pinyin, data=excluded.data,
+                    font_hanzi=excluded.font_hanzi, font_pinyin=excluded.font_pinyin,
+                    size_hanzi=excluded.size_hanzi, size_pinyin=excluded.size_pinyin,
+                    bytes=excluded.bytes, used_at=excluded.used_at""",
+                (text, pinyin, data, font_hanzi, font_pinyin, size_hanzi, size_pinyin,
+                 len(text.encode("utf-8")) + len(data.encode("utf-8")), now, now))
+            self.prune()
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving history: {e}")
+
+    def lookup(self, text, touch=True):
+        """ Finished annotation for exactly this text, or None; touch=False leaves the database untouched """
+        try:
+            row = self.conn.execute(f"SELECT {self._COLUMNS} FROM conversions WHERE text = ?", (text,)).fetchone()
+            if row is None:
+                return None
+            if touch:
+                self.conn.execute("UPDATE conversions SET used_at = ? WHERE id = ?", (time.time(), row[0]))
+                self.conn.commit()
+            return HistoryEntry(row)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            print(f"Error reading history: {e}")
+            return None
+
+    def search(self, query, limit=100):
+        """ Most recently used entries whose text or pinyin contains query; pinyin matches with or without tones """
+        query = query.strip()
+        # 'ni hao' and 'nǐhǎo' both find the toneless 'nihao'
+        plain = toneless(query) or query
+        try:
+            if not query:
+                rows = self.conn.execute(
+                    f"SELECT {self._COLUMNS} FROM conversions ORDER BY used_at DESC LIMIT ?", (limit,)).fetchall()
+            elif self.has_fts and len(query) >= 3 and len(plain) >= 3:
+                phrase = lambda q: '"' + q.replace('"', '""') + '"'
+                rows = self.conn.execute(
+                    f"""SELECT {', '.join('c.' + col.strip() for col in self._COLUMNS.split(','))}
+                        FROM conversions_fts f JOIN conversions c ON c.id = f.rowid
+                        WHERE conversions_fts MATCH ? ORDER BY c.used_at DESC LIMIT ?""",
+                    (f"{phrase(query)} OR pinyin : {phrase(plain)}", limit)).fetchall()
+            else:
+                like = lambda q: "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                rows = self.conn.execute(
+                    f"""SELECT {self._COLUMNS} FROM conversions
+                        WHERE text LIKE ? ESCAPE '\\' OR pinyin LIKE ? ESCAPE '\\' OR pinyin LIKE ? ESCAPE '\\'
+                        ORDER BY used_at DESC LIMIT ?""", (like(query), like(query), like(plain), limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching history: {e}")
+            return []
+        entries = []
+        for row in rows:
+            try:
+                entries.append(HistoryEntry(row))
+            except (ValueError, KeyError):
+                continue
+        return entries
+
+    def delete(self, entry_id):
+        self.conn.execute("DELETE FROM conversions WHERE id = ?", (entry_id,))
+        self.conn.commit()
+
+    def prune(self):
+        """ Drop least recently used entries beyond the entry and size caps """
+        c = self.conn
+        c.execute("""DELETE FROM conversions WHERE id IN (
+            SELECT id FROM conversions ORDER BY used_at DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+        total = c.execute("SELECT COALESCE(SUM(bytes), 0) FROM conversions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for entry_id, size in c.execute("SELECT id, bytes FROM conversions ORDER BY used_at ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((entry_id,))
+            total -= size
+        c.executemany("DELETE FROM conversions WHERE id = ?", doomed)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import getpass
+
+from PyQt6.QtCore import QObject, QLockFile, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+from .utils import Utils
+
+CONNECT_TIMEOUT_MS = 200
+# A resident instance that holds the lock may still be starting up; keep retrying this long
+STARTUP_WAIT_MS = 3000
+# Pause between attempts, spent waiting for the lock
+RETRY_INTERVAL_MS = 100
+LISTEN_ATTEMPTS = 3
+
+
+def server_name():
+    """ Per-user name, so two users on one machine each get their own resident instance """
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return f"PinyinHelper-{user}"
+
+
+def send_message(message, timeout_ms=CONNECT_TIMEOUT_MS):
+    """ Hand message to the resident instance; True once it has acknowledged it """
+    if os.name == "nt":
+        try:
+            # Let the resident instance bring its window to the front (ASFW_ANY)
+            import ctypes
+            ctypes.windll.user32.AllowSetForegroundWindow(-1)
+        except Exception:
+            pass
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    socket.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    ok = socket.waitForBytesWritten(timeout_ms) and socket.waitForReadyRead(timeout_ms * 5)
+    socket.disconnectFromServer()
+    return ok
+
+
+class InstanceServer(QObject):
+    """ Makes this process the resident instance and receives messages from later launches """
+    message_received = pyqtSignal(dict)
+
+    def __init__(self):
+        super().__init__()
+        self.lock = QLockFile(os.path.join(Utils.app_data_dir(), "instance.lock"))
+        # Only a dead holder makes the lock stale; a long-running resident instance keeps it
+        self.lock.setStaleLockTime(0)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}
+
+    def acquire(self, message):
+        """ True if this process should keep running as the resident instance.
+
+        When another process already holds the lock, message is forwarded to
+        it (waiting out its startup) and False is returned. If the holder
+        never answers, False is returned as well: a second resident instance
+        would install a second hotkey hook and tray icon.
+        """
+        deadline = time.monotonic() + STARTUP_WAIT_MS / 1000
+        while not self.lock.tryLock(RETRY_INTERVAL_MS):
+            if send_message(message):
+                return False
+            if time.monotonic() >= deadline:
+                print("Another instance holds the lock but is not responding; not starting a second one")
+                return False
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        for attempt in range(LISTEN_ATTEMPTS):
+            # We hold the lock, so any existing endpoint is left over from a crash
+            QLocalServer.removeServer(server_name())
+            if self.server.listen(server_name()):
+                break
+            time.sleep(RETRY_INTERVAL_MS / 1000)
+        else:
+            # Still the resident instance; later launches just cannot forward to it
+            print(f"Failed to listen for other instances: {self.server.errorString()}")
+        return True
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket):
+        data = self._buffers.get(socket, b"") + bytes(socket.readAll())
+        while b"\n" in data:
+            line, data = data.split(b"\n", 1)
+            try:
+                message = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            socket.write(b"ok\n")
+            socket.flush()
+            if isinstance(message, dict):
+                self.message_received.emit(message)
+        self._buffers[socket] = data
+
+    def _on_disconnected(self, socket):
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def close(self):
+        self.server.close()
+        self.lock.unlock()
@@ -15,6 +15,10 @@ class GlobalHotKeyMonitor(QObject):
         super().__init__()
         self.last_c_time = 0
         self.listener = None
+        # perf_counter() of the last Ctrl+X that triggered a quick replace, for round-trip timing
+        self.replace_pressed_at = None
+        # Optional SessionRecorder that receives every hotkey press
+        self.recorder = None
 
     def start(self):
         try:
@@ -36,6 +40,8 @@ class GlobalHotKeyMonitor(QObject):
                 pass
 
     def on_ctrl_c(self):
+        if self.recorder is not None:
+            self.recorder.key("ctrl_c")
         current_time = time.time()
         if (current_time - self.last_c_time) < 0.6:
             self.activated.emit()
@@ -45,7 +51,10 @@ class GlobalHotKeyMonitor(QObject):
             self.ctrl_c_pressed.emit()
 
     def on_ctrl_x(self):
+        if self.recorder is not None:
+            self.recorder.key("ctrl_x")
         current_time = time.time()
         if (current_time - self.last_c_time) < 0.6:
+            self.replace_pressed_at = time.perf_counter()
             self.activated_replace.emit()
             self.last_c_time = 0
@@ -1,14 +1,67 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from .ui import MainWindow
+import argparse
+
+from .utils import ConfigManager
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="PinyinHelper")
+    parser.add_argument("--export", metavar="FILE", help="render each line of FILE to a PNG and exit")
+    parser.add_argument("--docx", metavar="OUT", help="with --export, write one Word document with ruby pinyin to OUT")
+    parser.add_argument("--watch", metavar="DIR", help="keep PNG/HTML annotations of DIR/*.txt up to date in --out")
+    parser.add_argument("--out", default="export", help="output directory for --export and --watch")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--scale", type=float, default=None, help="render scale for --export (default: 6.0)")
+    parser.add_argument("--wrap", type=int, default=None, metavar="PX",
+                        help="wrap --export images into rows at most PX wide (before scaling)")
+    parser.add_argument("--size", type=int, default=32, help="hanzi font size")
+    parser.add_argument("--font-hanzi", default=None, help="hanzi font family")
+    parser.add_argument("--font-pinyin", default=None, help="pinyin font family")
+    parser.add_argument("--color", default="#000000", help="text color")
+    parser.add_argument("--serve", action="store_true", help="run the localhost conversion service")
+    parser.add_argument("--port", type=int, default=8765, help="port for --serve")
+    parser.add_argument("--max-pending", type=int, default=32, help="requests in flight before --serve answers 503")
+    parser.add_argument("--analyze", metavar="TEXT", default=None, help="open the window and analyze TEXT")
+    # Unknown arguments are passed through to Qt
+    return parser.parse_known_args(argv)
+
 
 def main():
-    app = QApplication(sys.argv)
-    
+    args, qt_args = parse_args(sys.argv[1:])
+
+    if args.export:
+        from .export import run_export
+        sys.exit(run_export(args, ConfigManager()))
+    if args.watch:
+        from .watch import run_watch
+        sys.exit(run_watch(args, ConfigManager()))
+    if args.serve:
+        from .service import run_service
+        sys.exit(run_service(args, ConfigManager()))
+
+    # QLocalSocket needs the application's event dispatcher, so it exists before anything is forwarded
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    # A second launch hands its request to the resident instance and exits
+    from .instance import InstanceServer, send_message
+    message = {"command": "analyze", "text": args.analyze} if args.analyze else {"command": "show"}
+    if send_message(message):
+        sys.exit(0)
+
+    instance = InstanceServer()
+    if not instance.acquire(message):
+        sys.exit(0)
+
+    from .ui import MainWindow
     window = MainWindow()
-    
+    instance.message_received.connect(window.handle_instance_message)
+    app.aboutToQuit.connect(instance.close)
+
     window.show()
-    
+    if args.analyze:
+        window.handle_instance_message(message)
+
     sys.exit(app.exec())
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+import math
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+DEFAULT_BUDGET_MB = 256
+CHECK_INTERVAL_MS = 5000
+# Rough per-entry cost of a FontMetricsEm advance (str key, float, dict slot)
+ADVANCE_ENTRY_BYTES = 150
+# Measured RSS per PairWidget in the editor, Python wrapper and Qt private data included
+WIDGET_BYTES = 16 * 1024
+# A high-res copy holds the QImage, a QPixmap copy of it and the encoded PNG at once
+IMAGE_COPIES = 2.5
+# One release step shrinks the preview at most to this fraction, and never below this height
+MIN_PREVIEW_FACTOR = 0.25
+MIN_PREVIEW_HEIGHT = 24
+
+# Release order under pressure: cheapest to rebuild first
+PRIORITY_ATLAS = 0
+PRIORITY_LAYOUT = 1
+PRIORITY_METRICS = 2
+PRIORITY_PREVIEW = 3
+
+
+class Consumer:
+    __slots__ = ("name", "usage", "release", "priority")
+
+    def __init__(self, name, usage, release, priority):
+        self.name = name
+        self.usage = usage
+        self.release = release
+        self.priority = priority
+
+
+class MemoryGovernor(QObject):
+    """ One memory budget for the app's caches, images and widgets.
+
+    Consumers report their approximate size in bytes; those that can give
+    memory back also take a release(excess) callback returning the bytes
+    freed. When the total is over budget, releasable consumers are asked in
+    priority order (caches first, the preview last) until it fits again.
+    Editor widgets and the window are reported but never released.
+    """
+    def __init__(self, budget_bytes, interval_ms=CHECK_INTERVAL_MS):
+        super().__init__()
+        self.budget = budget_bytes
+        self.consumers = []
+        self.releases = 0
+        self.released_bytes = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.check)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def register(self, name, usage, release=None, priority=0):
+        """ usage() -> bytes; release(excess) -> bytes freed, or None if the consumer cannot shrink """
+        self.consumers.append(Consumer(name, usage, release, priority))
+
+    def register_engine(self, engine):
+        """ Account an Engine's glyph atlas, layout cache and font metrics """
+        self.register("glyph atlas", lambda: engine.atlas.bytes, engine.atlas.release, PRIORITY_ATLAS)
+        self.register("layout cache", engine.layout_cache_bytes,
+                      lambda excess: engine.clear_layout_cache(), PRIORITY_LAYOUT)
+        self.register("font metrics", lambda: engine.metrics_entries() * ADVANCE_ENTRY_BYTES,
+                      lambda excess: engine.clear_metrics() * ADVANCE_ENTRY_BYTES, PRIORITY_METRICS)
+
+    def usage(self):
+        """ {consumer name: bytes}, consumers registered under the same name added up """
+        totals = {}
+        for c in self.consumers:
+            totals[c.name] = totals.get(c.name, 0) + c.usage()
+        return totals
+
+    def total(self):
+        return sum(c.usage() for c in self.consumers)
+
+    def headroom(self):
+        return self.budget - self.total()
+
+    def fixed(self):
+        """ Bytes held by consumers that cannot shrink """
+        return sum(c.usage() for c in self.consumers if c.release is None)
+
+    def check(self, extra=0):
+        """ Release memory until the total plus extra fits the budget; returns the bytes freed.
+
+        When what cannot shrink already fills the budget, nothing is released:
+        emptying the caches could not make it fit, they would only be rebuilt
+        and emptied again on every check. An extra that does not fit even then
+        still gets what the caches can give, since fit_scale() scales down
+        against the headroom that is left.
+        """
+        if self.fixed() >= self.budget:
+            return 0
+        excess = self.total() + extra - self.budget
+        if excess <= 0:
+            return 0
+        freed = 0
+        for c in sorted(self.consumers, key=lambda c: c.priority):
+            if c.release is None:
+                continue
+            got = c.release(excess - freed) or 0
+            if got:
+                freed += got
+                self.releases += 1
+            if freed >= excess:
+                break
+        self.released_bytes += freed
+        return freed
+
+    def fit_scale(self, image_size, scale, min_scale=1.0):
+        """ Largest scale <= scale whose image fits the headroom left after releasing caches.
+
+        image_size(scale) -> (width, height) in pixels. Never goes below
+        min_scale, so an export always happens, just less sharp.
+        """
+        w, h = image_size(scale)
+        need = w * h * 4 * IMAGE_COPIES
+        if need <= self.headroom():
+            return scale
+        self.check(need)
+        headroom = max(self.headroom(), 0)
+        if need <= headroom:
+            return scale
+        # Image bytes grow with the square of the scale
+        fitted = scale * math.sqrt(headroom / need) if need else scale
+        return max(min_scale, min(scale, math.floor(fitted * 4) / 4))
+
+    def summary(self):
+        usage = self.usage()
+        total = sum(usage.values())
+        lines = [f"Memory: {total / 2**20:.1f} of {self.budget / 2**20:.0f} MB budget"
+                 f" ({self.releases} releases, {self.released_bytes / 2**20:.1f} MB freed)"]
+        if self.fixed() >= self.budget:
+            lines.append("  editor and window alone exceed the budget; caches are left alone")
+        for name, size in sorted(usage.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {name:<16}{size / 2**20:>9.1f} MB")
+        return "\n".join(lines)
+
+
+def pixmap_bytes(pixmap):
+    if pixmap is None or pixmap.isNull():
+        return 0
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+def shrink_label_pixmap(label, excess):
+    """ Downscale a QLabel's pixmap to give back about excess bytes; returns the bytes freed """
+    pixmap = label.pixmap()
+    before = pixmap_bytes(pixmap)
+    if not before:
+        return 0
+    factor = max(MIN_PREVIEW_FACTOR, MIN_PREVIEW_HEIGHT / pixmap.height(),
+                 math.sqrt(max(before - excess, 0) / before))
+    width = int(pixmap.width() * factor)
+    if factor >= 1.0 or width >= pixmap.width():
+        return 0
+    label.setPixmap(pixmap.scaledToWidth(max(1, width), Qt.TransformationMode.SmoothTransformation))
+    return max(0, before - pixmap_bytes(label.pixmap()))
@@ -0,0 +1,110 @@
+import sys
+import itertools
+from array import array
+
+from PyQt6.QtGui import QColor
+
+# Shared across all stores so (layout_version, fonts) identifies a layout without holding the store
+_layout_versions = itertools.count(1)
+
+
+class PairStore:
+    """ Compact struct-of-arrays storage for (hanzi, pinyin, color) pairs.
+
+    Syllables are interned and colors live in a small palette referenced by
+    index, so long documents hold one QColor per distinct color instead of
+    one per character. layout_version changes whenever chars or syllables do
+    (colors do not affect layout), which lets the engine cache display lists.
+    """
+    __slots__ = ("chars", "syllables", "color_ids", "palette", "_palette_lookup", "layout_version")
+
+    def __init__(self):
+        self.chars = []
+        self.syllables = []
+        self.color_ids = array("H")
+        self.palette = []
+        self._palette_lookup = {}
+        self.layout_version = next(_layout_versions)
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __iter__(self):
+        """ Yields (ch, py, color) tuples """
+        palette = self.palette
+        for ch, py, cid in zip(self.chars, self.syllables, self.color_ids):
+            yield ch, py, palette[cid]
+
+    def color_id(self, color):
+        """ Palette index for color, adding it on first use """
+        key = color.rgba()
+        cid = self._palette_lookup.get(key)
+        if cid is None:
+            cid = len(self.palette)
+            self.palette.append(QColor(color))
+            self._palette_lookup[key] = cid
+        return cid
+
+    def append(self, ch, py, color):
+        self.chars.append(ch)
+        self.syllables.append(sys.intern(py))
+        self.color_ids.append(self.color_id(color))
+        self.layout_version = next(_layout_versions)
+
+    def extend(self, other):
+        """ Append all pairs of another store, remapping its palette into this one """
+        remap = [self.color_id(c) for c in other.palette]
+        self.chars.extend(other.chars)
+        self.syllables.extend(other.syllables)
+        self.color_ids.extend(remap[cid] for cid in other.color_ids)
+        self.layout_version = next(_layout_versions)
+
+    def color_at(self, index):
+        return self.palette[self.color_ids[index]]
+
+    def set_pinyin(self, index, py):
+        self.syllables[index] = sys.intern(py)
+        self.layout_version = next(_layout_versions)
+
+    def set_color(self, index, color):
+        self.color_ids[index] = self.color_id(color)
+
+    def fill_color(self, color):
+        """ Recolor every pair and drop palette entries that are no longer used """
+        self.palette = []
+        self._palette_lookup = {}
+        cid = self.color_id(color)
+        self.color_ids = array("H", [cid]) * len(self.chars)
+
+    def copy(self):
+        """ Cheap snapshot, e.g. for rendering off the GUI thread """
+        other = PairStore()
+        other.chars = self.chars[:]
+        other.syllables = self.syllables[:]
+        other.color_ids = array("H", self.color_ids)
+        other.palette = self.palette[:]
+        other._palette_lookup = dict(self._palette_lookup)
+        other.layout_version = self.layout_version
+        return other
+
+    def to_dict(self):
+        """ JSON-friendly form; colors keep their alpha channel """
+        return {
+            "chars": self.chars,
+            "syllables": self.syllables,
+            "palette": [c.name(QColor.NameFormat.HexArgb) for c in self.palette],
+            "colors": list(self.color_ids),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        store.chars = list(data["chars"])
+        store.syllables = [sys.intern(py) for py in data["syllables"]]
+        for name in data["palette"]:
+            store.color_id(QColor(name))
+        store.color_ids = array("H", data["colors"])
+        store.layout_version = next(_layout_versions)
+        if not (len(store.chars) == len(store.syllables) == len(store.color_ids)):
+            raise ValueError("Inconsistent pair data")
+        return store
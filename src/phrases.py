@@ -0,0 +1,135 @@
+import os
+import json
+
+from .utils import Utils
+
+# Marks the end of a phrase inside a trie node; never a valid character key
+_END = ""
+
+
+class PhraseDictionary:
+    """ User pinyin overrides for whole phrases, matched longest-first with a trie.
+
+    Stored as {"phrase": ["syl1", "syl2", ...]} in user_phrases.json.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Utils.app_data_dir(), "user_phrases.json")
+        self.phrases = {}
+        self.root = {}
+        self.load()
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for phrase, syllables in data.items():
+                self._insert(phrase, syllables)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading user phrases: {e}")
+
+    def save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.phrases, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            print(f"Error saving user phrases: {e}")
+
+    def _insert(self, phrase, syllables):
+        if not phrase or len(phrase) != len(syllables):
+            return False
+        syllables = list(syllables)
+        node = self.root
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[_END] = syllables
+        self.phrases[phrase] = syllables
+        return True
+
+    def add(self, phrase, syllables, save=True):
+        """ Add or replace a phrase; syllables must have one entry per character """
+        ok = self._insert(phrase, syllables)
+        if ok and save:
+            self.save()
+        return ok
+
+    def remove(self, phrase):
+        if self.phrases.pop(phrase, None) is None:
+            return
+        # Rebuild instead of pruning; the dictionary is small and removals are rare
+        self.root = {}
+        phrases, self.phrases = self.phrases, {}
+        for p, s in phrases.items():
+            self._insert(p, s)
+        self.save()
+
+    def import_file(self, path):
+        """ Import 'phrase<TAB or space>syl1 syl2 ...' lines; returns the number imported """
+        count = 0
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                parts = line.strip().split()
+                if len(parts) < 2 or parts[0].startswith("#"):
+                    continue
+                phrase, syllables = parts[0], parts[1:]
+                if self._insert(phrase, syllables):
+                    count += 1
+        if count:
+            self.save()
+        return count
+
+    def matches(self, text):
+        """ Yields (start, syllables) for non-overlapping longest matches, left to right """
+        root = self.root
+        if not root:
+            return
+        i = 0
+        n = len(text)
+        while i < n:
+            node = root.get(text[i])
+            if node is None:
+                i += 1
+                continue
+            best = None
+            j = i
+            while node is not None:
+                j += 1
+                if _END in node:
+                    best = (j, node[_END])
+                node = node.get(text[j]) if j < n else None
+            if best:
+                yield i, best[1]
+                i = best[0]
+            else:
+                i += 1
+
+    def learn_correction(self, text, index, syllables):
+        """ Remember a corrected reading together with the word around it.
+
+        The word is taken from pypinyin's own segmentation; a single-character
+        word is widened with a neighbour so one fix does not change the
+        character everywhere.
+        """
+        from pypinyin.seg.mmseg import seg
+
+        start = 0
+        for word in seg.cut(text):
+            end = start + len(word)
+            if start <= index < end:
+                break
+            start = end
+        else:
+            return None
+        if end - start == 1:
+            if start > 0 and "一" <= text[start - 1] <= "鿿":
+                start -= 1
+            elif end < len(text) and "一" <= text[end] <= "鿿":
+                end += 1
+        phrase = text[start:end]
+        if self.add(phrase, syllables[start:end]):
+            return phrase
+        return None
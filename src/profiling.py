@@ -0,0 +1,156 @@
+import os
+import io
+import time
+import pstats
+import inspect
+import cProfile
+import functools
+from collections import deque
+
+from .utils import Utils
+
+PROFILE_ENV = "PINYIN_HELPER_PROFILE"
+MAX_PROFILE_FILES = 10
+
+
+class SlotStats:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class RoundTripTimer:
+    """ Always-on wall-clock samples of one user-visible operation, cheap enough to keep enabled """
+    def __init__(self, name, keep=100):
+        self.name = name
+        self.samples = deque(maxlen=keep)
+
+    def record(self, elapsed):
+        self.samples.append(elapsed)
+
+    def summary(self):
+        if not self.samples:
+            return ""
+        ordered = sorted(self.samples)
+        median = ordered[len(ordered) // 2]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"{self.name}: last {self.samples[-1] * 1000:.1f} ms, median {median * 1000:.1f} ms, "
+                f"p95 {p95 * 1000:.1f} ms (n={len(ordered)})")
+
+
+class Profiler:
+    """ Opt-in profiler for the UI hot paths.
+
+    Every @profiled slot keeps cumulative call counts and timings while
+    enabled; the outermost profiled call additionally runs under cProfile,
+    whose stats are written once per session to a rotating set of files.
+    """
+    def __init__(self, max_files=MAX_PROFILE_FILES):
+        self.enabled = False
+        self.max_files = max_files
+        self.stats = {}
+        self.profile = None
+        self.session_path = None
+        self._depth = 0
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        if enabled:
+            self.profile = cProfile.Profile()
+            self.session_path = os.path.join(
+                Utils.app_data_dir("profiles"), time.strftime("session-%Y%m%d-%H%M%S.pstats"))
+            self.enabled = True
+        else:
+            self.enabled = False
+            self.dump()
+            self.profile = None
+
+    def call(self, name, func, args, kwargs):
+        start = time.perf_counter()
+        outermost = self._depth == 0 and self.profile is not None
+        self._depth += 1
+        try:
+            if outermost:
+                return self.profile.runcall(func, *args, **kwargs)
+            return func(*args, **kwargs)
+        finally:
+            self._depth -= 1
+            elapsed = time.perf_counter() - start
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = SlotStats()
+            s.calls += 1
+            s.total += elapsed
+            s.max = max(s.max, elapsed)
+
+    def dump(self):
+        """ Write the session's cProfile stats and rotate old files """
+        if self.profile is None or not self.session_path:
+            return None
+        try:
+            self.profile.dump_stats(self.session_path)
+            self._rotate(os.path.dirname(self.session_path))
+            return self.session_path
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+            return None
+
+    def _rotate(self, folder):
+        files = sorted(f for f in os.listdir(folder) if f.endswith(".pstats"))
+        for name in files[:-self.max_files]:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+    def summary(self):
+        """ Human-readable table of per-slot timings """
+        lines = [f"{'slot':<36}{'calls':>7}{'total ms':>11}{'avg ms':>9}{'max ms':>9}"]
+        for name, s in sorted(self.stats.items(), key=lambda kv: -kv[1].total):
+            avg = s.total / s.calls if s.calls else 0.0
+            lines.append(f"{name:<36}{s.calls:>7}{s.total * 1000:>11.1f}{avg * 1000:>9.1f}{s.max * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def top_functions(self, limit=15):
+        """ Top functions by cumulative time from the current cProfile session """
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        try:
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        except TypeError:
+            return ""  # nothing recorded yet
+        return out.getvalue()
+
+
+profiler = Profiler()
+quick_replace_timer = RoundTripTimer("quick replace (Ctrl+X to paste)")
+if os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+    profiler.set_enabled(True)
+
+
+def profiled(func):
+    """ Decorator for slots; costs a single flag check while profiling is off """
+    name = func.__qualname__
+    try:
+        params = inspect.signature(func).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in params):
+            max_args = None
+        else:
+            max_args = sum(1 for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+    except (TypeError, ValueError):
+        max_args = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Qt passes every signal argument to Python callables; drop the ones the slot does not take
+        if max_args is not None and len(args) > max_args:
+            args = args[:max_args]
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        return profiler.call(name, func, args, kwargs)
+    return wrapper
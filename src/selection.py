@@ -0,0 +1,241 @@
+import re
+import time
+
+from PyQt6.QtGui import QColor
+
+try:
+    import win32com.client
+    import pythoncom
+except ImportError:
+    win32com = None
+    pythoncom = None
+
+# Probed in this order until one of them has answered
+COM_PROG_IDS = ("KWPP.Application", "PowerPoint.Application")
+# A source is skipped after this many failures in a row, for a TTL that doubles up to the maximum
+FAILURES_BEFORE_SKIP = 2
+SKIP_TTL = 5.0
+MAX_SKIP_TTL = 60.0
+
+_HTML_SIZE_RE = re.compile(r'(?:mso-ansi-)?font-size:\s*(\d+(?:\.\d+)?)\s*(pt|px)')
+_HTML_FONT_RE = re.compile(r'<font[^>]+size=["\']?(\d+)["\']?', re.IGNORECASE)
+_HTML_TO_PT = {1: 8, 2: 10, 3: 12, 4: 14, 5: 18, 6: 24, 7: 36}
+
+
+class SourceUnavailable(Exception):
+    """ Raised by a source that cannot be reached at all (application not running) """
+
+
+class SelectionSource:
+    """ One place the font size, per-character colors and font of the copied selection can come from.
+
+    query() returns {"size", "colors", "font_name"}, None when the source is
+    reachable but has nothing to report, or raises SourceUnavailable.
+    Fallback sources are always asked last and never become the preferred
+    one; sources that are not safe_to_prefetch are skipped while the
+    clipboard may still hold the previous copy.
+    """
+    name = "source"
+    fallback = False
+    safe_to_prefetch = True
+
+    def query(self):
+        raise NotImplementedError
+
+
+class ComSelectionSource(SelectionSource):
+    """ Text selection of a running presentation application, via its COM ProgID """
+    def __init__(self, prog_id):
+        self.prog_id = prog_id
+        self.name = prog_id
+
+    def query(self):
+        try:
+            pythoncom.CoInitialize()
+        except Exception:
+            pass
+        try:
+            app = win32com.client.GetActiveObject(self.prog_id)
+        except Exception as e:
+            raise SourceUnavailable(self.prog_id) from e
+        try:
+            sel = app.ActiveWindow.Selection
+            if sel.Type != 3:  # ppSelectionText
+                return None
+            text_range = sel.TextRange
+            size = text_range.Font.Size
+            if not size or not (8 <= size <= 300):
+                size = 32
+
+            colors = []
+            count = text_range.Characters().Count
+            for i in range(1, count + 1):
+                try:
+                    rgb_bgr = text_range.Characters(i, 1).Font.Color.RGB
+                    r = rgb_bgr & 0xFF
+                    g = (rgb_bgr >> 8) & 0xFF
+                    b = (rgb_bgr >> 16) & 0xFF
+                    colors.append(QColor(r, g, b))
+                except Exception:
+                    colors.append(QColor(0, 0, 0))
+
+            return {"size": int(size), "colors": colors, "font_name": text_range.Font.Name}
+        except Exception:
+            # Running, but no window or no usable selection
+            return None
+
+
+class ClipboardHtmlSource(SelectionSource):
+    """ Font size hint from the HTML flavor of the clipboard; no colors or font name """
+    name = "clipboard HTML"
+    fallback = True
+    safe_to_prefetch = False
+
+    def __init__(self, clipboard):
+        self.clipboard = clipboard
+
+    def query(self):
+        mime = self.clipboard.mimeData()
+        if mime is None or not mime.hasHtml():
+            return None
+        size = html_font_size(mime.html())
+        if size is None:
+            return None
+        return {"size": size, "colors": None, "font_name": None}
+
+
+class FakeSource(SelectionSource):
+    """ Fixed answer after a fixed delay, for tests and benchmarks; available=False fails like a closed app """
+    def __init__(self, name, info=None, delay=0.0, available=True, fallback=False):
+        self.name = name
+        self.info = info
+        self.delay = delay
+        self.available = available
+        self.fallback = fallback
+        self.queries = 0
+
+    def query(self):
+        self.queries += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if not self.available:
+            raise SourceUnavailable(self.name)
+        return self.info
+
+
+def html_font_size(html):
+    """ Point size from CSS font-size or a <font size> tag, if within 8..300 """
+    val = None
+    match = _HTML_SIZE_RE.search(html)
+    if match:
+        val = float(match.group(1))
+        if match.group(2) == "px":
+            val = val * 0.75
+    if val is None:
+        match = _HTML_FONT_RE.search(html)
+        if match:
+            val = _HTML_TO_PT.get(int(match.group(1)), 12)
+    if val is not None and 8 <= val <= 300:
+        return int(val)
+    return None
+
+
+class SourceStats:
+    __slots__ = ("calls", "hits", "failures", "skipped", "streak", "skip_until", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.failures = 0
+        self.skipped = 0
+        self.streak = 0
+        self.skip_until = 0.0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class SelectionRegistry:
+    """ Asks selection sources in turn, starting with the one that answered last.
+
+    Callable like a plain selection source, so the recording and replay
+    wrappers in sessions.py work unchanged. A source that keeps failing is
+    skipped for a while instead of paying a cross-process probe on every
+    activation; one success clears its record.
+    """
+    def __init__(self, sources=()):
+        self.sources = []
+        self.stats = {}
+        self.preferred = None
+        for source in sources:
+            self.register(source)
+
+    def register(self, source):
+        self.sources.append(source)
+        self.stats[source.name] = SourceStats()
+
+    def order(self):
+        """ Preferred source first, then registration order; fallbacks last """
+        ordered = sorted(self.sources, key=lambda s: s.fallback)
+        if self.preferred in ordered:
+            ordered.remove(self.preferred)
+            ordered.insert(0, self.preferred)
+        return ordered
+
+    def __call__(self, prefetch=False):
+        now = time.monotonic()
+        for source in self.order():
+            if prefetch and not source.safe_to_prefetch:
+                continue
+            stats = self.stats[source.name]
+            if stats.skip_until > now:
+                stats.skipped += 1
+                continue
+            start = time.perf_counter()
+            try:
+                info = source.query()
+                failed = False
+            except Exception:
+                info = None
+                failed = True
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if failed:
+                stats.failures += 1
+                stats.streak += 1
+                if stats.streak >= FAILURES_BEFORE_SKIP:
+                    ttl = SKIP_TTL * 2 ** (stats.streak - FAILURES_BEFORE_SKIP)
+                    stats.skip_until = now + min(ttl, MAX_SKIP_TTL)
+                continue
+            stats.streak = 0
+            stats.skip_until = 0.0
+            if info:
+                stats.hits += 1
+                if not source.fallback:
+                    self.preferred = source
+                return info
+        return None
+
+    def summary(self):
+        if not any(s.calls or s.skipped for s in self.stats.values()):
+            return ""
+        now = time.monotonic()
+        lines = ["Selection sources:"]
+        for source in self.order():
+            s = self.stats[source.name]
+            mean = s.total / s.calls * 1000 if s.calls else 0.0
+            line = (f"  {source.name:<24}{s.calls:>5} calls {s.hits:>5} hits {s.failures:>5} failed"
+                    f" {s.skipped:>5} skipped   mean {mean:.1f} ms  max {s.max * 1000:.1f} ms")
+            if s.skip_until > now:
+                line += f"  (skipped for {s.skip_until - now:.0f} s)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def default_registry(clipboard):
+    """ COM applications where available, then the clipboard HTML size hint """
+    sources = [ComSelectionSource(prog_id) for prog_id in COM_PROG_IDS] if win32com else []
+    sources.append(ClipboardHtmlSource(clipboard))
+    return SelectionRegistry(sources)
@@ -0,0 +1,297 @@
+import json
+import http.client
+import time
+import base64
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import Engine, HIGH_RES_SCALE, MIN_SIZE_HANZI, MAX_SIZE_HANZI, MIN_SCALE
+from .phrases import PhraseDictionary
+
+DEFAULT_PORT = 8765
+# Engine settings a request may override; restored after every job so they never leak into the next one
+REQUEST_SETTINGS = ("size_hanzi", "size_pinyin")
+
+
+class EndpointStats:
+    """ Rolling latency statistics for one endpoint """
+    def __init__(self, window=1000):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds, ok=True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def as_dict(self):
+        recent = sorted(self.recent)
+        def pct(q):
+            return recent[min(len(recent) - 1, int(len(recent) * q))] * 1000 if recent else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": self.max * 1000,
+        }
+
+
+class ConversionService:
+    """ Localhost HTTP endpoint exposing text->pairs/HTML/PNG from one warm engine """
+    def __init__(self, engine, host="127.0.0.1", port=DEFAULT_PORT, max_pending=32):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.pending = 0
+        # Qt font and painter state is not shared between threads, so all engine work is serialized
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine")
+        self.stats = {}
+        self.server = None
+        self.routes = {
+            "/pairs": self._job_pairs,
+            "/html": self._job_html,
+            "/png": self._job_png,
+            "/svg": self._job_svg,
+        }
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving on http://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, content_type, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, content_type, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?", 1)[0], headers, body
+
+    def _write_response(self, writer, status, content_type, payload, keep_alive):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   500: "Internal Server Error", 503: "Service Unavailable"}
+        head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+
+    async def _dispatch(self, method, path, body):
+        if path == "/metrics" and method == "GET":
+            return 200, "application/json", self._json(self.metrics())
+        job = self.routes.get(path)
+        if job is None:
+            return 404, "application/json", self._json({"error": "unknown endpoint"})
+        if method != "POST":
+            return 405, "application/json", self._json({"error": "use POST"})
+
+        try:
+            request = json.loads(body.decode("utf-8") or "{}")
+        except ValueError as e:
+            return 400, "application/json", self._json({"error": f"invalid JSON: {e}"})
+
+        # Backpressure: refuse instead of queueing without bound
+        if self.pending >= self.max_pending:
+            return 503, "application/json", self._json({"error": "busy, retry later"})
+
+        started = time.perf_counter()
+        self.pending += 1
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, self._run_job, job, request)
+            ok = True
+            return result
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, "application/json", self._json({"error": str(e)})
+        except Exception as e:
+            return 500, "application/json", self._json({"error": str(e)})
+        finally:
+            self.pending -= 1
+            self.stats.setdefault(path, EndpointStats()).add(time.perf_counter() - started, ok)
+
+    def metrics(self):
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "endpoints": {path: s.as_dict() for path, s in self.stats.items()},
+        }
+
+    @staticmethod
+    def _json(data):
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    # --- Engine jobs (run on the engine thread) ---
+
+    def _run_job(self, job, request):
+        saved = [(name, getattr(self.engine, name)) for name in REQUEST_SETTINGS]
+        try:
+            return job(request)
+        finally:
+            for name, value in saved:
+                setattr(self.engine, name, value)
+
+    def _prepare(self, request):
+        """ Returns (texts, is_batch) and applies per-request engine settings """
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        if "texts" in request:
+            texts = request["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("texts must be a list of strings")
+            batch = True
+        else:
+            text = request.get("text")
+            if not isinstance(text, str):
+                raise ValueError("text must be a string")
+            texts = [text]
+            batch = False
+        self.engine.size_hanzi = self._bounded(request, "size", int, self.engine.size_hanzi,
+                                               MIN_SIZE_HANZI, MAX_SIZE_HANZI)
+        return texts, batch
+
+    @staticmethod
+    def _bounded(request, key, convert, default, low, high):
+        """ request[key] converted, within the limits the GUI allows; anything else is a 400 """
+        value = convert(request.get(key, default))
+        if not low <= value <= high:
+            raise ValueError(f"{key} must be between {low} and {high}")
+        return value
+
+    def _convert(self, text, auto_fit=True):
+        pairs = self.engine.convert(text)
+        if pairs and auto_fit:
+            self.engine.size_pinyin = self.engine.fit_pinyin_size(pairs)
+        return pairs
+
+    def _job_pairs(self, request):
+        texts, batch = self._prepare(request)
+        results = []
+        for text in texts:
+            pairs = self.engine.convert(text)
+            results.append([{"ch": ch, "py": py} for ch, py in zip(pairs.chars, pairs.syllables)])
+        data = {"results": results} if batch else {"pairs": results[0]}
+        return 200, "application/json", self._json(data)
+
+    def _job_html(self, request):
+        texts, batch = self._prepare(request)
+        results = []
+        for text in texts:
+            pairs = self._convert(text, request.get("auto_fit", True))
+            html, plain = self.engine.to_html(pairs) if pairs else ("", "")
+            results.append({"html": html, "text": plain})
+        data = {"results": results} if batch else results[0]
+        return 200, "application/json", self._json(data)
+
+    def _job_png(self, request):
+        texts, batch = self._prepare(request)
+        scale = self._bounded(request, "scale", float, 1.0, MIN_SCALE, HIGH_RES_SCALE)
+        images = []
+        for text in texts:
+            pairs = self._convert(text, request.get("auto_fit", True))
+            images.append(Engine.encode_png(self.engine.render(pairs, scale)) if pairs else b"")
+        if not batch:
+            return 200, "image/png", images[0]
+        data = {"results": [base64.b64encode(png).decode("ascii") for png in images]}
+        return 200, "application/json", self._json(data)
+
+    def _job_svg(self, request):
+        texts, batch = self._prepare(request)
+        scale = self._bounded(request, "scale", float, 1.0, MIN_SCALE, HIGH_RES_SCALE)
+        documents = []
+        for text in texts:
+            pairs = self._convert(text, request.get("auto_fit", True))
+            documents.append(self.engine.to_svg(pairs, scale) if pairs else "")
+        if not batch:
+            return 200, "image/svg+xml", documents[0].encode("utf-8")
+        return 200, "application/json", self._json({"results": documents})
+
+
+class ServiceClient:
+    """ Minimal keep-alive client for talking to a local ConversionService """
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1", timeout=30):
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, path, payload=None):
+        """ Returns (status, content_type, body); JSON bodies are decoded """
+        if payload is None:
+            self.conn.request("GET", path)
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.conn.request("POST", path, body, {"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        data = response.read()
+        content_type = response.getheader("Content-Type", "")
+        if content_type == "application/json":
+            data = json.loads(data.decode("utf-8"))
+        return response.status, content_type, data
+
+    def close(self):
+        self.conn.close()
+
+
+def run_service(args, config):
+    """ Entry point for --serve """
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication(["PinyinHelper-service"])
+
+    engine = Engine(
+        font_hanzi=args.font_hanzi or config.get("favorite_fonts_hanzi", ["Microsoft YaHei"])[0],
+        font_pinyin=args.font_pinyin or config.get("favorite_fonts_pinyin", ["Arial"])[0],
+        size_hanzi=args.size,
+        color=args.color,
+        phrases=PhraseDictionary(),
+    )
+    engine.convert("中")  # warm pypinyin dictionaries before the first request
+
+    service = ConversionService(engine, port=args.port, max_pending=args.max_pending)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
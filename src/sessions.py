@@ -0,0 +1,230 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import deque
+from html import escape
+
+from PyQt6.QtCore import QMimeData
+from PyQt6.QtGui import QColor
+
+from .utils import Utils
+from .engine import is_han
+
+RECORD_ENV = "PINYIN_HELPER_RECORD"
+SESSION_VERSION = 1
+MAX_SESSION_FILES = 20
+
+# Recorded hanzi are replaced by characters from this pool; a per-session salt
+# keeps the mapping consistent within a session (so repeats stay repeats) but
+# not reversible across sessions
+_HAN_POOL = ("的一是不了人我在有他这中大来上个国到说们为子和你地出道也时年得就那要下以生会自着去之过家学对可她"
+             "里后小么心多天而能好都然没日于起还发成事只作当想看文无开手十用主行方又如前所本见经头面公同三已老从动两长")
+_SIZE_RE = re.compile(r'(?:mso-ansi-)?font-size:\s*\d+(?:\.\d+)?\s*(?:pt|px)')
+_FONT_TAG_RE = re.compile(r'<font[^>]+size=["\']?\d+["\']?', re.IGNORECASE)
+
+
+def anonymize_text(text, salt):
+    """ Same length and character classes as text, none of its content.
+
+    Hanzi map to pool characters, letters of any other script to x/X
+    (full-width ones to their full-width forms) and digits and other
+    numerals to 0; whitespace and punctuation are kept since they affect
+    cleaning and chunking.
+    """
+    out = []
+    cache = {}
+    for ch in text:
+        if is_han(ch):
+            sub = cache.get(ch)
+            if sub is None:
+                digest = hashlib.blake2b(ch.encode("utf-8"), digest_size=4, key=salt).digest()
+                sub = cache[ch] = _HAN_POOL[int.from_bytes(digest, "little") % len(_HAN_POOL)]
+            out.append(sub)
+        elif ch.isalpha() or unicodedata.category(ch).startswith("M"):
+            # Combining marks too: decomposed accents are part of a letter
+            sub = "X" if ch.isupper() else "x"
+            # Full-width forms count as CJK when whitespace is cleaned; keep them full-width
+            out.append(chr(ord(sub) + 0xFEE0) if "\uff00" <= ch <= "\uffef" else sub)
+        elif ch.isnumeric():
+            out.append("0")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def anonymize_html(html, text):
+    """ Minimal HTML carrying only the font size hint the activation reads from clipboard HTML """
+    match = _SIZE_RE.search(html)
+    if match:
+        return f'<span style="{match.group(0)}">{escape(text)}</span>'
+    match = _FONT_TAG_RE.search(html)
+    if match:
+        return f"{match.group(0)}>{escape(text)}</font>"
+    return f"<span>{escape(text)}</span>"
+
+
+class SessionRecorder:
+    """ Appends anonymized hotkey, clipboard and selection events to a JSON-lines file.
+
+    Times are seconds since the recorder started. Events come from the
+    hotkey listener thread as well as the GUI thread, so writes are locked.
+    """
+    def __init__(self, path=None, max_files=MAX_SESSION_FILES):
+        folder = Utils.app_data_dir("sessions")
+        self.path = path or os.path.join(folder, time.strftime("session-%Y%m%d-%H%M%S.jsonl"))
+        self.salt = os.urandom(16)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        try:
+            self._file = open(self.path, "w", encoding="utf-8")
+        except OSError as e:
+            print(f"Error opening session recording: {e}")
+            self._file = None
+        self._write({"type": "session", "version": SESSION_VERSION, "platform": sys.platform,
+                     "created": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        self._rotate(os.path.dirname(self.path), max_files)
+
+    def _rotate(self, folder, max_files):
+        files = sorted(f for f in os.listdir(folder) if f.startswith("session-") and f.endswith(".jsonl"))
+        for name in files[:-max_files]:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+    def _write(self, event):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def _event(self, kind, **fields):
+        self._write({"t": round(time.perf_counter() - self.started, 4), "type": kind, **fields})
+
+    def key(self, name):
+        self._event("key", key=name)
+
+    def clipboard(self, mime):
+        text = anonymize_text(mime.text(), self.salt) if mime.hasText() else None
+        html = anonymize_html(mime.html(), text or "") if mime.hasHtml() else None
+        self._event("clipboard", text=text, html=html)
+
+    def selection(self, info, elapsed):
+        if info:
+            info = {"size": info["size"], "font_name": info.get("font_name"),
+                    "colors": [c.name() for c in info.get("colors") or []]}
+        self._event("selection", info=info, elapsed=round(elapsed, 4))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def recorder_from_env():
+    """ A SessionRecorder when PINYIN_HELPER_RECORD is set, otherwise None """
+    if os.environ.get(RECORD_ENV, "") in ("", "0"):
+        return None
+    recorder = SessionRecorder()
+    print(f"Recording session to {recorder.path}")
+    return recorder
+
+
+class RecordingClipboard:
+    """ Wraps the Qt clipboard and records every read through it """
+    def __init__(self, clipboard, recorder):
+        self.clipboard = clipboard
+        self.recorder = recorder
+
+    def mimeData(self):
+        mime = self.clipboard.mimeData()
+        self.recorder.clipboard(mime)
+        return mime
+
+    def __getattr__(self, name):
+        return getattr(self.clipboard, name)
+
+
+class RecordingSelectionSource:
+    """ Wraps a selection source (callable returning size/colors/font info or None) and records its answers """
+    def __init__(self, source, recorder):
+        self.source = source
+        self.recorder = recorder
+
+    def __call__(self, prefetch=False):
+        start = time.perf_counter()
+        info = self.source(prefetch=prefetch)
+        self.recorder.selection(info, time.perf_counter() - start)
+        return info
+
+
+class Session:
+    """ A recorded session: key presses with times, and clipboard and selection snapshots in read order """
+    def __init__(self, path):
+        self.path = path
+        self.keys = []
+        self.clipboards = []
+        self.selections = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # truncated last line of a session that crashed
+                kind = event.get("type")
+                if kind == "key":
+                    self.keys.append((event["t"], event["key"]))
+                elif kind == "clipboard":
+                    self.clipboards.append((event.get("text"), event.get("html")))
+                elif kind == "selection":
+                    self.selections.append((event.get("info"), event.get("elapsed", 0.0)))
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+
+class FakeClipboard:
+    """ Serves recorded clipboard snapshots in the order they were read; the last one repeats """
+    def __init__(self, snapshots):
+        self.snapshots = deque(snapshots)
+        self.current = QMimeData()
+        self.written = []
+
+    def mimeData(self):
+        if self.snapshots:
+            text, html = self.snapshots.popleft()
+            self.current = QMimeData()
+            if text is not None:
+                self.current.setText(text)
+            if html is not None:
+                self.current.setHtml(html)
+        return self.current
+
+    def setMimeData(self, mime):
+        self.written.append(mime.text())
+        self.current = mime
+
+
+class FakeSelectionSource:
+    """ Replays recorded selection answers, taking as long as the original query did """
+    def __init__(self, snapshots):
+        self.snapshots = deque(snapshots)
+
+    def __call__(self, prefetch=False):
+        if not self.snapshots:
+            return None
+        info, elapsed = self.snapshots.popleft()
+        if elapsed:
+            time.sleep(elapsed)
+        if not info:
+            return None
+        return {"size": info["size"], "font_name": info.get("font_name"),
+                "colors": [QColor(c) for c in info.get("colors") or []]}
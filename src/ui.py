@@ -1,36 +1,55 @@
-import sys
 import os
-import re
 import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLineEdit, QLabel, QPushButton,
                              QScrollArea, QColorDialog, QFontComboBox,
                              QSpinBox, QMessageBox, QStyle, QFrame, QMenu, QComboBox,
-                             QSystemTrayIcon, QFontDialog)
-from PyQt6.QtCore import Qt, QBuffer, QIODevice, QByteArray, QMimeData, QTimer, QSize
-from PyQt6.QtGui import QPainter, QColor, QFont, QPixmap, QFontMetrics, QImage, QAction, QIcon, QShortcut, QKeySequence, QFontDatabase, QCursor
+                             QSystemTrayIcon, QFontDialog, QFileDialog, QDialog, QListWidget,
+                             QListWidgetItem, QProgressBar)
+from PyQt6.QtCore import Qt, QMimeData, QTimer, QSize
+from PyQt6.QtGui import QPainter, QColor, QFont, QPixmap, QFontMetrics, QAction, QIcon, QShortcut, QKeySequence, QCursor
 
 from pypinyin import pinyin, Style
 
 from .utils import Utils, ConfigManager
 from .logic import GlobalHotKeyMonitor
 from .updater import Updater
+from .engine import Engine, HIGH_RES_SCALE, MIN_SIZE_HANZI, MAX_SIZE_HANZI, split_chunks, is_han, clean_text
+from .pairs import PairStore
+from .profiling import profiler, profiled, quick_replace_timer
+from .coverage import CoverageIndex
+from .phrases import PhraseDictionary
+from .history import HistoryStore
+from .docx import DocxWriter
+from .watchdog import StallWatchdog
+from .memory import MemoryGovernor, DEFAULT_BUDGET_MB, WIDGET_BYTES, PRIORITY_PREVIEW, pixmap_bytes, shrink_label_pixmap
+from .sessions import recorder_from_env, RecordingClipboard, RecordingSelectionSource
+from .selection import default_registry
 
 try:
     import win32clipboard
 except ImportError:
     win32clipboard = None
 
-try:
-    import win32com.client
-    import pythoncom
-except ImportError:
-    win32com = None
-    pythoncom = None
-
-HIGH_RES_SCALE = 6.0
+# Longer texts are converted chunk by chunk so the window stays responsive
+STREAM_THRESHOLD = 2000
+STREAM_CHUNK = 200
+# Texts painted per event-loop pass when the preview of a long text is rendered incrementally
+PREVIEW_STEP = 2000
+# QLineEdit's default of 32767 characters would silently cut long pastes
+MAX_INPUT_LENGTH = 10_000_000
 
 class PairWidget(QWidget):
+    """ One hanzi/pinyin pair in the editor.
+
+    Text is painted with the pair's color instead of per-widget stylesheets,
+    so recoloring is an attribute change plus a repaint. The pinyin becomes an
+    inline QLineEdit while it is being edited.
+    """
+    PINYIN_PX = 14
+    HANZI_PX = 24
+    PADDING = 8
+
     def __init__(self, char, pinyin_text, index, parent_window):
         super().__init__()
         self.char = char
@@ -38,27 +57,75 @@ class PairWidget(QWidget):
         self.index = index
         self.main_window = parent_window
         self.color = parent_window.render_color
+        self.editor = None
+        self.setCursor(Qt.CursorShape.IBeamCursor)
+
+    def fonts(self):
+        font_p = QFont(self.font())
+        font_p.setPixelSize(self.PINYIN_PX)
+        font_h = QFont(self.font())
+        font_h.setPixelSize(self.HANZI_PX)
+        font_h.setBold(True)
+        return font_p, font_h
+
+    def pinyin_height(self):
+        return QFontMetrics(self.fonts()[0]).height() + self.PADDING
+
+    def sizeHint(self):
+        self.ensurePolished()
+        font_p, font_h = self.fonts()
+        fm_p = QFontMetrics(font_p)
+        fm_h = QFontMetrics(font_h)
+        width = max(fm_p.horizontalAdvance(self.pinyin), fm_h.horizontalAdvance(self.char), 32) + 2 * self.PADDING
+        return QSize(width, fm_p.height() + self.PADDING + 2 + fm_h.height())
 
-        self.layout = QVBoxLayout(self)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.setSpacing(2)
-
-        self.py_edit = QLineEdit(pinyin_text)
-        self.py_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.py_edit.setStyleSheet(self.get_style(14))
-        self.py_edit.textChanged.connect(self.on_text_changed)
-
-        self.char_label = QLabel(char)
-        self.char_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.char_label.setStyleSheet(f"color: {self.color.name()}; font-size: 24px; font-weight: bold;")
+    def minimumSizeHint(self):
+        return self.sizeHint()
 
-        self.layout.addWidget(self.py_edit)
-        self.layout.addWidget(self.char_label)
+    def paintEvent(self, event):
+        font_p, font_h = self.fonts()
+        py_h = self.pinyin_height()
+        p = QPainter(self)
+        p.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        p.fillRect(0, 0, self.width(), py_h, QColor("#555"))
+        p.setPen(self.color)
+        if self.editor is None or not self.editor.isVisible():
+            p.setFont(font_p)
+            p.drawText(0, 0, self.width(), py_h, Qt.AlignmentFlag.AlignCenter, self.pinyin)
+        p.setFont(font_h)
+        p.drawText(0, py_h + 2, self.width(), self.height() - py_h - 2, Qt.AlignmentFlag.AlignCenter, self.char)
+        p.end()
 
-    def get_style(self, font_size):
-        return f"color: {self.color.name()}; background-color: #555; border: none; font-size: {font_size}px;"
+    def mousePressEvent(self, event):
+        # Runs of non-Chinese text carry no pinyin to edit
+        if (event.button() == Qt.MouseButton.LeftButton and is_han(self.char)
+                and event.position().y() < self.pinyin_height()):
+            self.start_edit()
+        else:
+            super().mousePressEvent(event)
+
+    def start_edit(self):
+        if self.editor is None:
+            self.editor = QLineEdit(self)
+            self.editor.setObjectName("pairEditor")
+            self.editor.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.editor.textChanged.connect(self.on_text_changed)
+            self.editor.editingFinished.connect(self.finish_edit)
+        self.editor.setText(self.pinyin)
+        self.editor.setGeometry(0, 0, self.width(), self.pinyin_height())
+        self.editor.show()
+        self.editor.setFocus()
+        self.editor.selectAll()
+        self.update()
+
+    def finish_edit(self):
+        if self.editor is not None:
+            self.editor.hide()
+            self.update()
 
     def on_text_changed(self, text):
+        self.pinyin = text
+        self.updateGeometry()
         self.main_window.update_pair_text(self.index, text)
 
     def contextMenuEvent(self, event):
@@ -75,42 +142,89 @@ class PairWidget(QWidget):
         action_color.triggered.connect(self.change_pair_color)
         menu.addAction(action_color)
 
-        menu.addSeparator()
+        # Runs of non-Chinese text only get the color action
+        if is_han(self.char):
+            menu.addSeparator()
 
-        py_menu = menu.addMenu(tr("ctx_pinyin"))
+            py_menu = menu.addMenu(tr("ctx_pinyin"))
 
-        try:
-            variations = pinyin(self.char, style=Style.TONE, heteronym=True)[0]
-            unique_vars = sorted(list(set(variations)))
-
-            if unique_vars:
-                for py in unique_vars:
-                    act = QAction(py, self)
-                    if py == self.py_edit.text():
-                        act.setCheckable(True)
-                        act.setChecked(True)
-                    act.triggered.connect(lambda checked, val=py: self.set_pinyin_text(val))
-                    py_menu.addAction(act)
-            else:
-                empty_act = QAction(tr("ctx_no_variants"), self)
-                empty_act.setEnabled(False)
-                py_menu.addAction(empty_act)
+            try:
+                variations = pinyin(self.char, style=Style.TONE, heteronym=True)[0]
+                unique_vars = sorted(list(set(variations)))
+
+                if unique_vars:
+                    for py in unique_vars:
+                        act = QAction(py, self)
+                        if py == self.pinyin:
+                            act.setCheckable(True)
+                            act.setChecked(True)
+                        act.triggered.connect(lambda checked, val=py: self.set_pinyin_text(val))
+                        py_menu.addAction(act)
+                else:
+                    empty_act = QAction(tr("ctx_no_variants"), self)
+                    empty_act.setEnabled(False)
+                    py_menu.addAction(empty_act)
 
-        except Exception:
-            pass
+            except Exception:
+                pass
 
         menu.exec(event.globalPos())
 
+    def apply_color(self, color):
+        self.color = color
+        self.update()
+
     def change_pair_color(self):
         c = QColorDialog.getColor(self.color)
         if c.isValid():
-            self.color = c
-            self.py_edit.setStyleSheet(self.get_style(14))
-            self.char_label.setStyleSheet(f"color: {self.color.name()}; font-size: 24px; font-weight: bold;")
+            self.apply_color(c)
             self.main_window.update_pair_color(self.index, c)
 
     def set_pinyin_text(self, text):
-        self.py_edit.setText(text)
+        self.on_text_changed(text)
+        self.update()
+        self.main_window.learn_pinyin_correction(self.index)
+
+
+class HistoryDialog(QDialog):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        tr = main_window.get_translation
+        self.setWindowTitle(tr("tray_history"))
+        self.resize(600, 450)
+
+        layout = QVBoxLayout(self)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText(tr("history_search_placeholder"))
+        self.search.textChanged.connect(self.refresh)
+        self.search.returnPressed.connect(self.restore_current)
+        layout.addWidget(self.search)
+
+        self.list = QListWidget()
+        self.list.setStyleSheet("QListWidget { background-color: #333; } QListWidget::item { padding: 4px; }")
+        self.list.itemActivated.connect(lambda item: self.restore_current())
+        layout.addWidget(self.list)
+
+        self.refresh("")
+
+    def refresh(self, query):
+        self.list.clear()
+        for entry in self.main_window.history.search(query):
+            text = entry.text if len(entry.text) <= 40 else entry.text[:40] + "…"
+            pinyin = " ".join(list(filter(None, entry.pairs.syllables))[:12])
+            item = QListWidgetItem(f"{text}\n{pinyin}")
+            item.setData(Qt.ItemDataRole.UserRole, entry)
+            self.list.addItem(item)
+        if self.list.count():
+            self.list.setCurrentRow(0)
+
+    def restore_current(self):
+        item = self.list.currentItem()
+        if item is None:
+            return
+        self.main_window.restore_history(item.data(Qt.ItemDataRole.UserRole))
+        self.accept()
 
 
 class MainWindow(QMainWindow):
@@ -125,9 +239,40 @@ class MainWindow(QMainWindow):
         self.resize(1000, 800)
         self.setup_styles()
 
-        self.pairs = []
+        self.pairs = PairStore()
         self.render_color = QColor(0, 0, 0)
         self.shortcuts = []
+        self.phrases = PhraseDictionary()
+        self.engine = Engine(phrases=self.phrases)
+        # Separate engine so quick replace never disturbs the editor's settings
+        self.replace_engine = Engine(phrases=self.phrases)
+        self.history = HistoryStore()
+        self.history_timer = QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(1500)
+        self.history_timer.timeout.connect(self.save_history)
+        # Logs event-loop stalls with the GUI thread's stack to the diagnostics folder
+        self.watchdog = StallWatchdog()
+        self.watchdog.start()
+        # One budget (memory_budget_mb in config.json) for caches, images and widgets
+        self.memory = MemoryGovernor(self.config.get("memory_budget_mb", DEFAULT_BUDGET_MB) * 2**20)
+        self.memory.register_engine(self.engine)
+        self.memory.register_engine(self.replace_engine)
+        self.memory.register("editor widgets", lambda: self.area_layout.count() * WIDGET_BYTES)
+        self.memory.register("window", self.backing_store_bytes)
+        self.memory.register("preview", lambda: pixmap_bytes(self.lbl_prev.pixmap()),
+                             lambda excess: shrink_label_pixmap(self.lbl_prev, excess), PRIORITY_PREVIEW)
+        self.memory.start()
+        # Drives chunked processing; interval 0 runs one chunk per event-loop pass
+        self._stream = None
+        self.process_timer = QTimer(self)
+        self.process_timer.setInterval(0)
+        self.process_timer.timeout.connect(self._process_next_chunk)
+        # Long previews are painted a slice per event-loop pass as well
+        self._preview_job = None
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setInterval(0)
+        self.preview_timer.timeout.connect(self._render_next_preview_step)
         
         # Font Favorites
         self.fav_fonts_h = self.config.get("favorite_fonts_hanzi", ["Microsoft YaHei", "KaiTi"])
@@ -136,6 +281,20 @@ class MainWindow(QMainWindow):
         self.remove_mode_p = False
         self.auto_copy_font = False
         self._cached_com_info = None
+        # Swappable for fakes, see benchmarks/replay.py
+        self.clipboard = QApplication.clipboard()
+        # Raw Qt clipboard: the HTML size hint must not add reads to a recorded session
+        self.selection_sources = default_registry(QApplication.clipboard())
+        self.selection_source = self.selection_sources
+        # Opt-in anonymized recording of hotkey sessions for replay
+        self.recorder = recorder_from_env()
+        if self.recorder:
+            self.clipboard = RecordingClipboard(self.clipboard, self.recorder)
+            self.selection_source = RecordingSelectionSource(self.selection_source, self.recorder)
+
+        # Glyph coverage of favorite fonts, rechecked in the background on every start
+        self.coverage = CoverageIndex()
+        self.coverage.ensure(self.fav_fonts_h + self.fav_fonts_p, revalidate=True)
 
         # --- TRAY ICON ---
         self.tray_icon = QSystemTrayIcon(self)
@@ -151,10 +310,26 @@ class MainWindow(QMainWindow):
         self.action_show.triggered.connect(self.show_window)
         self.action_check_update = QAction("Check for Updates", self)
         self.action_check_update.triggered.connect(lambda: self.updater.check_for_updates(silent=False))
+        self.action_history = QAction("History", self)
+        self.action_history.triggered.connect(self.show_history_dialog)
+        self.action_import_phrases = QAction("Import Phrases", self)
+        self.action_import_phrases.triggered.connect(self.import_phrases_dialog)
+        self.action_profiling = QAction("Profiling", self)
+        self.action_profiling.setCheckable(True)
+        self.action_profiling.setChecked(profiler.enabled)
+        self.action_profiling.toggled.connect(profiler.set_enabled)
+        self.action_profiling_stats = QAction("Profiling Stats", self)
+        self.action_profiling_stats.triggered.connect(self.show_profiling_stats)
         self.action_quit = QAction("Quit", self)
         self.action_quit.triggered.connect(self.quit_app)
         self.tray_menu.addAction(self.action_show)
+        self.tray_menu.addAction(self.action_history)
         self.tray_menu.addAction(self.action_check_update)
+        self.tray_menu.addAction(self.action_import_phrases)
+        self.tray_menu.addSeparator()
+        self.tray_menu.addAction(self.action_profiling)
+        self.tray_menu.addAction(self.action_profiling_stats)
+        self.tray_menu.addSeparator()
         self.tray_menu.addAction(self.action_quit)
         self.tray_icon.setContextMenu(self.tray_menu)
 
@@ -163,6 +338,7 @@ class MainWindow(QMainWindow):
 
         # --- HOTKEY MONITOR ---
         self.key_monitor = GlobalHotKeyMonitor()
+        self.key_monitor.recorder = self.recorder
         self.key_monitor.activated.connect(self.activate_from_clipboard)
         self.key_monitor.activated_replace.connect(self.quick_replace_from_clipboard)
         self.key_monitor.ctrl_c_pressed.connect(self._cache_com_info)
@@ -177,6 +353,7 @@ class MainWindow(QMainWindow):
         # === TOP BAR ===
         top_bar = QHBoxLayout()
         self.entry = QLineEdit()
+        self.entry.setMaxLength(MAX_INPUT_LENGTH)
         self.entry.setFont(QFont("Microsoft YaHei", 12))
         self.entry.returnPressed.connect(self.process)
         
@@ -190,6 +367,11 @@ class MainWindow(QMainWindow):
         self.btn_process.clicked.connect(self.process)
         top_bar.addWidget(self.btn_process)
 
+        self.btn_history = QPushButton()
+        self.btn_history.setStyleSheet("background-color: #555;")
+        self.btn_history.clicked.connect(self.show_history_dialog)
+        top_bar.addWidget(self.btn_history)
+
         self.combo_lang = QComboBox()
         self.combo_lang.setFixedWidth(100)
         self.combo_lang.addItems(["English", "Русский", "中文"])
@@ -218,15 +400,28 @@ class MainWindow(QMainWindow):
         self.scroll.setStyleSheet("background-color: #333; border-radius: 5px;")
 
         self.area = QWidget()
-        self.area.setStyleSheet("background-color: #333;")
+        # One sheet for the whole editor; pair colors are painted, not styled
+        self.area.setStyleSheet("""
+            QWidget { background-color: #333; }
+            QLineEdit#pairEditor { background-color: #555; border: none; padding: 0; font-size: 14px; }
+        """)
         self.area_layout = QHBoxLayout(self.area)
         self.area_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
         self.scroll.setWidget(self.area)
         layout.addWidget(self.scroll)
 
+        hint_row = QHBoxLayout()
         self.label_hint = QLabel()
         self.label_hint.setStyleSheet("color: #aaa; font-style: italic;")
-        layout.addWidget(self.label_hint)
+        hint_row.addWidget(self.label_hint, 1)
+
+        self.progress = QProgressBar()
+        self.progress.setFixedWidth(200)
+        self.progress.setFixedHeight(14)
+        self.progress.setTextVisible(False)
+        self.progress.hide()
+        hint_row.addWidget(self.progress)
+        layout.addLayout(hint_row)
 
         # === SETTINGS PANEL ===
         sets = QWidget()
@@ -250,7 +445,7 @@ class MainWindow(QMainWindow):
 
         self.spin_h = QSpinBox()
         self.spin_h.setFixedWidth(80)
-        self.spin_h.setRange(10, 500)
+        self.spin_h.setRange(MIN_SIZE_HANZI, MAX_SIZE_HANZI)
         self.spin_h.setValue(self.config.get("font_size_hanzi", 32))
         self.spin_h.valueChanged.connect(self.on_hanzi_size_changed)
         self.add_select_all_shortcut(self.spin_h)
@@ -334,6 +529,16 @@ class MainWindow(QMainWindow):
         self.btn_copy_img.clicked.connect(self.copy_to_clipboard_win32)
         btns_layout.addWidget(self.btn_copy_img)
 
+        # Save DOCX Button
+        self.btn_save_docx = QPushButton()
+        self.btn_save_docx.setFixedHeight(50)
+        self.btn_save_docx.setStyleSheet("""
+            QPushButton { background-color: #6f42c1; color: white; font-weight: bold; font-size: 16px; border-radius: 8px; }
+            QPushButton:hover { background-color: #5a32a3; }
+        """)
+        self.btn_save_docx.clicked.connect(self.save_as_docx)
+        btns_layout.addWidget(self.btn_save_docx)
+
         layout.addLayout(btns_layout)
         
         # Apply logic
@@ -348,65 +553,36 @@ class MainWindow(QMainWindow):
         # Check updates silently after 2 seconds to not block startup
         QTimer.singleShot(2000, lambda: self.updater.check_for_updates(silent=True))
 
-    @staticmethod
-    def _detect_selection_info_com():
-        """Try to get font size and per-character colors from running app via COM."""
-        if not win32com:
-            return None
-        try:
-            pythoncom.CoInitialize()
-        except Exception:
-            pass
-        com_apps = ["KWPP.Application", "PowerPoint.Application"]
-        for prog_id in com_apps:
-            try:
-                app = win32com.client.GetActiveObject(prog_id)
-                sel = app.ActiveWindow.Selection
-                if sel.Type != 3:  # ppSelectionText
-                    continue
-                text_range = sel.TextRange
-                size = text_range.Font.Size
-                if not size or not (8 <= size <= 300):
-                    size = 32
-
-                colors = []
-                count = text_range.Characters().Count
-                for i in range(1, count + 1):
-                    try:
-                        rgb_bgr = text_range.Characters(i, 1).Font.Color.RGB
-                        r = rgb_bgr & 0xFF
-                        g = (rgb_bgr >> 8) & 0xFF
-                        b = (rgb_bgr >> 16) & 0xFF
-                        colors.append(QColor(r, g, b))
-                    except Exception:
-                        colors.append(QColor(0, 0, 0))
-
-                return {"size": int(size), "colors": colors, "font_name": text_range.Font.Name}
-            except Exception:
-                continue
-        return None
-
     def _cache_com_info(self):
-        self._cached_com_info = self._detect_selection_info_com()
+        # The clipboard still holds the previous copy here, so only ask the applications
+        self._cached_com_info = self.selection_source(prefetch=True)
 
+    @profiled
     def activate_from_clipboard(self):
         """Called on double Ctrl+C"""
         time.sleep(0.1)
+        self.cancel_processing()
 
         try:
-            clipboard = QApplication.clipboard()
-            mime = clipboard.mimeData()
+            mime = self.clipboard.mimeData()
 
             if mime.hasText():
                 raw_text = mime.text()
-                clean_text = raw_text.replace(" ", "").replace("\n", "").replace("\r", "")
+                text = clean_text(raw_text)
                 
-                if clean_text:
+                if text:
+                    # Seen before: restore the finished annotation without converting or asking COM
+                    entry = self.history.lookup(text)
+                    if entry:
+                        self.restore_history(entry)
+                        self.show_window()
+                        return
+
                     detected_size = 32
                     detected_colors = None
 
-                    # Try COM
-                    info = self._detect_selection_info_com()
+                    # Applications first, then the clipboard HTML size hint
+                    info = self.selection_source()
                     if info:
                         detected_size = info["size"]
                         detected_colors = info["colors"]
@@ -417,48 +593,12 @@ class MainWindow(QMainWindow):
                                 self.save_favorite_fonts()
                                 self.update_font_combo("hanzi")
                             self.font_cb_h.setCurrentText(font_name)
-                    # Fallback: parse clipboard HTML
-                    elif mime.hasHtml():
-                        try:
-                            html = mime.html()
-                            val = None
-                            match = re.search(r'(?:mso-ansi-)?font-size:\s*(\d+(?:\.\d+)?)\s*(pt|px)', html)
-                            if match:
-                                val = float(match.group(1))
-                                unit = match.group(2)
-                                if unit == 'px':
-                                    val = val * 0.75
-                            if val is None:
-                                match_font = re.search(r'<font[^>]+size=["\']?(\d+)["\']?', html, re.IGNORECASE)
-                                if match_font:
-                                    html_size = int(match_font.group(1))
-                                    html_to_pt = {1: 8, 2: 10, 3: 12, 4: 14, 5: 18, 6: 24, 7: 36}
-                                    val = html_to_pt.get(html_size, 12)
-
-                            if val is not None and 8 <= val <= 300:
-                                detected_size = int(val)
-                        except Exception:
-                            pass
-
-                    self.entry.setText(clean_text)
+
+                    self.entry.setText(text)
                     self.show_window()
 
                     self.spin_h.setValue(detected_size)
-                    self.process()
-
-                    if detected_colors:
-                        for i in range(min(len(detected_colors), len(self.pairs))):
-                            color = detected_colors[i]
-                            self.pairs[i]['color'] = color
-                            if i < self.area_layout.count():
-                                w = self.area_layout.itemAt(i).widget()
-                                if w:
-                                    w.color = color
-                                    w.py_edit.setStyleSheet(w.get_style(14))
-                                    w.char_label.setStyleSheet(f"color: {color.name()}; font-size: 24px; font-weight: bold;")
-                        self.preview()
-
-                    self.auto_adjust_pinyin_size()
+                    self.process_text(text, detected_colors)
                     return
 
             self.show_window()
@@ -466,70 +606,75 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.show_window()
 
+    @profiled
     def quick_replace_from_clipboard(self):
-        """Called on Ctrl+C then Ctrl+X — silent inline replace."""
+        """Called on Ctrl+C then Ctrl+X — silent inline replace.
+
+        Runs on its own engine: conversion, metric-based size fit and HTML only,
+        without touching the editor, the preview or the config file.
+        """
+        started = self.key_monitor.replace_pressed_at or time.perf_counter()
+        self.key_monitor.replace_pressed_at = None
         time.sleep(0.15)
 
         try:
-            clipboard = QApplication.clipboard()
-            mime = clipboard.mimeData()
+            mime = self.clipboard.mimeData()
 
             if not mime.hasText():
                 return
 
             raw_text = mime.text()
-            clean_text = raw_text.replace(" ", "").replace("\n", "").replace("\r", "")
-            if not clean_text:
+            text = clean_text(raw_text)
+            if not text:
                 return
 
-            detected_size = 32
-            detected_colors = None
+            engine = self.replace_engine
+            engine.font_hanzi = self.font_cb_h.currentText()
+            engine.font_pinyin = self.font_cb_p.currentText()
+            engine.color = self.render_color
 
             info = self._cached_com_info
             self._cached_com_info = None
-            if not info:
-                info = self._detect_selection_info_com()
-            if info:
-                detected_size = info["size"]
-                detected_colors = info["colors"]
-                if self.auto_copy_font and info.get("font_name"):
-                    font_name = info["font_name"]
-                    if font_name not in self.fav_fonts_h:
-                        self.fav_fonts_h.append(font_name)
-                        self.save_favorite_fonts()
-                        self.update_font_combo("hanzi")
-                    self.font_cb_h.setCurrentText(font_name)
-
-            from pypinyin import pinyin as py_pinyin, Style as py_Style
-            raw = py_pinyin(clean_text, style=py_Style.TONE)
-            self.pairs = []
-            for i, ch in enumerate(clean_text):
-                py_text = raw[i][0]
-                color = self.render_color
-                if detected_colors and i < len(detected_colors):
-                    color = detected_colors[i]
-                self.pairs.append({'ch': ch, 'py': py_text, 'color': color})
-
-            self.spin_h.blockSignals(True)
-            self.spin_h.setValue(detected_size)
-            self.spin_h.blockSignals(False)
-            self.auto_adjust_pinyin_size()
-
-            # Copy HTML to clipboard
-            self.copy_as_text_html()
+            entry = self.history.lookup(text, touch=False)
+            if entry:
+                engine.font_hanzi, engine.font_pinyin = entry.font_hanzi, entry.font_pinyin
+                engine.size_hanzi, engine.size_pinyin = entry.size_hanzi, entry.size_pinyin
+                pairs = entry.pairs
+            else:
+                engine.size_hanzi = 32
+                detected_colors = None
+                if not info:
+                    info = self.selection_source()
+                if info:
+                    engine.size_hanzi = info["size"]
+                    detected_colors = info["colors"]
+                    if self.auto_copy_font and info.get("font_name"):
+                        engine.font_hanzi = info["font_name"]
+
+                pairs = engine.convert(text)
+                self._apply_detected_colors(pairs, detected_colors, 0)
+                engine.font_hanzi = self.covering_font(engine.font_hanzi, self.fav_fonts_h, text)
+                engine.font_pinyin = self.covering_font(engine.font_pinyin, self.fav_fonts_p, "".join(pairs.syllables))
+                engine.size_pinyin = engine.fit_pinyin_size(pairs)
+
+            html, plain_text = engine.to_html(pairs)
+            self.set_clipboard_html(html, plain_text)
+            self.paste_into_source()
+            quick_replace_timer.record(time.perf_counter() - started)
 
-            # Simulate Ctrl+V in the source app
-            time.sleep(0.1)
-            try:
-                from pynput.keyboard import Controller, Key
-                kb = Controller()
-                kb.press(Key.ctrl)
-                kb.press('v')
-                kb.release('v')
-                kb.release(Key.ctrl)
-            except Exception:
-                pass
+        except Exception:
+            pass
 
+    def paste_into_source(self):
+        # Simulate Ctrl+V in the source app
+        time.sleep(0.1)
+        try:
+            from pynput.keyboard import Controller, Key
+            kb = Controller()
+            kb.press(Key.ctrl)
+            kb.press('v')
+            kb.release('v')
+            kb.release(Key.ctrl)
         except Exception:
             pass
 
@@ -539,33 +684,12 @@ class MainWindow(QMainWindow):
         # Save config
         self.config.set("font_size_hanzi", self.spin_h.value())
 
+    @profiled
     def auto_adjust_pinyin_size(self):
         if not self.pairs: return
 
-        hanzi_size_pt = self.spin_h.value()
-        font_h = QFont(self.font_cb_h.currentText())
-        font_h.setPointSize(hanzi_size_pt)
-        fm_h = QFontMetrics(font_h)
-
-        font_p = QFont(self.font_cb_p.currentText())
-        best_size = 8
-
-        for candidate in range(hanzi_size_pt, 7, -1):
-            font_p.setPointSize(candidate)
-            fm_p = QFontMetrics(font_p)
-
-            all_fit = True
-            for item in self.pairs:
-                w_h = fm_h.horizontalAdvance(item['ch'])
-                w_p = fm_p.horizontalAdvance(item['py'])
-
-                if w_p > w_h:
-                    all_fit = False
-                    break
-
-            if all_fit:
-                best_size = candidate
-                break
+        self.sync_engine()
+        best_size = self.engine.fit_pinyin_size(self.pairs)
 
         self.spin_p.blockSignals(True)
         self.spin_p.setValue(best_size)
@@ -573,6 +697,20 @@ class MainWindow(QMainWindow):
         self.config.set("font_size_pinyin", best_size)
         self.preview()
 
+    def sync_engine(self):
+        # Push the current UI settings into the shared engine
+        self.engine.font_hanzi = self.font_cb_h.currentText()
+        self.engine.font_pinyin = self.font_cb_p.currentText()
+        self.engine.size_hanzi = self.spin_h.value()
+        self.engine.size_pinyin = self.spin_p.value()
+        self.engine.color = self.render_color
+
+    def backing_store_bytes(self):
+        if not self.isVisible():
+            return 0
+        dpr = self.devicePixelRatioF()
+        return int(self.width() * self.height() * 4 * dpr * dpr)
+
     def reset_copy_btn(self, btn, text, color_hex):
         btn.setText(text)
         btn.setStyleSheet(
@@ -598,6 +736,15 @@ class MainWindow(QMainWindow):
         self.activateWindow()
         self.raise_()
 
+    def handle_instance_message(self, message):
+        """ Request forwarded by a second launch of the program """
+        self.show_window()
+        if message.get("command") == "analyze":
+            text = clean_text(str(message.get("text", "")))
+            if text:
+                self.entry.setText(text)
+                self.process_text(text)
+
     def toggle_always_on_top(self, checked):
         self.config.set("always_on_top", checked)
         if checked:
@@ -616,8 +763,36 @@ class MainWindow(QMainWindow):
 
     def quit_app(self):
         self.key_monitor.stop()
+        self.watchdog.stop()
+        self.memory.stop()
+        if self.recorder:
+            self.recorder.close()
+        profiler.dump()
+        if self.history_timer.isActive():
+            self.history_timer.stop()
+            self.save_history()
         QApplication.quit()
 
+    def show_profiling_stats(self):
+        tr = self.get_translation
+        extra = [quick_replace_timer.summary(), self.watchdog.summary(), self.memory.summary(),
+                 self.selection_sources.summary()]
+        if not profiler.stats:
+            QMessageBox.information(self, tr("msg_profiling_title"),
+                                    "\n\n".join(filter(None, [tr("msg_profiling_empty")] + extra)))
+            return
+        path = profiler.dump()
+        text = "\n\n".join(filter(None, [profiler.summary()] + extra))
+        if path:
+            text += "\n\n" + tr("msg_profiling_saved").format(path=path)
+
+        box = QMessageBox(self)
+        box.setWindowTitle(tr("msg_profiling_title"))
+        box.setText(text)
+        box.setDetailedText(profiler.top_functions())
+        box.setStyleSheet("QLabel { font-family: Consolas, monospace; }")
+        box.exec()
+
     def change_language(self, index):
         codes = ["en", "ru", "zh"]
         self.current_lang = codes[index]
@@ -643,45 +818,218 @@ class MainWindow(QMainWindow):
         self.label_prev_title.setText(tr("label_preview"))
         self.btn_copy_img.setText(tr("btn_copy_img"))
         self.btn_copy_txt.setText(tr("btn_copy_txt"))
+        self.btn_save_docx.setText(tr("btn_save_docx"))
         self.label_hint.setText(tr("tip_hint"))
         self.tray_icon.setToolTip(tr("tray_tooltip"))
         self.action_show.setText(tr("tray_show"))
         self.action_check_update.setText(tr("tray_check_update"))
+        self.action_history.setText(tr("tray_history"))
+        self.btn_history.setText(tr("btn_history"))
+        self.action_import_phrases.setText(tr("tray_import_phrases"))
+        self.action_profiling.setText(tr("tray_profiling"))
+        self.action_profiling_stats.setText(tr("tray_profiling_stats"))
         self.action_quit.setText(tr("tray_quit"))
         if self.btn_top.isChecked():
             self.btn_top.setText(tr("btn_top_active"))
         else:
             self.btn_top.setText(tr("btn_top"))
 
+    @profiled
     def process(self):
         txt = self.entry.text()
         if not txt: return
-        raw = pinyin(txt, style=Style.TONE)
+        self.process_text(txt)
+
+    def process_text(self, txt, colors=None):
+        """ Convert txt into the editor; colors optionally gives a color per character """
+        self.cancel_processing()
+        self.sync_engine()
+
+        if len(txt) <= STREAM_THRESHOLD:
+            pairs = self.engine.convert(txt)
+            self._apply_detected_colors(pairs, colors, 0)
+            self.load_pairs(pairs)
+            self.finish_processing()
+            return
+
+        # Large paste: stream it in, a partial preview appears after the first chunk
+        self.load_pairs(PairStore())
+        # (chunks, colors, characters converted so far)
+        self._stream = (split_chunks(txt, STREAM_CHUNK), colors, 0)
+        self.progress.setRange(0, len(txt))
+        self.progress.setValue(0)
+        self.progress.show()
+        self.process_timer.start()
+
+    def _process_next_chunk(self):
+        chunks, colors, done = self._stream
+        chunk = next(chunks, None)
+        if chunk is None:
+            self.cancel_processing()
+            self.finish_processing()
+            return
+
+        start = len(self.pairs)
+        self.cancel_preview()
+        part = self.engine.convert(chunk)
+        self._apply_detected_colors(part, colors, done)
+        self.pairs.extend(part)
+        self.add_pair_widgets(start)
+        done += len(chunk)
+        self._stream = (chunks, colors, done)
+        self.progress.setValue(done)
+        if start == 0:
+            self.auto_adjust_pinyin_size()
+
+    def cancel_processing(self):
+        """ Stop an in-flight chunked job; pairs converted so far stay in the editor """
+        self.process_timer.stop()
+        self._stream = None
+        self.progress.hide()
+
+    def finish_processing(self):
+        self.check_font_coverage()
+        # Renders the preview as well
+        self.auto_adjust_pinyin_size()
 
+    def is_busy(self):
+        """ True while a long text is still being converted or its preview painted """
+        return self._stream is not None or self._preview_job is not None
+
+    @staticmethod
+    def _apply_detected_colors(pairs, colors, offset):
+        """ colors has one entry per source character; offset is where pairs' text starts in it """
+        if not colors:
+            return
+        pos = offset
+        for i, token in enumerate(pairs.chars):
+            if pos >= len(colors):
+                break
+            pairs.set_color(i, colors[pos])
+            pos += len(token)
+
+    def refresh_pair_colors(self):
+        """ Bulk recolor: copy colors from self.pairs into the widgets, then repaint the editor once """
+        layout = self.area_layout
+        for i in range(min(len(self.pairs), layout.count())):
+            w = layout.itemAt(i).widget()
+            if w:
+                w.color = self.pairs.color_at(i)
+        self.area.update()
+
+    def load_pairs(self, pairs):
+        """ Replace the editor contents with one PairWidget per pair """
+        self.cancel_preview()
         while self.area_layout.count():
             w = self.area_layout.takeAt(0).widget()
             if w: w.deleteLater()
 
-        self.pairs = []
+        self.pairs = pairs
+        self.add_pair_widgets(0)
 
-        for i, ch in enumerate(txt):
-            py = raw[i][0]
-            self.pairs.append({
-                'ch': ch, 'py': py, 'color': self.render_color
-            })
-            widget = PairWidget(ch, py, i, self)
+    def add_pair_widgets(self, start):
+        """ Create widgets for pairs[start:] """
+        self.area.setUpdatesEnabled(False)
+        for i in range(start, len(self.pairs)):
+            widget = PairWidget(self.pairs.chars[i], self.pairs.syllables[i], i, self)
+            widget.color = self.pairs.color_at(i)
             self.area_layout.addWidget(widget)
-
-        self.auto_adjust_pinyin_size()
+        self.area.setUpdatesEnabled(True)
+
+    def apply_history_settings(self, entry):
+        """ Restore fonts and sizes of a history entry without triggering re-fits """
+        for combo, favorites, family in ((self.font_cb_h, self.fav_fonts_h, entry.font_hanzi),
+                                         (self.font_cb_p, self.fav_fonts_p, entry.font_pinyin)):
+            if family in favorites:
+                combo.blockSignals(True)
+                combo.setCurrentText(family)
+                combo.blockSignals(False)
+        for spin, value in ((self.spin_h, entry.size_hanzi), (self.spin_p, entry.size_pinyin)):
+            spin.blockSignals(True)
+            spin.setValue(value)
+            spin.blockSignals(False)
+
+    def restore_history(self, entry):
+        self.cancel_processing()
+        self.entry.setText(entry.text)
+        self.apply_history_settings(entry)
+        self.load_pairs(entry.pairs)
         self.preview()
 
+    def schedule_history_save(self):
+        # Debounced so typing in a pinyin field does not write on every keystroke
+        self.history_timer.start()
+
+    def save_history(self):
+        if not self.pairs or self._stream:
+            return  # a streaming job records the full text once it finishes
+        self.history.record("".join(self.pairs.chars), self.pairs.copy(),
+                            self.font_cb_h.currentText(), self.font_cb_p.currentText(),
+                            self.spin_h.value(), self.spin_p.value())
+
+    def show_history_dialog(self):
+        dialog = HistoryDialog(self)
+        dialog.exec()
+
+    def covering_font(self, family, favorites, text):
+        """ family, or the first favorite that has every glyph of text when family does not """
+        if not self.coverage.missing(family, text):
+            return family
+        return self.coverage.pick(favorites, text) or family
+
+    def check_font_coverage(self):
+        """ Switch to a favorite font that has every glyph, or warn when none does """
+        tr = self.get_translation
+        warnings = []
+        checks = ((self.font_cb_h, self.fav_fonts_h, "".join(self.pairs.chars)),
+                  (self.font_cb_p, self.fav_fonts_p, "".join(self.pairs.syllables)))
+        for combo, favorites, text in checks:
+            family = combo.currentText()
+            missing = self.coverage.missing(family, text)
+            if not missing:
+                continue  # fully covered, or not indexed yet
+            better = self.coverage.pick(favorites, text)
+            if better:
+                combo.setCurrentText(better)
+                warnings.append(tr("msg_font_switched").format(font=family, new_font=better))
+            elif self.coverage.bitsets.get(family) is None:
+                warnings.append(tr("msg_font_not_installed").format(font=family))
+            else:
+                warnings.append(tr("msg_font_missing_glyphs").format(font=family, chars="".join(missing[:10])))
+
+        if warnings:
+            self.label_hint.setText("⚠ " + " ".join(warnings))
+            self.label_hint.setStyleSheet("color: #f0ad4e; font-style: italic;")
+        else:
+            self.label_hint.setText(tr("tip_hint"))
+            self.label_hint.setStyleSheet("color: #aaa; font-style: italic;")
+
     def update_pair_text(self, index, new_text):
-        self.pairs[index]['py'] = new_text
+        self.pairs.set_pinyin(index, new_text)
         self.auto_adjust_pinyin_size()
         self.preview()
 
+    def learn_pinyin_correction(self, index):
+        # Remember the chosen reading so the next process() and quick replace reuse it
+        # Phrases are keyed by character while pairs group non-Chinese runs into one token
+        chars = self.pairs.chars
+        syllables = [py for token, py in zip(chars, self.pairs.syllables) for _ in token]
+        self.phrases.learn_correction("".join(chars), sum(map(len, chars[:index])), syllables)
+
+    def import_phrases_dialog(self):
+        tr = self.get_translation
+        path, _ = QFileDialog.getOpenFileName(self, tr("tray_import_phrases"), "", "Text (*.txt *.tsv);;All (*)")
+        if not path:
+            return
+        try:
+            count = self.phrases.import_file(path)
+        except Exception as e:
+            QMessageBox.warning(self, tr("msg_error_title"), str(e))
+            return
+        QMessageBox.information(self, tr("tray_import_phrases"), tr("msg_phrases_imported").format(count=count))
+
     def update_pair_color(self, index, new_color):
-        self.pairs[index]['color'] = new_color
+        self.pairs.set_color(index, new_color)
         self.preview()
 
     def set_color(self):
@@ -690,20 +1038,37 @@ class MainWindow(QMainWindow):
             self.render_color = c
             self.btn_col.setStyleSheet(
                 f"background-color: {c.name()}; border: 1px solid #777; font-weight: bold; border-radius: 4px;")
-            for i, item in enumerate(self.pairs):
-                item['color'] = c
-                if i < self.area_layout.count():
-                    w = self.area_layout.itemAt(i).widget()
-                    if w:
-                        w.color = c
-                        w.py_edit.setStyleSheet(w.get_style(14))
-                        w.char_label.setStyleSheet(f"color: {c.name()}; font-size: 24px; font-weight: bold;")
+            self.pairs.fill_color(c)
+            self.refresh_pair_colors()
             self.preview()
 
+    @profiled
     def preview(self):
         if not self.pairs: return
-        pix = self.generate(1.0)
+        self.cancel_preview()
+        if len(self.pairs) <= STREAM_THRESHOLD:
+            self.show_preview(self.generate(1.0))
+            return
+        # Long text: paint in slices from the event loop; the old preview stays until the new one is done
+        self.sync_engine()
+        self._preview_job = self.engine.render_steps(self.pairs, 1.0, step=PREVIEW_STEP)
+        self.preview_timer.start()
+
+    def _render_next_preview_step(self):
+        img = next(self._preview_job)
+        if img is None:
+            return
+        self.cancel_preview()
+        self.show_preview(QPixmap.fromImage(img))
+
+    def cancel_preview(self):
+        self.preview_timer.stop()
+        self._preview_job = None
+
+    def show_preview(self, pix):
         self.lbl_prev.setPixmap(pix)
+        self.memory.check()
+        self.schedule_history_save()
 
     def update_font_combo(self, font_type):
         if font_type == "hanzi":
@@ -814,68 +1179,23 @@ class MainWindow(QMainWindow):
     def save_favorite_fonts(self):
         self.config.set("favorite_fonts_hanzi", self.fav_fonts_h)
         self.config.set("favorite_fonts_pinyin", self.fav_fonts_p)
+        self.coverage.ensure(self.fav_fonts_h + self.fav_fonts_p)
 
+    @profiled
     def generate(self, scale):
-        base_h = self.spin_h.value()
-        base_p = self.spin_p.value()
-        size_h = int(base_h * scale)
-        size_p = int(base_p * scale)
-        spacing = int(10 * scale)
-
-        font_h = QFont(self.font_cb_h.currentText())
-        font_h.setPixelSize(size_h)
-        font_p = QFont(self.font_cb_p.currentText())
-        font_p.setPixelSize(size_p)
-
-        fm_h = QFontMetrics(font_h)
-        fm_p = QFontMetrics(font_p)
-
-        blocks = []
-        total_w = 0
-        for item in self.pairs:
-            w_h = fm_h.horizontalAdvance(item['ch'])
-            w_p = fm_p.horizontalAdvance(item['py'])
-            bw = max(w_h, w_p)
-            total_w += bw + spacing
-            blocks.append((item, bw, w_h, w_p))
-
-        h_h = fm_h.height()
-        h_p = fm_p.height()
-        total_h = h_h + h_p + int(10 * scale)
-
-        img = QImage(total_w, total_h, QImage.Format.Format_ARGB32)
-        img.fill(Qt.GlobalColor.transparent)
-
-        p = QPainter(img)
-        p.setRenderHint(QPainter.RenderHint.Antialiasing)
-        p.setRenderHint(QPainter.RenderHint.TextAntialiasing)
-
-        x = 0
-        y_py = fm_p.ascent()
-        y_hz = h_p + int(5 * scale) + fm_h.ascent()
-
-        for (item, bw, wh, wp) in blocks:
-            color_to_use = item.get('color', self.render_color)
-            p.setPen(color_to_use)
-
-            p.setFont(font_p)
-            p.drawText(int(x + (bw - wp) / 2), int(y_py), item['py'])
-            p.setFont(font_h)
-            p.drawText(int(x + (bw - wh) / 2), int(y_hz), item['ch'])
-            x += bw + spacing
-
-        p.end()
-        return QPixmap.fromImage(img)
+        self.sync_engine()
+        return QPixmap.fromImage(self.engine.render(self.pairs, scale))
 
+    @profiled
     def copy_to_clipboard_win32(self):
         if not self.pairs: return
 
-        pix = self.generate(HIGH_RES_SCALE)
-        ba = QByteArray()
-        buff = QBuffer(ba)
-        buff.open(QIODevice.OpenModeFlag.WriteOnly)
-        pix.save(buff, "PNG")
-        png_bytes = ba.data()
+        self.sync_engine()
+        # Very long texts get a lower scale rather than an image that does not fit the memory budget
+        scale = self.memory.fit_scale(lambda s: self.engine.image_size(self.pairs, s), HIGH_RES_SCALE)
+        img = self.engine.render(self.pairs, scale)
+        pix = QPixmap.fromImage(img)
+        png_bytes = Engine.encode_png(img)
 
         try:
             if win32clipboard:
@@ -898,82 +1218,15 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error: {e}")
 
+    @profiled
     def copy_as_text_html(self):
         if not self.pairs: return
 
-        size_h_pt = self.spin_h.value()
-        size_p_pt = self.spin_p.value()
-        font_h = QFont(self.font_cb_h.currentText())
-        font_h.setPointSize(size_h_pt)
-        font_p = QFont(self.font_cb_p.currentText())
-        font_p.setPointSize(size_p_pt)
-        fm_h = QFontMetrics(font_h)
-        fm_p = QFontMetrics(font_p)
-
-        col_widths_pt = []
-        for item in self.pairs:
-            px_w_h = fm_h.horizontalAdvance(item["ch"])
-            px_w_p = fm_p.horizontalAdvance(item["py"])
-            max_px = max(px_w_h, px_w_p)
-            width_pt = int(max_px * 0.9)
-            col_widths_pt.append(width_pt)
-
-        html = '<table border="0" cellpadding="0" cellspacing="0" style="border-collapse: collapse; border: none;"><tr>'
-
-        for i, item in enumerate(self.pairs):
-            width = col_widths_pt[i]
-            color = item.get('color', self.render_color).name()
-            td_style = f"width: {width}pt; min-width: {width}pt; text-align: center; vertical-align: bottom; padding: 0;"
-            span_style = f"font-family: '{font_p.family()}'; font-size: {size_p_pt}pt; color: {color}; line-height: 100%;"
-            html += f'<td width="{width}" style="{td_style}"><span style="{span_style}">{item["py"]}</span></td>'
-
-        html += "</tr><tr>"
-
-        for i, item in enumerate(self.pairs):
-            width = col_widths_pt[i]
-            color = item.get('color', self.render_color).name()
-            td_style = f"width: {width}pt; min-width: {width}pt; text-align: center; vertical-align: top; padding: 0;"
-            span_style = f"font-family: '{font_h.family()}'; font-size: {size_h_pt}pt; color: {color}; line-height: 100%;"
-            html += f'<td width="{width}" style="{td_style}"><span style="{span_style}">{item["ch"]}</span></td>'
-
-        html += "</tr></table>"
-
-        plain_py = " ".join(item["py"] for item in self.pairs)
-        plain_hz = "".join(item["ch"] for item in self.pairs)
-        plain_text = f"{plain_py}\n{plain_hz}"
+        self.sync_engine()
+        html, plain_text = self.engine.to_html(self.pairs)
 
         try:
-            if win32clipboard:
-                # Build CF_HTML with required headers
-                fragment = html
-                html_doc = f"<html><body><!--StartFragment-->{fragment}<!--EndFragment--></body></html>"
-                
-                prefix = "Version:1.0\r\nStartHTML:{:010d}\r\nEndHTML:{:010d}\r\nStartFragment:{:010d}\r\nEndFragment:{:010d}\r\n"
-                dummy = prefix.format(0, 0, 0, 0)
-                prefix_len = len(dummy.encode("utf-8"))
-                
-                html_bytes = html_doc.encode("utf-8")
-                start_html = prefix_len
-                end_html = prefix_len + len(html_bytes)
-                start_frag = prefix_len + html_bytes.find(b"<!--StartFragment-->") + len(b"<!--StartFragment-->")
-                end_frag = prefix_len + html_bytes.find(b"<!--EndFragment-->")
-                
-                cf_html_data = prefix.format(start_html, end_html, start_frag, end_frag).encode("utf-8") + html_bytes
-                
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                # Set plain text (CF_UNICODETEXT)
-                win32clipboard.SetClipboardData(13, plain_text)
-                # Set HTML (CF_HTML)
-                cf_html = win32clipboard.RegisterClipboardFormat("HTML Format")
-                win32clipboard.SetClipboardData(cf_html, cf_html_data)
-                win32clipboard.CloseClipboard()
-            else:
-                mime = QMimeData()
-                mime.setText(plain_text)
-                mime.setHtml(html)
-                clipboard = QApplication.clipboard()
-                clipboard.setMimeData(mime)
+            self.set_clipboard_html(html, plain_text)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error: {e}")
             return
@@ -985,6 +1238,55 @@ class MainWindow(QMainWindow):
 
         QTimer.singleShot(1000, lambda: self.reset_copy_btn(self.btn_copy_txt, old_text, "#0078d7"))
 
+    @profiled
+    def save_as_docx(self):
+        """ Word document with native ruby annotations, e.g. for long passages that paste slowly as HTML """
+        if not self.pairs: return
+        tr = self.get_translation
+        path, _ = QFileDialog.getSaveFileName(self, tr("btn_save_docx"), "pinyin.docx", "Word (*.docx)")
+        if not path:
+            return
+        self.sync_engine()
+        try:
+            with DocxWriter.for_engine(path, self.engine) as writer:
+                writer.add_pairs(self.pairs)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error: {e}")
+
+    @staticmethod
+    def set_clipboard_html(html, plain_text):
+        if win32clipboard:
+            # Build CF_HTML with required headers
+            fragment = html
+            html_doc = f"<html><body><!--StartFragment-->{fragment}<!--EndFragment--></body></html>"
+            
+            prefix = "Version:1.0\r\nStartHTML:{:010d}\r\nEndHTML:{:010d}\r\nStartFragment:{:010d}\r\nEndFragment:{:010d}\r\n"
+            dummy = prefix.format(0, 0, 0, 0)
+            prefix_len = len(dummy.encode("utf-8"))
+            
+            html_bytes = html_doc.encode("utf-8")
+            start_html = prefix_len
+            end_html = prefix_len + len(html_bytes)
+            start_frag = prefix_len + html_bytes.find(b"<!--StartFragment-->") + len(b"<!--StartFragment-->")
+            end_frag = prefix_len + html_bytes.find(b"<!--EndFragment-->")
+            
+            cf_html_data = prefix.format(start_html, end_html, start_frag, end_frag).encode("utf-8") + html_bytes
+            
+            win32clipboard.OpenClipboard()
+            win32clipboard.EmptyClipboard()
+            # Set plain text (CF_UNICODETEXT)
+            win32clipboard.SetClipboardData(13, plain_text)
+            # Set HTML (CF_HTML)
+            cf_html = win32clipboard.RegisterClipboardFormat("HTML Format")
+            win32clipboard.SetClipboardData(cf_html, cf_html_data)
+            win32clipboard.CloseClipboard()
+        else:
+            mime = QMimeData()
+            mime.setText(plain_text)
+            mime.setHtml(html)
+            clipboard = QApplication.clipboard()
+            clipboard.setMimeData(mime)
+
     def setup_styles(self):
         plus_path = Utils.resource_path(os.path.join("assets", "plus.svg")).replace("\\", "/")
         minus_path = Utils.resource_path(os.path.join("assets", "minus.svg")).replace("\\", "/")
@@ -1,87 +1,395 @@
 import sys
 import os
+import re
+import json
+import time
+import hashlib
+import shutil
 import tempfile
 import subprocess
 import requests
 from PyQt6.QtCore import QThread, pyqtSignal, QObject, Qt
 from PyQt6.QtWidgets import QMessageBox, QProgressDialog
 
+from .utils import Utils
+from .delta import apply_delta, delta_asset_name, safe_join
+
+# Minimum time between network checks for silent (startup) update checks
+CHECK_INTERVAL = 6 * 60 * 60
+# Backoff after a rate-limit response without a reset hint, doubled on repeats
+MIN_BACKOFF = 15 * 60
+MAX_BACKOFF = 24 * 60 * 60
+
+_session = None
+
+def get_session():
+    """ Shared HTTP session so update requests reuse one connection pool """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers["User-Agent"] = "PinyinHelper-Updater"
+    return _session
+
+def parse_version(tag):
+    """ '1.2.10' -> (1, 2, 10, 1); pre-releases like '1.3.0-beta2' sort before the release """
+    tag = tag.strip().lstrip("vV")
+    match = re.match(r"^(\d+(?:\.\d+)*)(.*)$", tag)
+    if not match:
+        return ()
+    numbers = [int(n) for n in match.group(1).split(".")]
+    is_release = 0 if match.group(2).strip("-+. ") else 1
+    return tuple(numbers) + (is_release,)
+
+def is_newer(latest, current):
+    latest_v = parse_version(latest)
+    current_v = parse_version(current)
+    if not latest_v or not current_v:
+        return False
+    # Pad the numeric part so 1.1 and 1.1.0 compare equal
+    width = max(len(latest_v), len(current_v)) - 1
+    pad = lambda v: v[:-1] + (0,) * (width - len(v) + 1) + v[-1:]
+    return pad(latest_v) > pad(current_v)
+
+
 # --- 1. UPDATE CHECKER THREAD ---
 class UpdateChecker(QThread):
-    found = pyqtSignal(str, str)  # version, url
+    found = pyqtSignal(str, str, str, str, str)  # version, url, checksum url, delta url, delta checksum url ('' if none)
     not_found = pyqtSignal()
     error = pyqtSignal(str)
 
-    def __init__(self, current_version, repo_name):
+    def __init__(self, current_version, repo_name, force=False, api_url=None, cache_path=None):
         super().__init__()
         self.current_version = current_version.lstrip("v")
         self.repo_name = repo_name
+        self.force = force
+        self.api_url = api_url or f"https://api.github.com/repos/{repo_name}/releases/latest"
+        self.cache_path = cache_path or os.path.join(Utils.app_data_dir(), "update_cache.json")
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("url") == self.api_url:
+                return cache
+        except Exception:
+            pass
+        return {"url": self.api_url}
+
+    def save_cache(self, cache):
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=4)
+        except Exception as e:
+            print(f"Error saving update cache: {e}")
+
+    def fetch_release(self, cache):
+        """ Returns release metadata, from cache when it is fresh or unchanged on the server """
+        now = time.time()
+        if now < cache.get("backoff_until", 0):
+            if cache.get("release") and not self.force:
+                return cache["release"]
+            wait = int(cache["backoff_until"] - now) // 60 + 1
+            raise RuntimeError(f"GitHub API rate limit reached, retry in {wait} min")
+
+        if not self.force and cache.get("release") and now - cache.get("checked_at", 0) < CHECK_INTERVAL:
+            return cache["release"]
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if cache.get("etag") and cache.get("release"):
+            headers["If-None-Match"] = cache["etag"]
+
+        response = get_session().get(self.api_url, headers=headers, timeout=5)
+
+        if response.status_code == 304:
+            cache["checked_at"] = now
+            cache["backoff"] = 0
+            return cache["release"]
+
+        if response.status_code in (403, 429):
+            cache["backoff_until"] = now + self.backoff_delay(response, cache)
+            self.save_cache(cache)
+            raise RuntimeError(f"GitHub API Error: {response.status_code} (rate limited)")
+
+        if response.status_code != 200:
+            raise RuntimeError(f"GitHub API Error: {response.status_code}")
+
+        data = response.json()
+        # Keep only what we need so the cache stays small
+        cache["release"] = {
+            "tag_name": data.get("tag_name", ""),
+            "assets": [{"name": a.get("name", ""), "browser_download_url": a.get("browser_download_url", "")}
+                       for a in data.get("assets", [])],
+        }
+        cache["etag"] = response.headers.get("ETag", "")
+        cache["checked_at"] = now
+        cache["backoff"] = 0
+        cache["backoff_until"] = 0
+        return cache["release"]
+
+    @staticmethod
+    def backoff_delay(response, cache):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        reset = response.headers.get("X-RateLimit-Reset")
+        if response.headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+            return max(MIN_BACKOFF, int(reset) - time.time())
+        delay = min(MAX_BACKOFF, max(MIN_BACKOFF, cache.get("backoff", 0) * 2))
+        cache["backoff"] = delay
+        return delay
+
+    @staticmethod
+    def find_checksum(assets, filename):
+        """ URL of the SHA-256 published for filename: '<file>.sha256', else a checksum list ('' when missing) """
+        listing = ""
+        for asset in assets:
+            name = asset["name"]
+            if name == filename + ".sha256":
+                return asset["browser_download_url"]
+            if name.upper() in ("SHA256SUMS", "SHA256SUMS.TXT", "CHECKSUMS.TXT"):
+                listing = asset["browser_download_url"]
+        return listing
+
+    @staticmethod
+    def find_assets(assets):
+        """ Installer URL and the URL of its published SHA-256 ('' when missing) """
+        for asset in assets:
+            if asset["name"].endswith(".exe"):
+                return asset["browser_download_url"], UpdateChecker.find_checksum(assets, asset["name"])
+        return "", ""
 
     def run(self):
         try:
-            url = f"https://api.github.com/repos/{self.repo_name}/releases/latest"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                latest_tag = data.get("tag_name", "").lstrip("v")
-                
-                # Compare versions 
-                if latest_tag != self.current_version:
-                    # Find .exe in assets
-                    exe_url = ""
-                    for asset in data.get("assets", []):
-                        if asset["name"].endswith(".exe"):
-                            exe_url = asset["browser_download_url"]
-                            break
-                    
-                    if exe_url:
-                        self.found.emit(latest_tag, exe_url)
-                    else:
-                        self.not_found.emit()
+            cache = self.load_cache()
+            release = self.fetch_release(cache)
+            self.save_cache(cache)
+
+            latest_tag = release.get("tag_name", "").lstrip("v")
+            if is_newer(latest_tag, self.current_version):
+                # Find .exe in assets
+                assets = release.get("assets", [])
+                exe_url, checksum_url = self.find_assets(assets)
+                delta_url, delta_checksum_url = "", ""
+                delta_name = delta_asset_name(self.current_version, latest_tag)
+                for asset in assets:
+                    if asset["name"] == delta_name:
+                        delta_url = asset["browser_download_url"]
+                        # Without a published hash the manifest's per-file hashes still guard the delta
+                        delta_checksum_url = self.find_checksum(assets, delta_name)
+
+                if exe_url:
+                    self.found.emit(latest_tag, exe_url, checksum_url, delta_url, delta_checksum_url)
                 else:
                     self.not_found.emit()
             else:
-                self.error.emit(f"GitHub API Error: {response.status_code}")
+                self.not_found.emit()
         except Exception as e:
             self.error.emit(str(e))
 
 # --- 2. DOWNLOAD WORKER THREAD ---
+class DownloadCancelled(Exception):
+    pass
+
 class DownloadWorker(QThread):
     progress = pyqtSignal(int)
     finished = pyqtSignal(str) 
     error = pyqtSignal(str)
 
-    def __init__(self, url):
+    CHUNK_SIZE = 256 * 1024
+    WRITE_BUFFER = 1024 * 1024
+    PROGRESS_INTERVAL = 0.1  # seconds between progress signals
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, url, checksum_url="", dest_dir=None):
         super().__init__()
         self.url = url
+        self.checksum_url = checksum_url
+        # Create path in Windows temp directory
+        self.dest_dir = dest_dir or tempfile.gettempdir()
+        self.cancelled = False
+        # Set once the download matched a published SHA-256; without one the installer is unverified
+        self.verified = False
+        self._last_emit = 0.0
+        self._last_percent = -1
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fetch_expected_hash(self, filename):
+        """ SHA-256 published next to the download ('<file>.sha256' or a SHA256SUMS list) """
+        if not self.checksum_url:
+            return ""
+        response = get_session().get(self.checksum_url, timeout=10)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            parts = line.replace("*", " ").split()
+            if not parts or not re.fullmatch(r"[0-9a-fA-F]{64}", parts[0]):
+                continue
+            # Single-hash files have no name; checksum lists must name our file
+            if len(parts) == 1 or parts[-1] == filename:
+                return parts[0].lower()
+        raise RuntimeError(f"No checksum for {filename} in {self.checksum_url}")
+
+    def emit_progress(self, done, total, force=False):
+        if total <= 0:
+            return
+        percent = min(100, int(done * 100 / total))
+        now = time.monotonic()
+        if force or (percent != self._last_percent and now - self._last_emit >= self.PROGRESS_INTERVAL):
+            self._last_percent = percent
+            self._last_emit = now
+            self.progress.emit(percent)
+
+    def download_to(self, part_path, meta_path):
+        """ Stream into part_path, resuming from where a previous attempt stopped """
+        hasher = hashlib.sha256()
+        done = 0
+        etag = ""
+        if os.path.exists(part_path):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    etag = json.load(f).get("etag", "")
+            except Exception:
+                etag = ""
+            if etag:
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(self.WRITE_BUFFER), b""):
+                        hasher.update(block)
+                        done += len(block)
+
+        headers = {}
+        if done:
+            headers["Range"] = f"bytes={done}-"
+            headers["If-Range"] = etag
+
+        with get_session().get(self.url, stream=True, timeout=10, headers=headers) as response:
+            if response.status_code == 416 and done:
+                # Nothing past what we have: either the .part is already complete, or it is
+                # longer than the file on the server now and has to go
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit() and int(total) == done:
+                    self.emit_progress(done, done, force=True)
+                    return hasher.hexdigest()
+                response.close()
+                for path in (part_path, meta_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                return self.download_to(part_path, meta_path)
+            if response.status_code == 206:
+                total_size = done + int(response.headers.get("content-length", 0))
+                mode = "ab"
+            else:
+                response.raise_for_status()
+                # Server ignored the range or the file changed: start over
+                hasher = hashlib.sha256()
+                done = 0
+                total_size = int(response.headers.get("content-length", 0))
+                mode = "wb"
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"url": self.url, "etag": response.headers.get("ETag", "")}, f)
+
+            with open(part_path, mode, buffering=self.WRITE_BUFFER) as f:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if self.cancelled:
+                        raise DownloadCancelled()
+                    if chunk:
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        done += len(chunk)
+                        self.emit_progress(done, total_size)
+
+        if total_size and done != total_size:
+            raise IOError(f"Incomplete download: {done} of {total_size} bytes")
+        self.emit_progress(done, total_size, force=True)
+        return hasher.hexdigest()
 
     def run(self):
         try:
-            # Create path in Windows temp directory
-            temp_dir = tempfile.gettempdir()
             # Get filename from URL 
             filename = self.url.split("/")[-1]
-            save_path = os.path.join(temp_dir, filename)
+            save_path = os.path.join(self.dest_dir, filename)
+            part_path = save_path + ".part"
+            meta_path = part_path + ".json"
 
-            response = requests.get(self.url, stream=True, timeout=10)
-            total_size = int(response.headers.get('content-length', 0))
-            
-            downloaded = 0
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size > 0:
-                            percent = int((downloaded / total_size) * 100)
-                            self.progress.emit(percent)
-            
+            expected = self.fetch_expected_hash(filename)
+
+            attempt = 0
+            while True:
+                try:
+                    digest = self.download_to(part_path, meta_path)
+                    break
+                except requests.HTTPError:
+                    raise
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, IOError):
+                    attempt += 1
+                    if attempt >= self.MAX_ATTEMPTS or self.cancelled:
+                        raise
+                    time.sleep(min(2 ** attempt, 10))
+
+            if expected and digest != expected:
+                os.remove(part_path)
+                os.remove(meta_path)
+                raise RuntimeError("Checksum mismatch, the downloaded installer was discarded")
+            self.verified = bool(expected)
+
+            os.replace(part_path, save_path)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
             self.finished.emit(save_path)
-            
+
+        except DownloadCancelled:
+            pass
         except Exception as e:
             self.error.emit(str(e))
 
-# --- 3. UPDATER CONTROLLER ---
+# --- 3. DELTA APPLY THREAD ---
+class DeltaWorker(QThread):
+    finished = pyqtSignal(str, list)  # staging dir, files to delete
+    error = pyqtSignal(str)
+
+    def __init__(self, package_path, install_dir, current_version):
+        super().__init__()
+        self.package_path = package_path
+        self.install_dir = install_dir
+        self.current_version = current_version
+
+    def run(self):
+        staging_dir = tempfile.mkdtemp(prefix="PinyinHelper-update-")
+        try:
+            manifest = apply_delta(self.package_path, self.install_dir, staging_dir, self.current_version)
+            deletes = [safe_join(self.install_dir, e["path"]) for e in manifest["files"] if e["op"] == "delete"]
+            self.finished.emit(staging_dir, deletes)
+        except Exception as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            self.error.emit(str(e))
+        finally:
+            try:
+                os.remove(self.package_path)
+            except OSError:
+                pass
+
+def write_swap_script(install_dir, staging_dir, deletes, exe_path, pid):
+    """ Batch script that waits for pid to exit, swaps in the staged files and restarts """
+    lines = [
+        "@echo off",
+        "chcp 65001 >nul",
+        ":wait",
+        f'tasklist /FI "PID eq {pid}" 2>nul | find "{pid}" >nul && (timeout /t 1 /nobreak >nul & goto wait)',
+        f'xcopy "{staging_dir}\\*" "{install_dir}" /E /I /Y /Q /R >nul',
+    ]
+    for path in deletes:
+        lines.append(f'del /F /Q "{path}" 2>nul')
+    lines += [
+        f'rmdir /S /Q "{staging_dir}"',
+        f'start "" "{exe_path}"',
+        '(goto) 2>nul & del "%~f0"',
+    ]
+    script = os.path.join(tempfile.gettempdir(), f"PinyinHelper-swap-{pid}.cmd")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("\r\n".join(lines) + "\r\n")
+    return script
+
+# --- 4. UPDATER CONTROLLER ---
 class Updater(QObject):
     def __init__(self, parent_window, current_version, repo_name):
         super().__init__(parent_window)
@@ -89,6 +397,10 @@ class Updater(QObject):
         self.current_version = current_version
         self.repo_name = repo_name
         self.download_url = ""
+        self.checksum_url = ""
+        self.delta_url = ""
+        self.delta_checksum_url = ""
+        self.delta_worker = None
         self.checker = None
         self.downloader = None
         self.progress_dialog = None
@@ -96,7 +408,8 @@ class Updater(QObject):
     def check_for_updates(self, silent=True):
         """Start update check"""
         self.silent_mode = silent
-        self.checker = UpdateChecker(self.current_version, self.repo_name)
+        # Manual checks always ask GitHub (conditionally); silent ones respect CHECK_INTERVAL
+        self.checker = UpdateChecker(self.current_version, self.repo_name, force=not silent)
         self.checker.found.connect(self.on_update_found)
         
         # Helper for translation
@@ -115,8 +428,12 @@ class Updater(QObject):
             ))
         self.checker.start()
 
-    def on_update_found(self, version, url):
+    def on_update_found(self, version, url, checksum_url, delta_url, delta_checksum_url):
         self.download_url = url
+        self.checksum_url = checksum_url
+        self.delta_checksum_url = delta_checksum_url
+        # Deltas patch the installed build in place, so they only apply to the frozen app
+        self.delta_url = delta_url if getattr(sys, "frozen", False) else ""
         tr = getattr(self.parent, "get_translation", lambda k: k)
         
         title = tr("msg_update_available_title")
@@ -136,20 +453,70 @@ class Updater(QObject):
         self.progress_dialog.setWindowModality(Qt.WindowModality.ApplicationModal) # Block window
         self.progress_dialog.show()
 
-        self.downloader = DownloadWorker(self.download_url)
+        use_delta = bool(self.delta_url)
+        if use_delta:
+            self.downloader = DownloadWorker(self.delta_url, self.delta_checksum_url)
+        else:
+            self.downloader = DownloadWorker(self.download_url, self.checksum_url)
         self.downloader.progress.connect(self.progress_dialog.setValue)
-        self.downloader.finished.connect(self.install_and_restart)
-        self.downloader.error.connect(lambda e: QMessageBox.critical(
-            self.parent, 
-            tr("msg_error_title"), 
-            tr("msg_download_error").format(error=e)
-        ))
+        self.progress_dialog.canceled.connect(self.downloader.cancel)
+        if use_delta:
+            self.downloader.finished.connect(self.apply_delta_update)
+            self.downloader.error.connect(self.fallback_to_installer)
+        else:
+            self.downloader.finished.connect(self.install_and_restart)
+            self.downloader.error.connect(lambda e: QMessageBox.critical(
+                self.parent, 
+                tr("msg_error_title"), 
+                tr("msg_download_error").format(error=e)
+            ))
         self.downloader.start()
 
+    def fallback_to_installer(self, reason):
+        print(f"Delta update not used ({reason}), downloading full installer")
+        self.delta_url = ""
+        if self.progress_dialog:
+            self.progress_dialog.close()
+        self.start_download()
+
+    def apply_delta_update(self, package_path):
+        install_dir = os.path.dirname(sys.executable)
+        self.delta_worker = DeltaWorker(package_path, install_dir, self.current_version)
+        self.delta_worker.finished.connect(lambda staging, deletes: self.swap_and_restart(install_dir, staging, deletes))
+        self.delta_worker.error.connect(self.fallback_to_installer)
+        self.delta_worker.start()
+
+    def swap_and_restart(self, install_dir, staging_dir, deletes):
+        """ Copy staged files over the install once this process has exited, then relaunch """
+        self.progress_dialog.close()
+        tr = getattr(self.parent, "get_translation", lambda k: k)
+        try:
+            script = write_swap_script(install_dir, staging_dir, deletes, sys.executable, os.getpid())
+            subprocess.Popen(["cmd", "/c", script], creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+            sys.exit(0)
+        except Exception as e:
+            QMessageBox.critical(
+                self.parent, 
+                tr("msg_error_title"), 
+                tr("msg_install_error").format(error=e)
+            )
+
     def install_and_restart(self, file_path):
         self.progress_dialog.close()
         tr = getattr(self.parent, "get_translation", lambda k: k)
-        
+
+        if not self.downloader.verified:
+            # The release publishes no SHA-256 for the installer: only run it if the user says so
+            reply = QMessageBox.warning(self.parent, tr("msg_unverified_title"), tr("msg_unverified_content"),
+                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                        QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+                return
+
         try:
             # Run installer
             subprocess.Popen([file_path], shell=True)
@@ -16,6 +16,14 @@ class Utils:
 
         return os.path.join(base_path, relative_path)
 
+    @staticmethod
+    def app_data_dir(*parts):
+        """ Per-user writable folder for caches and diagnostics, created on demand """
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        path = os.path.join(base, "PinyinHelper", *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
     @staticmethod
     def load_translations(lang_code):
         """ Load translation for the given language code """
@@ -63,6 +71,9 @@ class ConfigManager:
             "favorite_fonts_hanzi": self.config.get("favorite_fonts_hanzi", ["Microsoft YaHei", "KaiTi"]),
             "favorite_fonts_pinyin": self.config.get("favorite_fonts_pinyin", ["Arial"])
         }
+        # Hand-edited setting, kept as long as the user has set it
+        if "memory_budget_mb" in self.config:
+            save_data["memory_budget_mb"] = self.config["memory_budget_mb"]
         try:
             with open(self.config_file, "w", encoding="utf-8") as f:
                 json.dump(save_data, f, indent=4)
@@ -0,0 +1,191 @@
+import os
+import json
+import signal
+import hashlib
+from html import escape
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer
+
+from .engine import Engine, HIGH_RES_SCALE, clean_text
+from .phrases import PhraseDictionary
+
+WATCH_SUFFIXES = (".txt",)
+# Editors save in several steps; wait for the file to settle before reading it
+DEBOUNCE_MS = 300
+MANIFEST_NAME = "manifest.json"
+
+
+class FolderRenderer:
+    """ Incrementally renders the lines of text files to PNG and HTML.
+
+    Each non-empty line is keyed by a hash of its text and the render
+    settings; outputs are content-addressed (<hash>.png / <hash>.html) inside
+    out_dir/<file stem>/, so an edited line costs one conversion and render
+    and unchanged lines are reused even when lines are inserted above them.
+    A manifest keeps the line order, and <stem>.html stitches the fragments
+    back together from memory.
+    """
+    def __init__(self, engine, out_dir, scale=HIGH_RES_SCALE, max_width=None):
+        self.engine = engine
+        self.out_dir = out_dir
+        self.scale = scale
+        self.max_width = max_width
+        settings = (engine.font_hanzi, engine.font_pinyin, engine.size_hanzi,
+                    engine.color.name(), scale, max_width)
+        self.settings_key = json.dumps(settings, ensure_ascii=False)
+        # folder -> {line hash: HTML fragment}, so the combined page is rebuilt without re-reading every fragment
+        self.fragments = {}
+
+    def line_hash(self, text):
+        return hashlib.sha1((self.settings_key + "\n" + text).encode("utf-8")).hexdigest()[:20]
+
+    def update(self, path):
+        """ Bring the outputs for one text file up to date; returns the number of lines rendered """
+        stem = os.path.splitext(os.path.basename(path))[0]
+        folder = os.path.join(self.out_dir, stem)
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                lines = [clean_text(line) for line in f]
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            return 0
+        os.makedirs(folder, exist_ok=True)
+
+        hashes = [self.line_hash(text) if text else "" for text in lines]
+        fragments = self.fragments.setdefault(folder, {})
+        # One listing instead of a stat per line; outputs deleted by hand are rendered again
+        present = set(os.listdir(folder))
+        rendered = 0
+        for text, h in zip(lines, hashes):
+            if not h:
+                continue
+            png_name, html_name = h + ".png", h + ".html"
+            if png_name not in present or html_name not in present:
+                fragments[h] = self._render_line(text, os.path.join(folder, png_name), os.path.join(folder, html_name))
+                present.update((png_name, html_name))
+                rendered += 1
+            elif h not in fragments:
+                # Rendered in an earlier run: read its fragment once
+                fragments[h] = self._read_fragment(os.path.join(folder, html_name))
+
+        # Outputs of lines that no longer exist
+        wanted = set(hashes)
+        for name in present:
+            h, ext = os.path.splitext(name)
+            if ext in (".png", ".html") and h not in wanted and h != stem:
+                fragments.pop(h, None)
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+        self._write_index(folder, stem, hashes, fragments)
+        with open(os.path.join(folder, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({"source": os.path.abspath(path), "settings": self.settings_key, "lines": hashes}, f)
+        return rendered
+
+    def _render_line(self, text, png_path, html_path):
+        """ Write the PNG and HTML fragment of one line; returns the fragment """
+        engine = self.engine
+        pairs = engine.convert(text)
+        engine.size_pinyin = engine.fit_pinyin_size(pairs)
+        with open(png_path, "wb") as f:
+            f.write(Engine.encode_png(engine.render(pairs, self.scale, self.max_width)))
+        html, _ = engine.to_html(pairs)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        return html
+
+    @staticmethod
+    def _read_fragment(html_path):
+        try:
+            with open(html_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_index(self, folder, stem, hashes, fragments):
+        parts = [f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{escape(stem)}</title></head><body>"]
+        for h in hashes:
+            html = fragments.get(h) if h else None
+            if html is not None:
+                parts.append(f"<div>{html}</div>")
+        parts.append("</body></html>")
+        with open(os.path.join(folder, stem + ".html"), "w", encoding="utf-8") as f:
+            f.write("\n".join(parts))
+
+
+class FolderWatcher(QObject):
+    """ Re-renders text files in a directory whenever they change """
+    def __init__(self, directory, renderer):
+        super().__init__()
+        self.directory = directory
+        self.renderer = renderer
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self.watcher.fileChanged.connect(self._schedule)
+        self.timers = {}
+
+    def start(self):
+        self.watcher.addPath(self.directory)
+        for path in self._text_files():
+            self._process(path)
+
+    def _text_files(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return []
+        return [os.path.join(self.directory, n) for n in names if n.lower().endswith(WATCH_SUFFIXES)]
+
+    def _on_directory_changed(self, _):
+        # New files, and files replaced by editors that save via rename, show up here
+        watched = set(self.watcher.files())
+        for path in self._text_files():
+            if path not in watched:
+                self._schedule(path)
+
+    def _schedule(self, path):
+        timer = self.timers.get(path)
+        if timer is None:
+            timer = self.timers[path] = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(DEBOUNCE_MS)
+            timer.timeout.connect(lambda p=path: self._process(p))
+        timer.start()
+
+    def _process(self, path):
+        if not os.path.exists(path):
+            return
+        if path not in self.watcher.files():
+            self.watcher.addPath(path)
+        try:
+            count = self.renderer.update(path)
+        except Exception as e:
+            print(f"Error rendering {path}: {e}")
+            return
+        print(f"{os.path.basename(path)}: {count} line(s) rendered")
+
+
+def run_watch(args, config):
+    """ Entry point for --watch: keep annotations in --out in sync with the text files in a folder """
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication(["PinyinHelper-watch"])
+
+    if not os.path.isdir(args.watch):
+        print(f"Not a directory: {args.watch}")
+        return 1
+    engine = Engine(
+        font_hanzi=args.font_hanzi or config.get("favorite_fonts_hanzi", ["Microsoft YaHei"])[0],
+        font_pinyin=args.font_pinyin or config.get("favorite_fonts_pinyin", ["Arial"])[0],
+        size_hanzi=args.size,
+        color=args.color,
+        phrases=PhraseDictionary(),
+    )
+    renderer = FolderRenderer(engine, args.out, scale=args.scale or HIGH_RES_SCALE, max_width=args.wrap)
+    watcher = FolderWatcher(os.path.abspath(args.watch), renderer)
+    watcher.start()
+    print(f"Watching {args.watch} (Ctrl+C to stop)")
+    # Qt's event loop does not return to Python for KeyboardInterrupt; let Ctrl+C end the process
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    return app.exec()
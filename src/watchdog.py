@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from PyQt6.QtCore import QObject, QTimer
+
+from .utils import Utils
+
+HEARTBEAT_INTERVAL = 0.05
+STALL_THRESHOLD = 0.25
+# Further stack samples taken while a long stall lasts, one every STALL_THRESHOLD
+MAX_SAMPLES = 4
+# Upper bounds of the histogram buckets in seconds; the last bucket is open-ended
+BUCKETS = (0.5, 1.0, 2.0, 5.0)
+LOG_MAX_BYTES = 512 * 1024
+LOG_BACKUPS = 3
+
+
+class StallWatchdog(QObject):
+    """ Detects GUI event-loop stalls and logs what the GUI thread was doing.
+
+    A QTimer on the GUI thread records a heartbeat; a plain Python thread
+    notices when the heartbeat is late, samples the GUI thread's stack while
+    the stall lasts, and writes one log entry with the duration once the
+    event loop recovers.
+    """
+    def __init__(self, threshold=STALL_THRESHOLD, interval=HEARTBEAT_INTERVAL, log_path=None):
+        super().__init__()
+        self.threshold = threshold
+        self.interval = interval
+        self.gui_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+
+        self.stalls = 0
+        self.longest = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.log_path = log_path or os.path.join(Utils.app_data_dir("diagnostics"), "stalls.log")
+        self.logger = logging.getLogger("PinyinHelper.stalls")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            try:
+                handler = RotatingFileHandler(self.log_path, maxBytes=LOG_MAX_BYTES,
+                                              backupCount=LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self.logger.addHandler(handler)
+            except OSError as e:
+                print(f"Error opening stall log: {e}")
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(interval * 1000))
+        self.timer.timeout.connect(self._beat)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.last_beat = time.perf_counter()
+        self.timer.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="StallWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _beat(self):
+        self.last_beat = time.perf_counter()
+
+    def _gui_stack(self):
+        frame = sys._current_frames().get(self.gui_thread_id)
+        if frame is None:
+            return ""
+        return "".join(traceback.format_stack(frame))
+
+    def _run(self):
+        stall_beat = None
+        samples = []
+        while not self._stop.wait(self.interval):
+            beat = self.last_beat
+            late = time.perf_counter() - beat - self.interval
+            if stall_beat is not None and beat != stall_beat:
+                # The event loop is back; the next heartbeat came this much later than due
+                self._record(beat - stall_beat - self.interval, samples)
+                stall_beat = None
+                samples = []
+            if late >= self.threshold:
+                if stall_beat is None:
+                    stall_beat = beat
+                if len(samples) < MAX_SAMPLES and late >= self.threshold * (len(samples) + 1):
+                    samples.append((late, self._gui_stack()))
+
+    def _record(self, duration, samples):
+        with self._lock:
+            self.stalls += 1
+            self.longest = max(self.longest, duration)
+            for i, bound in enumerate(BUCKETS):
+                if duration < bound:
+                    self.histogram[i] += 1
+                    break
+            else:
+                self.histogram[-1] += 1
+
+        lines = [f"UI stall {duration * 1000:.0f} ms"]
+        previous = None
+        for late, stack in samples:
+            if stack == previous:
+                lines.append(f"  at {late * 1000:.0f} ms: same stack")
+                continue
+            lines.append(f"  at {late * 1000:.0f} ms:")
+            lines.append(stack.rstrip())
+            previous = stack
+        self.logger.info("\n".join(lines))
+
+    def bucket_labels(self):
+        labels = []
+        lower = self.threshold
+        for bound in BUCKETS:
+            labels.append(f"{lower:g}-{bound:g} s")
+            lower = bound
+        labels.append(f">{lower:g} s")
+        return labels
+
+    def summary(self):
+        with self._lock:
+            if not self.stalls:
+                return ""
+            counts = list(self.histogram)
+            lines = [f"UI stalls: {self.stalls}, longest {self.longest * 1000:.0f} ms (log: {self.log_path})"]
+        for label, count in zip(self.bucket_labels(), counts):
+            if count:
+                lines.append(f"  {label:<12}{count:>6}")
+        return "\n".join(lines)
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+if sys.platform.startswith("linux"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Keep history, phrases and logs written by the code under test away from the real profile
+os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="pinyin-tests-")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,47 @@
+import pytest
+from PyQt6.QtGui import QColor, QImage
+
+from src import engine
+from src.atlas import GlyphAtlas, MAX_CHANNEL_ERROR
+from src.engine import Engine
+
+TEXT = "学而时习之 Hello, 2024! 绿女"
+
+
+def channels(img):
+    img = img.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    bits = img.constBits()
+    bits.setsize(img.sizeInBytes())
+    return bytes(bits)
+
+
+def max_channel_difference(a, b):
+    assert a.size() == b.size()
+    return max((abs(x - y) for x, y in zip(channels(a), channels(b))), default=0)
+
+
+def render_direct(eng, pairs, scale, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(engine, "MIN_PIXEL_SIZE", 10 ** 6)
+        return eng.render(pairs, scale)
+
+
+@pytest.mark.parametrize("scale", [3.0, 4.5, 6.0, 8.0])
+@pytest.mark.parametrize("color", ["#000000", "#c81e3c"])
+def test_atlas_matches_direct_drawing(qapp, monkeypatch, scale, color):
+    eng = Engine(size_hanzi=32, size_pinyin=18, color=QColor(color))
+    pairs = eng.convert(TEXT)
+    pairs.set_color(1, QColor("#0a78fa"))
+    blitted = eng.render(pairs, scale)
+    assert eng.atlas.misses > 0
+    direct = render_direct(eng, pairs, scale, monkeypatch)
+    assert max_channel_difference(blitted, direct) <= MAX_CHANNEL_ERROR
+
+
+def test_tiles_are_reused_and_released(qapp):
+    eng = Engine(size_hanzi=32, size_pinyin=18)
+    eng.render(eng.convert("你你你"), 6.0)
+    assert eng.atlas.hits >= 2
+    freed = eng.atlas.release(eng.atlas.bytes)
+    assert freed > 0 and len(eng.atlas) == 0 and eng.atlas.bytes == 0
+    assert isinstance(eng.atlas, GlyphAtlas)
@@ -0,0 +1,77 @@
+import json
+import zlib
+import base64
+
+from src import coverage
+from src.coverage import CoverageIndex, INDEX_BYTES, open_font, build_bitset
+
+FAMILY = "DejaVu Sans"
+
+
+def make_index(tmp_path, covered):
+    index = CoverageIndex(str(tmp_path / "coverage.json"))
+    bits = bytearray(INDEX_BYTES)
+    for ch in covered:
+        cp = ord(ch)
+        bits[cp >> 3] |= 1 << (cp & 7)
+    index.bitsets["Test"] = bytes(bits)
+    return index
+
+
+def run_ensure(qapp, index, families, revalidate=False):
+    index.ensure(families, revalidate)
+    for builder in list(index.builders):
+        builder.wait()
+    qapp.processEvents()
+
+
+def test_supplementary_han_uses_the_index(qapp, tmp_path):
+    index = make_index(tmp_path, "中\U00020000")
+    assert index.missing("Test", "中\U00020000") == []
+    assert index.missing("Test", "中\U0002A6D6") == ["\U0002A6D6"]
+
+
+def test_code_points_outside_the_index_are_not_reported(qapp, tmp_path):
+    index = make_index(tmp_path, "中")
+    assert index.missing("Test", "中\U0001F600") == []
+
+
+def test_built_index_covers_supplementary_planes(qapp, tmp_path):
+    raw, signature = open_font(FAMILY)
+    assert raw is not None and signature
+    bits = build_bitset(raw)
+    assert len(bits) == INDEX_BYTES
+    index = CoverageIndex(str(tmp_path / "coverage.json"))
+    index.bitsets[FAMILY] = bits
+    assert index.missing(FAMILY, "Abc") == []
+    assert index.missing(FAMILY, "\U00020000") == ["\U00020000"]
+
+
+def test_revalidation_reuses_unchanged_fonts(qapp, tmp_path, monkeypatch):
+    path = tmp_path / "coverage.json"
+    index = CoverageIndex(str(path))
+    run_ensure(qapp, index, [FAMILY])
+    assert FAMILY in index.bitsets and path.exists()
+
+    builds = []
+    real_build = coverage.build_bitset
+    monkeypatch.setattr(coverage, "build_bitset", lambda raw: builds.append(raw) or real_build(raw))
+    reloaded = CoverageIndex(str(path))
+    assert reloaded.bitsets[FAMILY] == index.bitsets[FAMILY]
+    run_ensure(qapp, reloaded, [FAMILY], revalidate=True)
+    assert builds == []
+    assert not reloaded._pending
+
+    # A different signature (font file replaced) is rebuilt
+    reloaded.signatures[FAMILY] = "stale"
+    run_ensure(qapp, reloaded, [FAMILY], revalidate=True)
+    assert len(builds) == 1
+    assert reloaded.signatures[FAMILY] == index.signatures[FAMILY]
+
+
+def test_indexes_of_another_size_are_dropped_on_load(qapp, tmp_path):
+    path = tmp_path / "coverage.json"
+    old = base64.b64encode(zlib.compress(bytes(0x10000 // 8))).decode("ascii")
+    path.write_text(json.dumps({FAMILY: {"sig": "x", "bits": old}}))
+    index = CoverageIndex(str(path))
+    assert not index.is_known(FAMILY)
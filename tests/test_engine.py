@@ -0,0 +1,21 @@
+import pytest
+
+from src.engine import Engine, clean_text, is_han
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("你 好", "你好"),
+    ("你好\r\n世界", "你好世界"),
+    ("你好，\n世界。", "你好，世界。"),
+    ("Hello world 你好", "Hello world 你好"),
+    ("  Hello\n\nworld  ", "Hello world"),
+    ("我有 3 本书", "我有 3 本书"),
+])
+def test_clean_text(raw, expected):
+    assert clean_text(raw) == expected
+
+
+def test_convert_keeps_latin_words_apart(qapp):
+    pairs = Engine().convert(clean_text("Hello world 你好"))
+    assert list(pairs.chars) == ["Hello world ", "你", "好"]
+    assert [py for ch, py in zip(pairs.chars, pairs.syllables) if not is_han(ch)] == [""]
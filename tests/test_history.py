@@ -0,0 +1,41 @@
+import pytest
+from PyQt6.QtGui import QColor
+
+from src.history import HistoryStore, toneless
+from src.pairs import PairStore
+
+
+def make_pairs(chars, syllables):
+    pairs = PairStore()
+    for ch, py in zip(chars, syllables):
+        pairs.append(ch, py, QColor(0, 0, 0))
+    return pairs
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.record("你好", make_pairs("你好", ["nǐ", "hǎo"]), "KaiTi", "Arial", 32, 18)
+    store.record("中文", make_pairs("中文", ["zhōng", "wén"]), "KaiTi", "Arial", 32, 18)
+    yield store
+    store.close()
+
+
+def test_toneless():
+    assert toneless("Nǐ hǎo") == "nihao"
+    assert toneless("lǜ") == "lu"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("你好", ["你好"]),
+    ("nǐ hǎo", ["你好"]),
+    ("nihao", ["你好"]),
+    ("ni hao", ["你好"]),
+    ("hao", ["你好"]),
+    ("zhong", ["中文"]),
+    ("wén", ["中文"]),
+    ("xyz", []),
+])
+def test_search(store, query, expected):
+    assert [e.text for e in store.search(query)] == expected
+
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+from src.instance import InstanceServer, STARTUP_WAIT_MS
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A second launch: tries to become the resident instance and reports whether it would keep running
+SECOND_LAUNCH = """
+import sys
+from PyQt6.QtCore import QCoreApplication
+from src.instance import InstanceServer
+app = QCoreApplication([])
+print("resident" if InstanceServer().acquire({"command": "analyze", "text": "你好"}) else "exit")
+"""
+
+
+def launch_second(app, args=("-c", SECOND_LAUNCH), timeout=30):
+    """ Runs a second launch in a child process while this one keeps serving; returns (output, seconds) """
+    started = time.monotonic()
+    child = subprocess.Popen([sys.executable, *args], cwd=PROJECT_ROOT,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    while child.poll() is None:
+        if time.monotonic() - started > timeout:
+            child.kill()
+            pytest.fail("second launch did not exit")
+        app.processEvents()
+        time.sleep(0.01)
+    lines = child.stdout.read().strip().splitlines()
+    return (lines[-1] if lines else f"exit code {child.returncode}"), time.monotonic() - started
+
+
+@pytest.fixture
+def resident(qapp):
+    server = InstanceServer()
+    assert server.acquire({"command": "show"})
+    yield server
+    server.close()
+
+
+def test_second_launch_forwards_and_exits(qapp, resident):
+    received = []
+    resident.message_received.connect(received.append)
+    output, _ = launch_second(qapp)
+    assert output == "exit"
+    assert received == [{"command": "analyze", "text": "你好"}]
+
+
+def test_app_launch_forwards_to_resident(qapp, resident):
+    # The real entry point, as a second double-click or a shell integration would start it
+    received = []
+    resident.message_received.connect(received.append)
+    output, _ = launch_second(qapp, ("run.py", "--analyze", "你好"))
+    assert output == "exit code 0"
+    assert received == [{"command": "analyze", "text": "你好"}]
+
+
+def test_unresponsive_resident_is_not_duplicated(qapp, resident):
+    # Holds the lock but no longer answers
+    resident.server.close()
+    output, seconds = launch_second(qapp)
+    assert output == "exit"
+    assert seconds >= STARTUP_WAIT_MS / 1000
+
+
+def test_lock_is_free_after_close(qapp, resident):
+    resident.close()
+    output, _ = launch_second(qapp)
+    assert output == "resident"
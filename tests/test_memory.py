@@ -0,0 +1,58 @@
+from src.memory import MemoryGovernor
+
+
+class Cache:
+    def __init__(self, size):
+        self.size = size
+        self.releases = 0
+
+    def release(self, excess):
+        self.releases += 1
+        freed, self.size = self.size, 0
+        return freed
+
+
+def make_governor(fixed, cached, budget=100):
+    governor = MemoryGovernor(budget)
+    cache = Cache(cached)
+    governor.register("widgets", lambda: fixed)
+    governor.register("cache", lambda: cache.size, cache.release)
+    return governor, cache
+
+
+def test_releases_caches_over_budget(qapp):
+    governor, cache = make_governor(fixed=60, cached=70)
+    assert governor.check() == 70
+    assert cache.size == 0
+
+
+def test_leaves_caches_alone_within_budget(qapp):
+    governor, cache = make_governor(fixed=60, cached=30)
+    assert governor.check() == 0
+    assert cache.releases == 0
+
+
+def test_does_not_thrash_when_fixed_usage_fills_budget(qapp):
+    governor, cache = make_governor(fixed=150, cached=30)
+    for _ in range(3):
+        assert governor.check() == 0
+    assert cache.releases == 0
+    assert "exceed the budget" in governor.summary()
+
+
+def test_fit_scale_shrinks_when_nothing_can_be_released(qapp):
+    governor, _ = make_governor(fixed=150, cached=30, budget=200)
+    assert governor.fit_scale(lambda s: (int(10 * s), int(10 * s)), 6.0) == 1.0
+
+
+def test_fit_scale_releases_caches_before_shrinking(qapp):
+    # The image alone is larger than the budget: the cache is emptied, then the scale drops against what is left
+    governor, cache = make_governor(fixed=10_000, cached=60_000, budget=100_000)
+    image_size = lambda s: (int(20 * s), int(20 * s))
+    assert 120 * 120 * 4 * 2.5 > governor.budget
+    scale = governor.fit_scale(image_size, 6.0)
+    assert cache.releases == 1 and cache.size == 0
+    # sqrt(90k / 144k) of 6.0, rounded down to a quarter; 2.5 if the cache had been kept
+    assert scale == 4.5
+    w, h = image_size(scale)
+    assert w * h * 4 * 2.5 <= governor.headroom()
@@ -0,0 +1,66 @@
+import pytest
+
+from src.engine import Engine
+from src.phrases import PhraseDictionary
+
+
+@pytest.fixture
+def phrases(tmp_path):
+    return PhraseDictionary(str(tmp_path / "user_phrases.json"))
+
+
+def readings(engine, text):
+    pairs = engine.convert(text)
+    return list(zip(pairs.chars, pairs.syllables))
+
+
+def test_longest_overlapping_phrase_wins(phrases):
+    phrases.add("银行", ["yín", "háng"])
+    phrases.add("银行长", ["yín", "háng", "zhǎng"])
+    phrases.add("行长", ["háng", "zhǎng"])
+    assert list(phrases.matches("银行长")) == [(0, ["yín", "háng", "zhǎng"])]
+    # Matches do not overlap: once 银行 is taken, 行长 cannot start inside it
+    assert list(phrases.matches("银行业")) == [(0, ["yín", "háng"])]
+    assert list(phrases.matches("是行长")) == [(1, ["háng", "zhǎng"])]
+
+
+def test_unfinished_longer_path_falls_back_to_shorter_phrase(phrases):
+    phrases.add("世界", ["shì", "jiè"])
+    phrases.add("世界和平", ["shì", "jiè", "hé", "píng"])
+    assert list(phrases.matches("世界和")) == [(0, ["shì", "jiè"])]
+    assert list(phrases.matches("世界和平")) == [(0, ["shì", "jiè", "hé", "píng"])]
+
+
+def test_matches_at_text_boundaries(phrases):
+    phrases.add("你好", ["nǐ", "hǎo"])
+    assert list(phrases.matches("你好世界你好")) == [(0, ["nǐ", "hǎo"]), (4, ["nǐ", "hǎo"])]
+    assert list(phrases.matches("你")) == []
+    assert list(phrases.matches("")) == []
+    assert list(phrases.matches("好你")) == []
+
+
+def test_engine_applies_phrases_around_non_han_tokens(qapp, phrases):
+    phrases.add("重庆", ["zhòng", "qìng"])
+    engine = Engine(phrases=phrases)
+    assert readings(engine, "去重庆OK重庆") == [("去", "qù"), ("重", "zhòng"), ("庆", "qìng"), ("OK", ""),
+                                              ("重", "zhòng"), ("庆", "qìng")]
+    # A phrase split by a non-Han run is not applied
+    phrases.add("火锅", ["huǒ", "guò"])
+    assert readings(engine, "火A锅") == readings(Engine(), "火A锅")
+
+
+def test_learned_correction_applies_on_next_convert(qapp, phrases, tmp_path):
+    engine = Engine(phrases=phrases)
+    text = "长城很长"
+    syllables = [py for _, py in readings(engine, text)]
+    assert syllables[3] == "zhǎng"
+    syllables[3] = "cháng"
+
+    # A single-character word is learned together with its neighbour
+    assert phrases.learn_correction(text, 3, syllables) == "很长"
+    assert readings(engine, text)[3] == ("长", "cháng")
+    assert readings(engine, "他是队长")[3] == ("长", "zhǎng")
+
+    # and persisted for the next session
+    reloaded = PhraseDictionary(str(tmp_path / "user_phrases.json"))
+    assert reloaded.phrases == {"很长": ["hěn", "cháng"]}
@@ -0,0 +1,122 @@
+import pytest
+
+from src import selection
+from src.selection import (SelectionRegistry, FakeSource, FAILURES_BEFORE_SKIP, SKIP_TTL, MAX_SKIP_TTL,
+                           html_font_size)
+
+INFO = {"size": 24, "colors": None, "font_name": "KaiTi"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(selection.time, "monotonic", clock)
+    return clock
+
+
+def test_failing_source_is_skipped_after_repeated_failures(clock):
+    closed = FakeSource("closed", available=False)
+    # A fallback answers but never takes the preferred slot, so the closed app is asked first every time
+    registry = SelectionRegistry([closed, FakeSource("clipboard", INFO, fallback=True)])
+    for _ in range(FAILURES_BEFORE_SKIP):
+        assert registry() == INFO
+    assert closed.queries == FAILURES_BEFORE_SKIP
+    registry()
+    assert closed.queries == FAILURES_BEFORE_SKIP
+    assert registry.stats["closed"].skipped == 1
+
+    clock.now += SKIP_TTL + 0.1
+    registry()
+    assert closed.queries == FAILURES_BEFORE_SKIP + 1
+
+
+def test_skip_ttl_doubles_up_to_the_cap(clock):
+    closed = FakeSource("closed", available=False)
+    registry = SelectionRegistry([closed])
+    ttls = []
+    for _ in range(FAILURES_BEFORE_SKIP - 1):
+        registry()
+    for _ in range(8):
+        registry()
+        stats = registry.stats["closed"]
+        ttls.append(stats.skip_until - clock.now)
+        clock.now = stats.skip_until
+    assert ttls[:4] == [SKIP_TTL, SKIP_TTL * 2, SKIP_TTL * 4, SKIP_TTL * 8]
+    assert max(ttls) == MAX_SKIP_TTL
+    assert ttls[-1] == MAX_SKIP_TTL
+
+
+def test_success_clears_the_failure_record(clock):
+    flaky = FakeSource("flaky", INFO, available=False)
+    registry = SelectionRegistry([flaky])
+    for _ in range(FAILURES_BEFORE_SKIP):
+        registry()
+    flaky.available = True
+    clock.now = registry.stats["flaky"].skip_until
+    assert registry() == INFO
+    stats = registry.stats["flaky"]
+    assert (stats.streak, stats.skip_until, stats.failures) == (0, 0.0, FAILURES_BEFORE_SKIP)
+
+
+def test_answering_source_is_asked_first_next_time(clock):
+    first = FakeSource("first", None)
+    second = FakeSource("second", INFO)
+    registry = SelectionRegistry([first, second])
+    assert registry() == INFO
+    assert registry.preferred is second
+    assert registry.order() == [second, first]
+    registry()
+    assert first.queries == 1 and second.queries == 2
+
+
+def test_fallbacks_are_asked_last_and_never_preferred(clock):
+    fallback = FakeSource("fallback", {"size": 12, "colors": None, "font_name": None}, fallback=True)
+    app = FakeSource("app", None)
+    registry = SelectionRegistry([fallback, app])
+    assert registry.order() == [app, fallback]
+    assert registry()["size"] == 12
+    assert registry.preferred is None
+
+    app.info = INFO
+    assert registry() == INFO
+    assert registry.preferred is app
+    app.info = None
+    assert registry()["size"] == 12
+    assert registry.preferred is app
+    assert registry.order() == [app, fallback]
+
+
+def test_prefetch_skips_sources_unsafe_to_prefetch(clock):
+    clipboard = FakeSource("clipboard", INFO, fallback=True)
+    clipboard.safe_to_prefetch = False
+    registry = SelectionRegistry([clipboard])
+    assert registry(prefetch=True) is None
+    assert clipboard.queries == 0
+    assert registry() == INFO
+
+
+def test_summary_lists_skipped_sources(clock):
+    registry = SelectionRegistry([FakeSource("closed", available=False)])
+    assert registry.summary() == ""
+    for _ in range(FAILURES_BEFORE_SKIP):
+        registry()
+    assert "(skipped for 5 s)" in registry.summary()
+
+
+@pytest.mark.parametrize("html, size", [
+    ('<span style="font-size: 24pt">x</span>', 24),
+    ('<span style="font-size:32px">x</span>', 24),
+    ('<font size="5">x</font>', 18),
+    ('<span style="font-size: 400pt">x</span>', None),
+    ("<p>x</p>", None),
+])
+def test_html_font_size(html, size):
+    assert html_font_size(html) == size
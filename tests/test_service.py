@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.engine import Engine
+from src.service import ConversionService, ServiceClient
+
+
+@pytest.fixture
+def service(qapp):
+    engine = Engine(size_hanzi=32, size_pinyin=18)
+    service = ConversionService(engine, port=0)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(service.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield service
+    asyncio.run_coroutine_threadsafe(_shutdown(service), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+    service.executor.shutdown()
+
+
+async def _shutdown(service):
+    service.server.close()
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.fixture
+def client(service):
+    client = ServiceClient(port=service.port)
+    yield client
+    client.close()
+
+
+def test_pairs(client):
+    status, _, data = client.request("/pairs", {"text": "你好"})
+    assert status == 200
+    assert data == {"pairs": [{"ch": "你", "py": "nǐ"}, {"ch": "好", "py": "hǎo"}]}
+
+
+def test_batch(client):
+    status, _, data = client.request("/html", {"texts": ["你", "好"]})
+    assert status == 200
+    assert len(data["results"]) == 2
+    assert all(r["html"] for r in data["results"])
+
+
+def test_png(client):
+    status, content_type, body = client.request("/png", {"text": "中文"})
+    assert status == 200
+    assert content_type == "image/png"
+    assert body.startswith(b"\x89PNG")
+
+
+def test_size_does_not_leak_into_later_requests(client, service):
+    status, _, sized = client.request("/svg", {"text": "中文", "size": 80})
+    assert status == 200
+    status, _, default = client.request("/svg", {"text": "中文"})
+    assert status == 200
+    assert sized != default
+    assert service.engine.size_hanzi == 32
+    assert service.engine.size_pinyin == 18
+
+
+@pytest.mark.parametrize("payload", [
+    {"text": None},
+    {"text": 5},
+    {"texts": "abc"},
+    {"texts": ["a", 1]},
+    {},
+    ["text"],
+])
+def test_invalid_input(client, payload):
+    status, _, data = client.request("/pairs", payload)
+    assert status == 400
+    assert "error" in data
+
+
+def test_unknown_endpoint_and_method(client):
+    assert client.request("/nope", {"text": "中"})[0] == 404
+    assert client.request("/pairs")[0] == 405
+
+
+def test_metrics(client):
+    client.request("/pairs", {"text": "中"})
+    status, _, data = client.request("/metrics")
+    assert status == 200
+    assert data["endpoints"]["/pairs"]["count"] >= 1
+
+
+@pytest.mark.parametrize("payload", [
+    {"text": "中", "size": 100000},
+    {"text": "中", "size": 0},
+    {"text": "中", "size": -5},
+    {"text": "中", "size": "big"},
+    {"text": "中", "scale": 1000},
+    {"text": "中", "scale": 0},
+    {"text": "中", "scale": -1.5},
+    {"text": "中", "scale": float("nan")},
+])
+def test_out_of_range_size_and_scale(client, service, payload):
+    status, _, data = client.request("/png", payload)
+    assert status == 400
+    assert "error" in data
+    assert service.engine.size_hanzi == 32
+
+
+def test_size_and_scale_at_limits(client):
+    status, _, body = client.request("/png", {"text": "中", "size": 500, "scale": 1.0})
+    assert status == 200 and body.startswith(b"\x89PNG")
+    status, _, body = client.request("/svg", {"text": "中", "size": 10, "scale": 6})
+    assert status == 200 and body
@@ -0,0 +1,42 @@
+import json
+import unicodedata
+
+from PyQt6.QtCore import QMimeData
+
+from src.sessions import SessionRecorder, Session, anonymize_text
+
+# Hanzi outside the replacement pool, so a surviving original would show
+MIXED = "Привет, Ωμέγα! café café ｶﾀｶﾅ ひらがな 한국어 Ａｂｃ 龙凤 ½ ٣ 42"
+
+
+def original_marks(text):
+    """ Letters, combining marks and numerals of text, hanzi included """
+    return {ch for ch in text if ch.isalnum() or unicodedata.category(ch).startswith("M")}
+
+
+def test_anonymize_keeps_length_and_layout():
+    masked = anonymize_text(MIXED, b"k" * 16)
+    assert len(masked) == len(MIXED)
+    assert [ch.isspace() for ch in masked] == [ch.isspace() for ch in MIXED]
+    assert masked.count(",") == MIXED.count(",") and masked.count("!") == MIXED.count("!")
+    assert anonymize_text("龙凤龙", b"k" * 16)[0] == anonymize_text("龙凤龙", b"k" * 16)[2]
+
+
+def test_recorded_text_keeps_no_original_letters(qapp, tmp_path):
+    path = tmp_path / "session-test.jsonl"
+    recorder = SessionRecorder(str(path))
+    mime = QMimeData()
+    mime.setText(MIXED)
+    mime.setHtml(f'<p style="font-size: 24pt">{MIXED}</p>')
+    recorder.clipboard(mime)
+    recorder.close()
+
+    events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    clipboard = next(e for e in events if e["type"] == "clipboard")
+    text = clipboard["text"]
+    # Only the masks themselves may coincide with the original
+    assert original_marks(MIXED) & set(text) <= {"x", "X", "ｘ", "Ｘ", "0"}
+    assert len(text) == len(MIXED)
+    # The HTML keeps the font size hint and the masked text, nothing else
+    assert clipboard["html"] == f'<span style="font-size: 24pt">{text}</span>'
+    assert Session(str(path)).clipboards == [(text, clipboard["html"])]
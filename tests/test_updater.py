@@ -0,0 +1,263 @@
+import os
+import json
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from src import updater
+from src.delta import build_delta, apply_delta, delta_asset_name, write_checksum
+from src.updater import DownloadWorker, UpdateChecker, Updater
+
+PAYLOAD = os.urandom(300 * 1024)
+ETAG = '"v1"'
+
+
+class FileServer(ThreadingHTTPServer):
+    """ Serves in-memory files with ETag and byte-range support; ignore_range makes it answer 200 to everything """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.files = {}
+        self.ignore_range = False
+        self.requests = []
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server_address[1]}/{name}"
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        name = self.path.lstrip("/")
+        server.requests.append((name, self.headers.get("Range")))
+        data = server.files.get(name)
+        if data is None:
+            self.send_error(404)
+            return
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and not server.ignore_range and self.headers.get("If-Range", ETAG) == ETAG:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    server.files["app.exe"] = PAYLOAD
+    server.files["app.exe.sha256"] = hashlib.sha256(PAYLOAD).hexdigest().encode() + b"  app.exe\n"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def download(server, dest, checksum=True):
+    """ Runs a DownloadWorker on this thread; returns (saved path or None, error or None) """
+    worker = run_worker(server.url("app.exe"), server.url("app.exe.sha256") if checksum else "", dest)
+    return worker.result.get("path"), worker.result.get("error")
+
+
+def run_worker(url, checksum_url, dest):
+    worker = DownloadWorker(url, checksum_url, str(dest))
+    worker.result = {}
+    worker.finished.connect(lambda path: worker.result.setdefault("path", path))
+    worker.error.connect(lambda e: worker.result.setdefault("error", e))
+    worker.run()
+    return worker
+
+
+def write_part(dest, data, etag=ETAG):
+    part = dest / "app.exe.part"
+    part.write_bytes(data)
+    (dest / "app.exe.part.json").write_text(json.dumps({"etag": etag}))
+    return part
+
+
+def assert_installed(dest, path):
+    assert path == str(dest / "app.exe")
+    assert (dest / "app.exe").read_bytes() == PAYLOAD
+    assert not (dest / "app.exe.part").exists()
+    assert not (dest / "app.exe.part.json").exists()
+
+
+def test_fresh_download(qapp, server, tmp_path):
+    path, error = download(server, tmp_path)
+    assert error is None
+    assert_installed(tmp_path, path)
+
+
+def test_resume(qapp, server, tmp_path):
+    write_part(tmp_path, PAYLOAD[:100000])
+    path, error = download(server, tmp_path)
+    assert error is None
+    assert ("app.exe", "bytes=100000-") in server.requests
+    assert_installed(tmp_path, path)
+
+
+def test_server_ignoring_range_restarts(qapp, server, tmp_path):
+    write_part(tmp_path, b"x" * 100000)
+    server.ignore_range = True
+    path, error = download(server, tmp_path)
+    assert error is None
+    assert_installed(tmp_path, path)
+
+
+def test_complete_part_is_accepted_on_416(qapp, server, tmp_path):
+    write_part(tmp_path, PAYLOAD)
+    path, error = download(server, tmp_path)
+    assert error is None
+    assert_installed(tmp_path, path)
+    assert [r for r in server.requests if r[0] == "app.exe"] == [("app.exe", f"bytes={len(PAYLOAD)}-")]
+
+
+def test_oversized_part_restarts_on_416(qapp, server, tmp_path):
+    write_part(tmp_path, PAYLOAD + b"garbage")
+    path, error = download(server, tmp_path)
+    assert error is None
+    assert_installed(tmp_path, path)
+
+
+def test_checksum_mismatch_discards_download(qapp, server, tmp_path):
+    server.files["app.exe.sha256"] = b"0" * 64 + b"  app.exe\n"
+    path, error = download(server, tmp_path)
+    assert path is None
+    assert "Checksum mismatch" in error
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_published_checksum_verifies_download(qapp, server, tmp_path):
+    installer = tmp_path / "PinyinHelper_Setup.exe"
+    installer.write_bytes(PAYLOAD)
+    server.files["app.exe.sha256"] = open(write_checksum(str(installer)), "rb").read()
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    worker = run_worker(server.url("app.exe"), server.url("app.exe.sha256"), downloads)
+    assert "error" not in worker.result
+    assert worker.verified
+
+
+def test_download_without_checksum_is_unverified(qapp, server, tmp_path):
+    worker = run_worker(server.url("app.exe"), "", tmp_path)
+    assert "error" not in worker.result
+    assert not worker.verified
+
+
+class Closable:
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("answer", ["yes", "no"])
+def test_unverified_installer_needs_confirmation(qapp, tmp_path, monkeypatch, answer):
+    installer = tmp_path / "app.exe"
+    installer.write_bytes(PAYLOAD)
+    launched, asked = [], []
+    buttons = updater.QMessageBox.StandardButton
+    monkeypatch.setattr(updater.QMessageBox, "warning",
+                        lambda *args: asked.append(args) or (buttons.Yes if answer == "yes" else buttons.No))
+    monkeypatch.setattr(updater.subprocess, "Popen", lambda args, **kwargs: launched.append(args))
+    controller = Updater(None, "1.0.4", "test/repo")
+    controller.progress_dialog = Closable()
+    controller.downloader = DownloadWorker("", "", str(tmp_path))
+
+    if answer == "yes":
+        with pytest.raises(SystemExit):
+            controller.install_and_restart(str(installer))
+        assert launched == [[str(installer)]]
+    else:
+        controller.install_and_restart(str(installer))
+        assert launched == []
+        assert not installer.exists()
+    assert len(asked) == 1
+
+
+def test_verified_installer_runs_without_asking(qapp, tmp_path, monkeypatch):
+    launched = []
+    monkeypatch.setattr(updater.QMessageBox, "warning", lambda *args: pytest.fail("asked about a verified installer"))
+    monkeypatch.setattr(updater.subprocess, "Popen", lambda args, **kwargs: launched.append(args))
+    controller = Updater(None, "1.0.4", "test/repo")
+    controller.progress_dialog = Closable()
+    controller.downloader = DownloadWorker("", "", str(tmp_path))
+    controller.downloader.verified = True
+    with pytest.raises(SystemExit):
+        controller.install_and_restart("app.exe")
+    assert launched == [["app.exe"]]
+
+
+def make_build(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return root
+
+
+@pytest.mark.parametrize("published", ["sidecar", "list", "none"])
+def test_delta_update_end_to_end(qapp, server, tmp_path, published):
+    base = os.urandom(200 * 1024)
+    old = make_build(tmp_path / "old", {"PinyinHelper.exe": base, "lib/a.dll": b"a" * 5000, "gone.txt": b"x"})
+    new = make_build(tmp_path / "new", {"PinyinHelper.exe": base[:1000] + b"patched" + base[1000:],
+                                        "lib/a.dll": b"a" * 5000, "lib/b.dll": b"b" * 100})
+    delta_name = delta_asset_name("1.0.4", "1.0.5")
+    package = tmp_path / delta_name
+    build_delta(str(old), str(new), str(package), "1.0.4", "1.0.5")
+
+    # The installer publishes its own sidecar hash, which must not be used for the delta
+    server.files[delta_name] = package.read_bytes()
+    assets = [{"name": "app.exe", "browser_download_url": server.url("app.exe")},
+              {"name": "app.exe.sha256", "browser_download_url": server.url("app.exe.sha256")},
+              {"name": delta_name, "browser_download_url": server.url(delta_name)}]
+    delta_hash = hashlib.sha256(package.read_bytes()).hexdigest()
+    if published == "sidecar":
+        server.files[delta_name + ".sha256"] = open(write_checksum(str(package)), "rb").read()
+        assets.append({"name": delta_name + ".sha256", "browser_download_url": server.url(delta_name + ".sha256")})
+    elif published == "list":
+        server.files["SHA256SUMS"] = f"{delta_hash}  {delta_name}\n".encode()
+        assets.append({"name": "SHA256SUMS", "browser_download_url": server.url("SHA256SUMS")})
+    server.files["latest"] = json.dumps({"tag_name": "v1.0.5", "assets": assets}).encode()
+
+    checker = UpdateChecker("1.0.4", "test/repo", force=True, api_url=server.url("latest"),
+                            cache_path=str(tmp_path / "cache.json"))
+    found = []
+    checker.found.connect(lambda *args: found.append(args))
+    checker.run()
+    version, exe_url, checksum_url, delta_url, delta_checksum_url = found[0]
+    assert (version, exe_url, delta_url) == ("1.0.5", server.url("app.exe"), server.url(delta_name))
+    assert checksum_url == server.url("app.exe.sha256")
+    assert delta_checksum_url != checksum_url
+
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    worker = run_worker(delta_url, delta_checksum_url, downloads)
+    result = worker.result
+    assert "error" not in result
+    assert worker.verified == (published != "none")
+
+    staging = tmp_path / "staging"
+    manifest = apply_delta(result["path"], str(old), str(staging), "1.0.4")
+    assert (staging / "PinyinHelper.exe").read_bytes() == (new / "PinyinHelper.exe").read_bytes()
+    assert (staging / "lib" / "b.dll").read_bytes() == b"b" * 100
+    assert not (staging / "lib" / "a.dll").exists()
+    assert [e["path"] for e in manifest["files"] if e["op"] == "delete"] == ["gone.txt"]
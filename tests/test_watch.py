@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from src.engine import Engine
+from src.watch import FolderRenderer
+
+
+@pytest.fixture
+def renderer(qapp, tmp_path):
+    return FolderRenderer(Engine(size_hanzi=16, size_pinyin=10), str(tmp_path / "out"), scale=1.0)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "lesson.txt"
+    path.write_text("你好\n\n中文\n学习\n", encoding="utf-8")
+    return path
+
+
+def outputs(renderer, text):
+    folder = os.path.join(renderer.out_dir, "lesson")
+    h = renderer.line_hash(text)
+    return os.path.join(folder, h + ".png"), os.path.join(folder, h + ".html")
+
+
+def index(renderer):
+    with open(os.path.join(renderer.out_dir, "lesson", "lesson.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def count_reads(monkeypatch):
+    reads = []
+    real = FolderRenderer._read_fragment
+    monkeypatch.setattr(FolderRenderer, "_read_fragment", staticmethod(lambda path: reads.append(path) or real(path)))
+    return reads
+
+
+def test_only_changed_lines_are_rendered(renderer, source):
+    assert renderer.update(str(source)) == 3
+    source.write_text("你好\n\n中国\n学习\n", encoding="utf-8")
+    assert renderer.update(str(source)) == 1
+    assert not os.path.exists(outputs(renderer, "中文")[0])
+    page = index(renderer)
+    assert page.index(">你<") < page.index(">国<") < page.index(">习<")
+    assert ">文<" not in page
+
+
+def test_index_is_rebuilt_without_rereading_fragments(renderer, source, monkeypatch):
+    renderer.update(str(source))
+    reads = count_reads(monkeypatch)
+    source.write_text("你好\n中文\n学习\n再见\n", encoding="utf-8")
+    assert renderer.update(str(source)) == 1
+    assert reads == []
+    assert ">见<" in index(renderer)
+
+
+def test_restart_reads_each_fragment_once(renderer, source, monkeypatch, qapp):
+    renderer.update(str(source))
+    restarted = FolderRenderer(renderer.engine, renderer.out_dir, scale=1.0)
+    reads = count_reads(monkeypatch)
+    assert restarted.update(str(source)) == 0
+    assert len(reads) == 3
+    assert restarted.update(str(source)) == 0
+    assert len(reads) == 3
+    assert index(restarted) == index(renderer)
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_deleted_output_is_rendered_again(renderer, source, which):
+    renderer.update(str(source))
+    deleted = outputs(renderer, "中文")[which]
+    os.remove(deleted)
+    assert renderer.update(str(source)) == 1
+    assert os.path.exists(deleted)
+    assert ">文<" in index(renderer)